@@ -1,25 +1,270 @@
 # auth.py
+# Users live in users.csv (username, bcrypt hash). UserStore keeps them in a
+# dict keyed by username, reloaded only when the file changes, so a lookup
+# is O(1) and bcrypt is the only real cost of a login. That cost stays off
+# the Tk thread via authenticate_async, and a signed session token lets the
+# next launch (or the CLI) skip it altogether for a while.
+import base64
 import csv
-import bcrypt
+import hashlib
+import hmac
 import os
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from logger import logger
 
 USER_FILE = "users.csv"
+SESSION_TTL = 8 * 60 * 60  # seconds a login is remembered
+
+
+def _config_dir():
+    """Per-user folder for secrets that must never sit in the app (or repo)
+    folder: %APPDATA%\\DPO, ~/Library/Application Support/DPO or
+    $XDG_CONFIG_HOME/dpo. DPO_CONFIG_DIR overrides it."""
+    if os.environ.get("DPO_CONFIG_DIR"):
+        return os.environ["DPO_CONFIG_DIR"]
+    if os.name == "nt":
+        return os.path.join(os.environ.get("APPDATA") or os.path.expanduser("~"), "DPO")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Application Support/DPO")
+    return os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"), "dpo")
+
+
+CONFIG_DIR = _config_dir()
+SESSION_FILE = os.path.join(CONFIG_DIR, "session")
+SESSION_KEY_FILE = os.path.join(CONFIG_DIR, "session_key")
+
+# bcrypt work factor for new and rehashed passwords; every +1 doubles the cost
+BCRYPT_ROUNDS = int(os.environ.get("DPO_BCRYPT_ROUNDS", 12))
+
+FIELDS = ["username", "password"]
+
+_dummy_hash = None
+
+
+def _hash_rounds(hashed):
+    # $2b$12$<salt+hash>
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def hash_password(password, rounds=None):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode()
+
+
+class UserStore:
+    def __init__(self, path=USER_FILE):
+        self.path = path
+        self._users = {}  # username -> bcrypt hash
+        self._sig = None
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        try:
+            st = os.stat(self.path)
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            self._users, self._sig = {}, None
+            return
+        if sig == self._sig:
+            return
+        users = {}
+        with open(self.path, newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("username"):
+                    users[row["username"]] = row.get("password") or ""
+        self._users, self._sig = users, sig
+
+    def get_hash(self, username):
+        with self._lock:
+            self._ensure_loaded()
+            return self._users.get(username)
+
+    def exists(self, username):
+        return self.get_hash(username) is not None
+
+    def has_users(self):
+        with self._lock:
+            self._ensure_loaded()
+            return bool(self._users)
+
+    def add(self, username, hashed):
+        with self._lock:
+            self._ensure_loaded()
+            if username in self._users:
+                raise ValueError(f"User '{username}' already exists")
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow({"username": username, "password": hashed})
+            self._users[username] = hashed
+            self._sig = self._stat()
+
+    def set_hash(self, username, hashed):
+        """Replace a user's hash (rewrites the file atomically)."""
+        with self._lock:
+            self._ensure_loaded()
+            self._users[username] = hashed
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                writer.writeheader()
+                for name, value in self._users.items():
+                    writer.writerow({"username": name, "password": value})
+            os.replace(tmp_path, self.path)
+            self._sig = self._stat()
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+
+# Shared by the login window and the CLI
+users = UserStore()
 
-def create_user(username, password):
-    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-    file_exists = os.path.exists(USER_FILE)
-    with open(USER_FILE, "a", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["username", "password"])
-        if not file_exists or os.path.getsize(USER_FILE) == 0:
-            writer.writeheader()
-        writer.writerow({"username": username, "password": hashed})
-
-def authenticate_user(username, password):
-    if not os.path.exists(USER_FILE):
+# One worker is plenty: logins are rare, and it keeps bcrypt off the Tk thread
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auth")
+
+
+def create_user(username, password, rounds=None, store=None):
+    store = store or users
+    if store.exists(username):
+        raise ValueError(f"User '{username}' already exists")
+    store.add(username, hash_password(password, rounds))
+    logger.info(f"Created user {username}")
+
+
+def authenticate_user(username, password, store=None):
+    """Check a password. Hashes made with a different work factor than
+    BCRYPT_ROUNDS are upgraded on a successful login."""
+    store = store or users
+    hashed = store.get_hash(username)
+    if hashed is None:
+        # Spend the same time as for a real user, so names can't be probed
+        global _dummy_hash
+        if _dummy_hash is None:
+            _dummy_hash = bcrypt.hashpw(b"no such user", bcrypt.gensalt(BCRYPT_ROUNDS))
+        bcrypt.checkpw(password.encode(), _dummy_hash)
         return False
-    with open(USER_FILE, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row["username"] == username and bcrypt.checkpw(password.encode(), row["password"].encode()):
-                return True
-    return False
+    try:
+        ok = bcrypt.checkpw(password.encode(), hashed.encode())
+    except ValueError:
+        logger.error(f"Stored password hash for {username} is malformed")
+        return False
+    if ok and _hash_rounds(hashed) != BCRYPT_ROUNDS:
+        store.set_hash(username, hash_password(password))
+        logger.info(f"Rehashed password for {username} with cost {BCRYPT_ROUNDS}")
+    return ok
+
+
+def authenticate_async(username, password, callback=None, store=None):
+    """Run authenticate_user on a worker thread. Returns a Future;
+    ``callback(ok)`` is called on that worker thread when it finishes, so Tk
+    code should hand the result back through a queue or ``after``."""
+    future = _executor.submit(authenticate_user, username, password, store)
+    if callback is not None:
+        future.add_done_callback(lambda f: callback(False if f.exception() else f.result()))
+    return future
+
+
+def create_user_async(username, password, callback=None, store=None):
+    """create_user on the worker thread; ``callback(error)`` gets None on
+    success (called on that thread, like authenticate_async)."""
+    future = _executor.submit(create_user, username, password, None, store)
+    if callback is not None:
+        future.add_done_callback(lambda f: callback(f.exception()))
+    return future
+
+
+# --- Session tokens -------------------------------------------------------
+# token = base64(username|expires) + "." + HMAC-SHA256 over that payload and a
+# fingerprint of the user's password hash, so changing the password or
+# deleting the user invalidates outstanding tokens.
+
+def _write_private(path, data):
+    """Write ``data`` to a file only the current user can read (mode 0600,
+    in a 0700 folder)."""
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)  # in case it already existed with a wider mode
+    with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+
+
+def _session_key(path=None):
+    path = path or SESSION_KEY_FILE
+    try:
+        with open(path, "rb") as f:
+            key = f.read()
+        if len(key) >= 32:
+            return key
+    except FileNotFoundError:
+        pass
+    key = secrets.token_bytes(32)
+    _write_private(path, key)
+    return key
+
+
+def _signature(payload, hashed, key):
+    fingerprint = hashlib.sha256(hashed.encode()).digest()
+    return hmac.new(key, payload + b"|" + fingerprint, hashlib.sha256).hexdigest()
+
+
+def issue_session(username, ttl=SESSION_TTL, store=None):
+    store = store or users
+    hashed = store.get_hash(username)
+    if hashed is None:
+        raise ValueError(f"No such user '{username}'")
+    payload = f"{username}|{int(time.time() + ttl)}".encode()
+    return base64.urlsafe_b64encode(payload).decode() + "." + _signature(payload, hashed, _session_key())
+
+
+def verify_session(token, store=None):
+    """Username the token was issued to, or None if it is forged, expired or
+    the user's password has changed since."""
+    store = store or users
+    try:
+        encoded, signature = token.strip().rsplit(".", 1)
+        payload = base64.urlsafe_b64decode(encoded.encode())
+        username, expires = payload.decode().rsplit("|", 1)
+        expires = int(expires)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if expires < time.time():
+        return None
+    hashed = store.get_hash(username)
+    if hashed is None:
+        return None
+    if not hmac.compare_digest(signature, _signature(payload, hashed, _session_key())):
+        return None
+    return username
+
+
+def save_session(token, path=None):
+    _write_private(path or SESSION_FILE, token)
+
+
+def load_session(path=None, store=None):
+    """Username of the saved session if it is still valid."""
+    try:
+        with open(path or SESSION_FILE) as f:
+            return verify_session(f.read(), store)
+    except OSError:
+        return None
+
+
+def clear_session(path=None):
+    try:
+        os.remove(path or SESSION_FILE)
+    except FileNotFoundError:
+        pass
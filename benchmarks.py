@@ -0,0 +1,371 @@
+# benchmarks.py
+# Timings for the data paths behind the GUI at production scale, so a slow
+# change shows up as a number instead of a laggy tab. ``generate`` builds a
+# synthetic data folder (clients.csv, emails.csv, assets/files, receipts/)
+# and ``run`` times the loaders against it and writes JSON results that
+# can be compared run to run.
+#
+#   python benchmarks.py generate /tmp/dpo-bench
+#   python benchmarks.py run /tmp/dpo-bench --output bench-main.json
+#   python benchmarks.py run /tmp/dpo-bench --gui --compare bench-main.json
+#
+# ``run`` works inside the data folder (the app's paths are relative), and
+# save_sent_email appends a few rows to its emails.csv. The Tk timings need
+# a display and are skipped without one.
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CLIENTS = 100_000
+DEFAULT_EMAILS = 200_000
+DEFAULT_FILES = 50_000
+DEFAULT_RECEIPTS = 20_000
+DEFAULT_REPEAT = 5
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Aisha",
+               "Wei", "Priya", "Olga", "Kenji", "Fatima", "Lucas", "Amara", "Noah", "Sofia", "Mateo"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+              "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores"]
+EXTENSIONS = [".pdf", ".zip", ".epub", ".mp3", ".png", ".psd", ".docx"]
+
+
+# --- Data generator ---------------------------------------------------------
+
+def _client_names(rng, count):
+    names = set()
+    while len(names) < count:
+        names.add(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.randrange(1000):03d}")
+    return sorted(names)
+
+
+def _email_for(name, n=0):
+    first, last, number = name.lower().split()
+    return f"{first}.{last}{number}{'+' + str(n) if n else ''}@example.com"
+
+
+def generate(folder, clients=DEFAULT_CLIENTS, emails=DEFAULT_EMAILS, files=DEFAULT_FILES,
+             receipts=DEFAULT_RECEIPTS, seed=1):
+    """Write a synthetic data folder; returns the counts written."""
+    rng = random.Random(seed)
+    files_dir = os.path.join(folder, "assets", "files")
+    client_dir = os.path.join(folder, "assets", "client")
+    receipts_dir = os.path.join(folder, "receipts")
+    for path in (files_dir, client_dir, receipts_dir):
+        os.makedirs(path, exist_ok=True)
+
+    # Roughly five orders per client, like a shop with repeat customers
+    names = _client_names(rng, max(1, clients // 5))
+
+    file_names = []
+    for i in range(files):
+        name = f"{rng.choice(LAST_NAMES)} Product {i:06d}{rng.choice(EXTENSIONS)}"
+        with open(os.path.join(files_dir, name), "wb") as f:
+            f.write(b"x" * rng.randrange(64, 4096))
+        file_names.append(name)
+
+    start = datetime(2022, 1, 1)
+    with open(os.path.join(folder, "clients.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "email", "date", "files"])
+        for _ in range(clients):
+            name = rng.choice(names)
+            date = start + timedelta(minutes=rng.randrange(3 * 365 * 24 * 60))
+            picked = rng.sample(file_names, k=min(len(file_names), rng.randint(1, 4))) if file_names else []
+            writer.writerow([name, _email_for(name), date.strftime("%Y-%m-%d %H:%M"), "|".join(picked)])
+
+    with open(os.path.join(client_dir, "emails.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "email"])
+        for i in range(emails):
+            name = names[i % len(names)]
+            writer.writerow([name, _email_for(name, i // len(names))])
+
+    for seq in range(1, receipts + 1):
+        name = rng.choice(names)
+        stamp = start + timedelta(seconds=rng.randrange(3 * 365 * 24 * 3600))
+        filename = f"{name.replace(' ', '_')}_{stamp:%Y%m%d_%H%M%S}_{seq:06d}.pdf"
+        with open(os.path.join(receipts_dir, filename), "wb") as f:
+            f.write(b"%PDF-1.3\n%%EOF\n")
+
+    return {"clients": clients, "emails": emails, "files": files, "receipts": receipts}
+
+
+# --- Timing -----------------------------------------------------------------
+
+def measure(func, repeat=DEFAULT_REPEAT, number=1, setup=None):
+    """Time ``func`` ``repeat`` times (``number`` calls each, after
+    ``setup()``); returns per-call milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number * 1000)
+    return {
+        "runs": repeat,
+        "calls_per_run": number,
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def headless_benchmarks(repeat):
+    """The CSV, store and folder-scan logic under each GUI loader."""
+    import bulk_sender
+    import client_data
+    import db
+    import receipt_ledger
+    from file_catalog import FileCatalog
+
+    scratch = tempfile.mkdtemp(prefix="dpo-bench-")
+    results = {}
+    try:
+        runs = iter(range(sys.maxsize))
+
+        # clients.csv -> clients.db, what the first launch after upgrading does
+        def fresh_store():
+            return db.connect(os.path.join(scratch, f"clients-{next(runs)}.db"), client_data._SCHEMA)
+        store = {}
+        results["csv.import_clients"] = measure(lambda: client_data.import_csv(store["conn"]), repeat,
+                                                setup=lambda: store.update(conn=fresh_store()))
+        results["csv.load_jobs"] = measure(lambda: bulk_sender.load_jobs_from_csv("clients.csv"), repeat)
+
+        client_data.count_clients()  # import the CSV into the real store once, untimed
+        results["load_clients"] = measure(
+            lambda: (client_data.load_client_page(0, 200), client_data.count_clients()), repeat, number=20)
+
+        results["get_client_names.cold"] = measure(client_data.client_names, repeat,
+                                                   setup=client_data.repository.forget_names)
+        results["get_client_names.warm"] = measure(client_data.client_names, repeat, number=100)
+
+        names = client_data.client_names()
+        lookups = names[::max(1, len(names) // 1000)]
+        results["get_saved_emails_for_client.cold"] = measure(
+            lambda: client_data.ClientRepository().emails_for(lookups[0]), repeat)
+        results["get_saved_emails_for_client.warm"] = measure(
+            lambda: [client_data.repository.emails_for(name) for name in lookups], repeat)
+        results["get_saved_emails_for_client.warm"]["lookups_per_call"] = len(lookups)
+
+        counter = iter(range(sys.maxsize))
+        results["save_sent_email"] = measure(
+            lambda: client_data.save_sent_email("Bench Client", f"bench{next(counter)}@example.com"),
+            repeat, number=100)
+
+        files_folder = os.path.join("assets", "files")
+        results["files.scan"] = measure(lambda: FileCatalog(files_folder).load(), repeat)
+        catalog = FileCatalog(files_folder)
+        catalog.load()
+        results["files.search_all"] = measure(catalog.search, repeat)
+        results["files.search_query"] = measure(lambda: catalog.search("smith"), repeat, number=20)
+
+        ledgers = iter(range(sys.maxsize))
+        results["receipts.backfill"] = measure(
+            lambda: receipt_ledger.backfill("receipts", path=os.path.join(scratch, f"ledger-{next(ledgers)}.db")),
+            repeat)
+        receipt_ledger.backfill("receipts")
+        results["receipts.list_all"] = measure(lambda: receipt_ledger.list_receipts(""), repeat)
+        results["receipts.list_filtered"] = measure(lambda: receipt_ledger.list_receipts("smith"), repeat)
+        results["receipts.list_by_client"] = measure(lambda: receipt_ledger.list_receipts("", "client", False),
+                                                     repeat)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def gui_benchmarks(repeat):
+    """The DPOApp loaders themselves, filling real (hidden) Tk widgets."""
+    import tkinter as tk
+
+    try:
+        import ttkbootstrap as ttk
+        root = ttk.Window(themename="cosmo")
+    except tk.TclError as e:
+        return {"skipped": f"no display: {e}"}
+    root.withdraw()
+
+    import gui
+    from file_catalog import FileCatalog
+
+    # Just the widgets and state these methods use, not the whole window
+    app = gui.DPOApp.__new__(gui.DPOApp)
+    app.root = root
+    app.client_tree = gui.Treeview(root, columns=("name", "email", "date", "files"), show="headings")
+    app.clients_status_var = ttk.StringVar()
+    app.files_tree = gui.Treeview(root, columns=("name", "size", "modified"), show="headings")
+    app.search_var = ttk.StringVar()
+    app.file_catalog = FileCatalog(os.path.join("assets", "files"))
+    app.file_catalog.load()
+    app.receipts_tree = gui.Treeview(root, columns=("filename", "client", "total", "created"), show="headings")
+    app.receipt_sort = ("created", True)
+    app.receipt_filter_var = ttk.StringVar()
+
+    def clear(tree):
+        tree.delete(*tree.get_children())
+        root.update_idletasks()
+
+    def timed(method):
+        return lambda: (method(), root.update_idletasks())
+
+    results = {}
+    try:
+        results["gui.load_clients"] = measure(timed(app.load_clients), repeat)
+        results["gui.get_client_names"] = measure(app.get_client_names, repeat, number=100)
+        name = app.get_client_names()[0]
+        results["gui.get_saved_emails_for_client"] = measure(lambda: app.get_saved_emails_for_client(name),
+                                                             repeat, number=100)
+        counter = iter(range(sys.maxsize))
+        results["gui.save_sent_email"] = measure(
+            lambda: app.save_sent_email("Bench Client", f"gui{next(counter)}@example.com"), repeat, number=100)
+        results["gui.refresh_files_tab.fill"] = measure(timed(app.refresh_files_tab), repeat,
+                                                         setup=lambda: clear(app.files_tree))
+        results["gui.refresh_files_tab.unchanged"] = measure(timed(app.refresh_files_tab), repeat)
+        app.search_var.set("smith")
+        results["gui.refresh_files_tab.search"] = measure(timed(app.refresh_files_tab), repeat,
+                                                           setup=lambda: clear(app.files_tree))
+        results["gui.refresh_receipts_tab"] = measure(timed(app.refresh_receipts_tab), repeat)
+    finally:
+        root.destroy()
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _dataset(folder):
+    def rows(path):
+        try:
+            with open(path, "rb") as f:
+                return max(0, sum(1 for _ in f) - 1)
+        except OSError:
+            return 0
+
+    def entries(path):
+        try:
+            return sum(1 for e in os.scandir(path) if not e.name.startswith("."))
+        except OSError:
+            return 0
+
+    return {
+        "path": os.path.abspath(folder),
+        "clients_csv_rows": rows(os.path.join(folder, "clients.csv")),
+        "emails_csv_rows": rows(os.path.join(folder, "assets", "client", "emails.csv")),
+        "files": entries(os.path.join(folder, "assets", "files")),
+        "receipts": entries(os.path.join(folder, "receipts")),
+    }
+
+
+def run(folder, repeat=DEFAULT_REPEAT, include_gui=False):
+    dataset = _dataset(folder)
+    os.chdir(folder)
+    results = headless_benchmarks(repeat)
+    skipped = {}
+    if include_gui:
+        gui_results = gui_benchmarks(repeat)
+        if "skipped" in gui_results:
+            skipped["gui"] = gui_results["skipped"]
+        else:
+            results.update(gui_results)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": dataset,
+        "repeat": repeat,
+        "results": results,
+    }
+    if skipped:
+        report["skipped"] = skipped
+    return report
+
+
+def compare(report, baseline):
+    """Lines of median change per benchmark against an earlier report."""
+    lines = []
+    for name, current in report["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get("median_ms"):
+            lines.append(f"  {name:40} {current['median_ms']:10.3f} ms  (new)")
+            continue
+        change = (current["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+        lines.append(f"  {name:40} {current['median_ms']:10.3f} ms  {change:+6.1f}%  (was {before['median_ms']:.3f})")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's data paths on synthetic data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="write a synthetic data folder")
+    gen.add_argument("folder")
+    gen.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help="rows in clients.csv")
+    gen.add_argument("--emails", type=int, default=DEFAULT_EMAILS, help="rows in emails.csv")
+    gen.add_argument("--files", type=int, default=DEFAULT_FILES, help="files in assets/files")
+    gen.add_argument("--receipts", type=int, default=DEFAULT_RECEIPTS, help="PDFs in receipts/")
+    gen.add_argument("--seed", type=int, default=1)
+
+    bench = commands.add_parser("run", help="time the loaders against a data folder")
+    bench.add_argument("folder")
+    bench.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    bench.add_argument("--gui", action="store_true", help="also time the Tk loaders (needs a display)")
+    bench.add_argument("--output", help="write the JSON report here (default: stdout)")
+    bench.add_argument("--compare", help="an earlier JSON report to compare medians against")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        if os.path.exists(args.folder) and os.listdir(args.folder):
+            parser.error(f"{args.folder} is not empty")
+        start = time.perf_counter()
+        counts = generate(args.folder, args.clients, args.emails, args.files, args.receipts, args.seed)
+        print(f"Generated {counts} in {args.folder} ({time.perf_counter() - start:.1f}s)")
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    output = os.path.abspath(args.output) if args.output else None
+    report = run(args.folder, max(1, args.repeat), args.gui)
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        for name, result in report["results"].items():
+            print(f"  {name:40} {result['median_ms']:10.3f} ms")
+    else:
+        print(text)
+    if baseline is not None:
+        print(f"Compared with {args.compare} ({baseline.get('commit') or 'unknown commit'}):", file=sys.stderr)
+        sizes = {k: v for k, v in report["dataset"].items() if k != "path"}
+        if sizes != {k: v for k, v in baseline.get("dataset", {}).items() if k != "path"}:
+            print("  note: the data sets differ in size, so the numbers aren't comparable", file=sys.stderr)
+        print("\n".join(compare(report, baseline)), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+# bulk_sender.py
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from emailer import send_files_with_receipt, SMTPSessionPool, SMTP_POOL_SIZE
+from receipt_generator import create_pdf_receipt
+import client_data
+from client_data import save_client_info, save_sent_email
+from bundler import build_bundle, BUNDLE_LEVEL
+from email_templates import render_template, template_values
+import receipt_ledger
+from logger import logger
+import metrics
+
+# Workers record orders concurrently; the client store (clients.db, WAL)
+# serialises its own writes, saved emails included.
+DEFAULT_WORKERS = SMTP_POOL_SIZE
+
+
+def make_job(name, email, files, price=0, tax=0, discount=0, body=None, send_receipt=True,
+             receipt=None, record=True, bundle=False, bundle_level=BUNDLE_LEVEL, template=None):
+    if isinstance(files, str):
+        files = [p for p in files.split("|") if p]
+    return {
+        "name": name,
+        "email": email,
+        "files": list(files),
+        "price": float(price or 0),
+        "tax": float(tax or 0),
+        "discount": float(discount or 0),
+        "body": body,
+        "template": template,  # templates/ file rendered once the receipt exists; overrides body
+        "send_receipt": bool(send_receipt),
+        "receipt": receipt,   # reuse an existing receipt instead of creating one
+        "record": record,     # add the order and saved email to the client store
+        "bundle": bool(bundle),
+        "bundle_level": int(bundle_level),
+    }
+
+
+@metrics.timed("csv.load_jobs")
+def load_jobs_from_csv(path, rows=None):
+    """Build jobs from clients.csv-style rows; ``rows`` optionally picks row
+    indexes. The app's own clients.csv is read from the client store, which
+    replaced it."""
+    if client_data.is_client_csv(path):
+        records = [dict(row) for row in client_data.load_client_records()]
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            records = list(csv.DictReader(f))
+    jobs = []
+    for i, row in enumerate(records):
+        if rows is not None and i not in rows:
+            continue
+        jobs.append(make_job(row.get("name") or "", row.get("email") or "", row.get("files") or ""))
+    return jobs
+
+
+def load_jobs_from_store(client_ids=None):
+    """Build jobs from client store rows; ``client_ids`` optionally picks rows."""
+    jobs = []
+    for row in client_data.load_client_records():
+        if client_ids is not None and row["id"] not in client_ids:
+            continue
+        jobs.append(make_job(row["name"], row["email"], row["files"]))
+    return jobs
+
+
+def load_jobs_from_jsonl(path):
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            jobs.append(make_job(
+                data["name"], data["email"], data.get("files", []),
+                data.get("price", 0), data.get("tax", 0), data.get("discount", 0),
+                data.get("body"), data.get("send_receipt", True), template=data.get("template"),
+            ))
+    return jobs
+
+
+def render_body(job, receipt_path=None):
+    """``(text, html)`` for the job's template, filled in with this order's
+    details; falls back to the job's plain body if the template can't be used."""
+    receipt_num = ""
+    if receipt_path:
+        row = receipt_ledger.get_receipt(os.path.basename(receipt_path))
+        receipt_num = row["receipt_num"] if row else ""
+    values = template_values(job["name"], job["email"], job["files"], job.get("price", 0), job.get("tax", 0),
+                             job.get("discount", 0), receipt_num)
+    try:
+        with metrics.span("email.template"):
+            text, html = render_template(job["template"], values)
+    except (OSError, UnicodeDecodeError) as e:
+        logger.error(f"Could not use template {job['template']} for {job['email']}: {e}")
+        return job.get("body"), None
+    return (text if text.strip() else job.get("body")), (html if html and html.strip() else None)
+
+
+@metrics.timed("order.deliver")
+def deliver(job, pool=None, checkpoint=None):
+    """Create the receipt, send the order and record it. Returns the receipt path.
+
+    Progress is written back into ``job`` ("receipt" once the PDF exists,
+    "sent" once the server accepted the message) and passed to
+    ``checkpoint(update)`` so a retried job reuses its receipt and never
+    emails the customer twice; a retry after a successful send only redoes
+    the bookkeeping.
+    """
+    name, email, files = job["name"], job["email"], job["files"]
+    receipt_path = job.get("receipt")
+    if not receipt_path:
+        receipt_path = create_pdf_receipt(name, files, job.get("price", 0), job.get("tax", 0), job.get("discount", 0),
+                                          email=email)
+        _progress(job, checkpoint, receipt=receipt_path)
+    if not job.get("sent"):
+        attachments = files
+        if job.get("bundle") and len(files) > 1:
+            with metrics.span("order.bundle"):
+                attachments = [build_bundle(files, job.get("bundle_level", BUNDLE_LEVEL), client=name)]
+        body, html = job.get("body"), None
+        if job.get("template"):
+            body, html = render_body(job, receipt_path)
+        send_files_with_receipt(email, name, attachments, receipt_path if job.get("send_receipt", True) else None,
+                                body=body, pool=pool, html=html)
+        _progress(job, checkpoint, sent=True)
+    if job.get("record", True) and not job.get("recorded"):
+        with metrics.span("order.bookkeeping"):
+            save_client_info(name, email, files)
+            save_sent_email(name, email)
+        _progress(job, checkpoint, recorded=True)
+    return receipt_path
+
+
+def _progress(job, checkpoint, **update):
+    job.update(update)
+    if checkpoint is not None:
+        checkpoint(update)
+
+
+def send_bulk(jobs, max_workers=DEFAULT_WORKERS, pool=None, on_result=None):
+    """Deliver ``jobs`` on a bounded worker pool.
+
+    Each worker holds at most one SMTP session, so the session pool is sized
+    to match. Returns ``(results, stats)``; every result is a dict with the
+    job, ``ok``, ``receipt``/``error`` and the job's duration in seconds.
+    """
+    max_workers = max(1, min(max_workers, len(jobs) or 1))
+    own_pool = pool is None
+    if own_pool:
+        pool = SMTPSessionPool(max_size=max_workers)
+
+    results = []
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_run_job, job, pool): job for job in jobs}
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(result)
+    finally:
+        if own_pool:
+            pool.close()
+
+    elapsed = time.perf_counter() - start
+    sent = sum(1 for r in results if r["ok"])
+    stats = {
+        "jobs": len(jobs),
+        "sent": sent,
+        "failed": len(results) - sent,
+        "seconds": round(elapsed, 3),
+        "msgs_per_sec": round(sent / elapsed, 2) if elapsed > 0 else 0.0,
+        "workers": max_workers,
+    }
+    logger.info(f"Bulk send finished: {stats['sent']}/{stats['jobs']} sent in {stats['seconds']}s "
+                f"({stats['msgs_per_sec']} msgs/sec, {max_workers} workers)")
+    return results, stats
+
+
+def _run_job(job, pool):
+    start = time.perf_counter()
+    try:
+        receipt_path = deliver(job, pool=pool)
+        return {"job": job, "ok": True, "receipt": receipt_path, "error": None,
+                "seconds": time.perf_counter() - start}
+    except Exception as e:
+        logger.error(f"Bulk send to {job.get('email')} for {job.get('name')} failed: {e}")
+        return {"job": job, "ok": False, "receipt": None, "error": str(e),
+                "seconds": time.perf_counter() - start}
+
+
+if __name__ == "__main__":
+    # python bulk_sender.py orders.jsonl [workers]
+    # python bulk_sender.py store [workers]   (every order in the client store)
+    if len(sys.argv) < 2:
+        print("usage: python bulk_sender.py <manifest.jsonl|orders.csv|store> [workers]")
+        sys.exit(2)
+    manifest = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WORKERS
+    if manifest == "store":
+        batch = load_jobs_from_store()
+    elif os.path.splitext(manifest)[1].lower() == ".csv":
+        batch = load_jobs_from_csv(manifest)
+    else:
+        batch = load_jobs_from_jsonl(manifest)
+    _, summary = send_bulk(batch, max_workers=workers)
+    print(json.dumps(summary))
+    sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1,268 @@
+# bundler.py
+# Zips multi-file orders into a single attachment. Members are deflated in
+# parallel and the finished archive is cached by file set + mtimes, so a
+# popular bundle is only built once. Each order gets the cached archive under
+# a readable name (<client>_files.zip), hard-linked where the disk allows.
+import hashlib
+import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from logger import logger
+
+BUNDLE_FOLDER = os.path.join("assets", "bundles")
+BUNDLE_LEVEL = 6
+BUNDLE_WORKERS = min(8, os.cpu_count() or 1)
+BUNDLE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Bundles used this recently may still be on their way into an email, so
+# pruning leaves them alone
+BUNDLE_PRUNE_GRACE = 15 * 60
+READ_CHUNK = 1024 * 1024
+
+# Formats that are already compressed: deflating them again only burns CPU.
+STORED_EXTENSIONS = {
+    ".zip", ".gz", ".bz2", ".xz", ".7z", ".rar",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp",
+    ".mp3", ".mp4", ".m4a", ".mov", ".avi", ".mkv",
+    ".pdf", ".docx", ".xlsx", ".pptx", ".epub",
+}
+
+_ZIP32_LIMIT = 0xFFFFFFFF
+_ZIP32_MAX_ENTRIES = 0xFFFF
+_MADE_BY_UNIX = (3 << 8) | 20  # host system 3 (Unix), so the mode bits below are read
+_build_lock = threading.Lock()
+
+
+def bundle_key(file_paths, level=BUNDLE_LEVEL):
+    h = hashlib.sha1(f"level={level}".encode())
+    for path in sorted(os.path.abspath(p) for p in file_paths):
+        st = os.stat(path)
+        h.update(f"\0{path}\0{st.st_size}\0{st.st_mtime_ns}".encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def attachment_name(client=None):
+    """File name the recipient sees, e.g. ``Jane_Doe_files.zip``."""
+    safe = re.sub(r"[^\w.-]+", "_", client or "").strip("._")
+    return f"{safe}_files.zip" if safe else "files.zip"
+
+
+def build_bundle(file_paths, level=BUNDLE_LEVEL, folder=BUNDLE_FOLDER, client=None):
+    """Return the path of a zip holding ``file_paths``, building it only if
+    no cached bundle matches the current file set and mtimes. The path's
+    file name is attachment_name(client)."""
+    os.makedirs(folder, exist_ok=True)
+    key = bundle_key(file_paths, level)
+    bundle_path = os.path.join(folder, f"files_{key[:12]}.zip")
+    return _named(_cached_bundle(file_paths, level, folder, bundle_path), attachment_name(client))
+
+
+def _cached_bundle(file_paths, level, folder, bundle_path):
+    # One build at a time (members already use every core); a second caller
+    # asking for the same set then finds it in the cache.
+    with _build_lock:
+        if os.path.exists(bundle_path):
+            os.utime(bundle_path)  # mark as recently used for pruning
+            logger.info(f"Bundle cache hit: {bundle_path}")
+            return bundle_path
+
+        start = time.perf_counter()
+        fd, tmp_path = tempfile.mkstemp(suffix=".zip.part", dir=folder)
+        os.close(fd)
+        try:
+            _write_zip(tmp_path, file_paths, level, folder)
+            os.replace(tmp_path, bundle_path)
+        except Exception:
+            _remove_quietly(tmp_path)
+            raise
+
+        logger.info(f"Built bundle {bundle_path} ({len(file_paths)} files, level {level}) "
+                    f"in {time.perf_counter() - start:.2f}s")
+        prune_bundles(folder, keep=bundle_path)
+        return bundle_path
+
+
+def _named(bundle_path, name):
+    # files_<key>.zip -> files_<key>/<name>; the cached archive is only ever
+    # replaced, never rewritten in place, so a link to it stays valid
+    named_dir = os.path.splitext(bundle_path)[0]
+    named_path = os.path.join(named_dir, name)
+    if os.path.exists(named_path):
+        return named_path
+    os.makedirs(named_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".zip.part", dir=named_dir)
+    os.close(fd)
+    os.remove(tmp_path)
+    try:
+        os.link(bundle_path, tmp_path)
+    except OSError:
+        shutil.copyfile(bundle_path, tmp_path)
+    os.replace(tmp_path, named_path)
+    return named_path
+
+
+def prune_bundles(folder=BUNDLE_FOLDER, max_bytes=BUNDLE_CACHE_MAX_BYTES, keep=None, grace=BUNDLE_PRUNE_GRACE):
+    """Drop least recently used bundles until the cache fits in ``max_bytes``.
+    Bundles used in the last ``grace`` seconds are kept either way."""
+    cutoff = time.time() - grace
+    entries = []
+    total = 0
+    for entry in os.scandir(folder):
+        if entry.is_file() and entry.name.endswith(".zip"):
+            st = entry.stat()
+            # Named copies count too when the disk couldn't hard-link them
+            size = st.st_size + _copies_size(os.path.splitext(entry.path)[0], st.st_ino)
+            entries.append((st.st_mtime, size, entry.path))
+            total += size
+    for mtime, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep and os.path.samefile(path, keep):
+            continue
+        if mtime > cutoff:
+            break  # sorted by mtime: everything from here on is recent
+        _remove_quietly(path)
+        shutil.rmtree(os.path.splitext(path)[0], ignore_errors=True)
+        total -= size
+
+
+def _copies_size(named_dir, inode):
+    try:
+        return sum(entry.stat().st_size for entry in os.scandir(named_dir)
+                   if entry.is_file() and entry.stat().st_ino != inode)
+    except OSError:
+        return 0
+
+
+def _member_names(file_paths):
+    names, seen = [], set()
+    for path in file_paths:
+        name = os.path.basename(path)
+        base, ext = os.path.splitext(name)
+        counter = 1
+        while name.lower() in seen:
+            name = f"{base} ({counter}){ext}"
+            counter += 1
+        seen.add(name.lower())
+        names.append(name)
+    return names
+
+
+def _compress_member(path, level, tmp_dir):
+    """Deflate one file into a temp file. Returns (tmp_path, method, crc, csize, usize)."""
+    stored = level == 0 or os.path.splitext(path)[1].lower() in STORED_EXTENSIONS
+    fd, tmp_path = tempfile.mkstemp(suffix=".member", dir=tmp_dir)
+    crc = 0
+    usize = 0
+    try:
+        with open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+            compressor = None if stored else zlib.compressobj(level, zlib.DEFLATED, -15)
+            while True:
+                data = src.read(READ_CHUNK)
+                if not data:
+                    break
+                crc = zlib.crc32(data, crc)
+                usize += len(data)
+                dst.write(data if stored else compressor.compress(data))
+            if compressor:
+                dst.write(compressor.flush())
+        csize = os.path.getsize(tmp_path)
+    except Exception:
+        _remove_quietly(tmp_path)
+        raise
+    method = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+    return tmp_path, method, crc, csize, usize
+
+
+def _dos_datetime(mtime):
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+def _write_zip64(out_path, file_paths, names, level):
+    # Too many members or too big for plain zip headers; let zipfile write
+    # the ZIP64 records.
+    with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED, compresslevel=level, allowZip64=True) as zf:
+        for path, name in zip(file_paths, names):
+            zf.write(path, name)
+
+
+def _zip32_size(names, members):
+    """Bytes the hand-built archive would take; every offset in it is below this."""
+    size = 22  # end of central directory
+    for name, (_, _, _, csize, _) in zip(names, members):
+        encoded = len(name.encode("utf-8"))
+        size += 30 + encoded + csize + 46 + encoded  # local header, data, central record
+    return size
+
+
+def _write_zip(out_path, file_paths, level, tmp_dir):
+    # zipfile can't take pre-compressed members, so members are deflated in
+    # parallel into temp files and the archive is assembled by hand.
+    names = _member_names(file_paths)
+    if len(file_paths) > _ZIP32_MAX_ENTRIES or any(os.path.getsize(p) >= _ZIP32_LIMIT for p in file_paths):
+        _write_zip64(out_path, file_paths, names, level)
+        return
+
+    with ThreadPoolExecutor(max_workers=BUNDLE_WORKERS) as executor:
+        futures = [executor.submit(_compress_member, p, level, tmp_dir) for p in file_paths]
+        members = []
+        try:
+            for future in futures:
+                members.append(future.result())
+        except Exception:
+            for future in futures:
+                if future.done() and not future.exception():
+                    _remove_quietly(future.result()[0])
+            raise
+
+    if _zip32_size(names, members) > _ZIP32_LIMIT:
+        # Headers, stored members or deflate growth push an offset past 4 GiB
+        for member in members:
+            _remove_quietly(member[0])
+        _write_zip64(out_path, file_paths, names, level)
+        return
+
+    central = []
+    try:
+        with open(out_path, "wb") as out:
+            for path, name, (tmp_path, method, crc, csize, usize) in zip(file_paths, names, members):
+                offset = out.tell()
+                encoded = name.encode("utf-8")
+                dos_time, dos_date = _dos_datetime(os.path.getmtime(path))
+                out.write(struct.pack("<IHHHHHIIIHH", 0x04034B50, 20, 0x0800, method,
+                                      dos_time, dos_date, crc, csize, usize, len(encoded), 0))
+                out.write(encoded)
+                with open(tmp_path, "rb") as member:
+                    shutil.copyfileobj(member, out, READ_CHUNK)
+                central.append(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, _MADE_BY_UNIX, 20, 0x0800, method,
+                                           dos_time, dos_date, crc, csize, usize, len(encoded), 0, 0, 0, 0,
+                                           0o644 << 16, offset) + encoded)
+
+            cd_offset = out.tell()
+            for record in central:
+                out.write(record)
+            cd_size = out.tell() - cd_offset
+            out.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(central), len(central),
+                                  cd_size, cd_offset, 0))
+    finally:
+        for member in members:
+            _remove_quietly(member[0])
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,185 @@
+# cli.py
+# Headless entry point for scripts, cron jobs and servers without a display.
+# Never imports tkinter/ttkbootstrap; heavier modules (smtplib, fpdf) are only
+# imported by the command that needs them, so startup stays fast.
+#
+#   python cli.py --user admin send "Jane Doe" jane@example.com ebook.pdf --price 20
+#   python cli.py --user admin receipts list --search jane
+#   python cli.py --user admin receipts batch orders.jsonl --workers 4
+#   python cli.py --user admin import ~/exports/*.zip
+#   python cli.py --user admin clients search jane
+#
+# The password is read from DPO_PASSWORD, or asked for on the terminal. A
+# successful login is remembered for a few hours (see auth.SESSION_TTL);
+# DPO_SESSION can carry a token for jobs that run as another account.
+import argparse
+import getpass
+import os
+import sys
+
+from logger import logger
+
+FILES_FOLDER = os.path.join("assets", "files")
+TEMPLATES_FOLDER = "templates"
+
+
+def _resolve_file(path):
+    """Accept a real path or the name of a file in the library."""
+    if os.path.isfile(path):
+        return path
+    in_library = os.path.join(FILES_FOLDER, path)
+    if os.path.isfile(in_library):
+        return in_library
+    raise SystemExit(f"error: no such file: {path}")
+
+
+def _login(args):
+    import auth
+
+    # A valid session token (from DPO_SESSION or the last login) skips bcrypt
+    token = os.environ.get("DPO_SESSION")
+    username = auth.verify_session(token) if token else auth.load_session()
+    if username and (not args.user or args.user == username):
+        return username
+
+    if not args.user:
+        raise SystemExit("error: log in with --user (or set DPO_USER)")
+    password = os.environ.get("DPO_PASSWORD")
+    if password is None:
+        password = getpass.getpass(f"Password for {args.user}: ")
+    if not auth.authenticate_user(args.user, password):
+        logger.warning(f"CLI login failed for {args.user}")
+        raise SystemExit("error: invalid username or password")
+    try:
+        auth.save_session(auth.issue_session(args.user))
+    except OSError as e:
+        logger.warning(f"Could not save login session: {e}")
+    return args.user
+
+
+def cmd_send(args):
+    from bulk_sender import deliver, make_job
+    from emailer import smtp_pool
+
+    files = [_resolve_file(p) for p in args.files]
+    if args.template:
+        from email_templates import get_template
+
+        try:
+            get_template(args.template, TEMPLATES_FOLDER)  # fail now rather than after the receipt
+        except OSError as e:
+            raise SystemExit(f"error: can't read template {args.template}: {e}")
+    job = make_job(args.name, args.email, files, args.price, args.tax, args.discount, template=args.template,
+                   send_receipt=not args.no_receipt, bundle=args.bundle)
+    try:
+        receipt = deliver(job)
+    finally:
+        smtp_pool.close()
+    print(f"Sent {len(files)} file(s) to {args.email}; receipt: {receipt}")
+    return 0
+
+
+def cmd_receipts_list(args):
+    import receipt_ledger
+
+    for row in receipt_ledger.list_receipts(args.search, limit=args.limit):
+        total = "" if row["total"] is None else f"{row['total']:.2f}"
+        print("\t".join([row["created"], row["receipt_num"], row["client"], row["email"] or "", total,
+                         row["filename"]]))
+    return 0
+
+
+def cmd_receipts_batch(args):
+    import receipt_batch
+
+    argv = [args.manifest] + (["--workers", str(args.workers)] if args.workers else [])
+    return receipt_batch.main(argv)
+
+
+def cmd_import(args):
+    from library import FileLibrary
+
+    os.makedirs(FILES_FOLDER, exist_ok=True)
+    failed = 0
+    for result in FileLibrary(FILES_FOLDER).import_files(args.paths):
+        if result["error"] is not None:
+            failed += 1
+            print(f"failed  {result['source']}: {result['error']}", file=sys.stderr)
+        elif result["added"]:
+            print(f"added   {result['name']}")
+        else:
+            print(f"exists  {result['name']} (same content as {result['source']})")
+    return 1 if failed else 0
+
+
+def _print_clients(rows):
+    for row in rows:
+        print("\t".join([str(row["id"]), row["date"] or "", row["name"], row["email"] or "", row["files"] or ""]))
+
+
+def cmd_clients_list(args):
+    import client_data
+
+    _print_clients(client_data.load_client_page(args.after, args.limit))
+    return 0
+
+
+def cmd_clients_search(args):
+    import client_data
+
+    _print_clients(client_data.find_clients(args.query))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Digital Product Organizer, without the GUI.")
+    parser.add_argument("--user", default=os.environ.get("DPO_USER"), help="login name (default: $DPO_USER)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    send = commands.add_parser("send", help="send an order and record it")
+    send.add_argument("name")
+    send.add_argument("email")
+    send.add_argument("files", nargs="+", help="paths, or names of files in assets/files")
+    send.add_argument("--price", type=float, default=0)
+    send.add_argument("--tax", type=float, default=0)
+    send.add_argument("--discount", type=float, default=0)
+    send.add_argument("--template", help="email body from templates/ (.txt, or .html with a text part)")
+    send.add_argument("--no-receipt", action="store_true", help="don't attach the receipt")
+    send.add_argument("--bundle", action="store_true", help="send the files as one zip")
+    send.set_defaults(func=cmd_send)
+
+    receipts = commands.add_parser("receipts", help="list or regenerate receipts")
+    receipt_commands = receipts.add_subparsers(dest="receipts_command", required=True)
+    listing = receipt_commands.add_parser("list", help="list receipts from the ledger")
+    listing.add_argument("--search", help="filter by client, email or file name")
+    listing.add_argument("--limit", type=int, default=None)
+    listing.set_defaults(func=cmd_receipts_list)
+    batch = receipt_commands.add_parser("batch", help="generate receipts for a manifest of orders")
+    batch.add_argument("manifest", help="orders as JSON lines, a clients.csv-style CSV, or 'store'")
+    batch.add_argument("--workers", type=int, default=None)
+    batch.set_defaults(func=cmd_receipts_batch)
+
+    imports = commands.add_parser("import", help="add files to the library")
+    imports.add_argument("paths", nargs="+")
+    imports.set_defaults(func=cmd_import)
+
+    clients = commands.add_parser("clients", help="list or search saved clients")
+    client_commands = clients.add_subparsers(dest="clients_command", required=True)
+    listing = client_commands.add_parser("list", help="list saved orders in id order")
+    listing.add_argument("--after", type=int, default=0, help="start after this id")
+    listing.add_argument("--limit", type=int, default=100)
+    listing.set_defaults(func=cmd_clients_list)
+    search = client_commands.add_parser("search", help="find orders by name or email")
+    search.add_argument("query")
+    search.set_defaults(func=cmd_clients_search)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    _login(args)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,377 @@
 # client_data.py
+# Client orders live in clients.db (SQLite, WAL mode) with stable row ids,
+# so edits and deletes touch one indexed row instead of rewriting a CSV.
+# An existing clients.csv is imported automatically the first time; after
+# that the file is stale, and readers given its path use the store instead
+# (see is_client_csv). export_csv() writes a fresh copy on request.
 import csv
+import json
 import os
+import threading
 from config import CLIENT_CSV
-import csv
 from datetime import datetime
 
+from db import connect
+import metrics
+
+CLIENT_DB = "clients.db"
+EMAILS_CSV = os.path.join("assets", "client", "emails.csv")
+FIELDS = ["name", "email", "date", "files"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id    INTEGER PRIMARY KEY,
+    name  TEXT NOT NULL,
+    email TEXT NOT NULL,
+    date  TEXT,
+    files TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_clients_name ON clients (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_clients_email ON clients (email);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+-- Dedup index over assets/client/emails.csv; name_key is whitespace-collapsed
+-- and casefolded, email lowercased
+CREATE TABLE IF NOT EXISTS saved_emails (
+    name_key TEXT NOT NULL,
+    email    TEXT NOT NULL,
+    name     TEXT NOT NULL,
+    UNIQUE (name_key, email)
+);
+CREATE INDEX IF NOT EXISTS idx_saved_emails_email ON saved_emails (email);
+"""
+
+
+_imported = set()
+
+
+def _connect(path=CLIENT_DB):
+    conn = connect(path, _SCHEMA)
+    if path not in _imported:
+        import_csv(conn)
+        _imported.add(path)
+    return conn
+
+
+@metrics.timed("csv.import_clients")
+def import_csv(conn, csv_path=CLIENT_CSV):
+    """Load clients.csv into the store once; later runs are no-ops."""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_imported'").fetchone():
+        return 0
+    rows = []
+    if os.path.exists(csv_path):
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                rows.append(tuple(row.get(field) or "" for field in FIELDS))
+    with conn:
+        # Take the write lock before re-checking, so a second process starting
+        # at the same moment waits here instead of importing the rows twice
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_imported'").fetchone():
+            return 0
+        conn.executemany("INSERT INTO clients (name, email, date, files) VALUES (?, ?, ?, ?)", rows)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('csv_imported', ?)",
+                     (datetime.now().isoformat(timespec="seconds"),))
+    return len(rows)
+
+
+def is_client_csv(path):
+    """True if ``path`` is the clients.csv the store was imported from."""
+    try:
+        return os.path.samefile(path, CLIENT_CSV)
+    except OSError:
+        return False
+
+
+def _files_str(files):
+    return files if isinstance(files, str) else "|".join(files)
+
+
+def save_client_info(name, email, files, date=None):
+    """Add an order to the store and return its row id."""
+    now = date or datetime.now().strftime('%Y-%m-%d %H:%M')
+    conn = _connect()
+    with conn:
+        cur = conn.execute("INSERT INTO clients (name, email, date, files) VALUES (?, ?, ?, ?)",
+                           (name, email, now, _files_str(files)))
+    repository.note_client(name)
+    return cur.lastrowid
+
+
+def get_client(client_id):
+    return _connect().execute("SELECT * FROM clients WHERE id = ?", (client_id,)).fetchone()
+
 
-def save_client_info(name, email, files):
-    os.makedirs("assets/client", exist_ok=True)
-    filepath = "clients.csv"
+def update_client(client_id, name, email, files):
+    conn = _connect()
+    with conn:
+        conn.execute("UPDATE clients SET name = ?, email = ?, files = ? WHERE id = ?",
+                     (name, email, _files_str(files), client_id))
+    repository.forget_names()
 
-    file_str = "|".join(files)
-    now = datetime.now().strftime('%Y-%m-%d %H:%M')
 
-    file_is_new = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
+def delete_client(client_id):
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM clients WHERE id = ?", (client_id,))
+    repository.forget_names()
+
+
+def load_client_records():
+    """All orders as rows with ``id``, ``name``, ``email``, ``date`` and ``files``."""
+    return _connect().execute("SELECT * FROM clients ORDER BY id").fetchall()
+
+
+@metrics.timed("clients.load_page")
+def load_client_page(after_id=0, limit=200):
+    """Rows with id > ``after_id``, in id order: keyset paging over the primary key."""
+    return _connect().execute(
+        "SELECT * FROM clients WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)).fetchall()
+
+
+def load_client_page_before(before_id, limit=200):
+    """Up to ``limit`` rows with id < ``before_id``, in id order."""
+    rows = _connect().execute(
+        "SELECT * FROM clients WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit)).fetchall()
+    rows.reverse()
+    return rows
+
+
+def count_clients():
+    return _connect().execute("SELECT COUNT(*) FROM clients").fetchone()[0]
 
-    with open(filepath, "a", newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=["name", "email", "date", "files"])
-        if file_is_new:
-            writer.writeheader()
-        writer.writerow({
-            "name": name,
-            "email": email,
-            "date": now,
-            "files": file_str
-        })
 
 def load_clients():
-    if not os.path.exists(CLIENT_CSV):
-        return []
-    with open(CLIENT_CSV, newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        next(reader, None)  # skip header
-        return list(reader)
+    return [[row["name"], row["email"], row["date"], row["files"]] for row in load_client_records()]
+
+
+def client_names():
+    return repository.client_names()
+
+
+def find_clients(query):
+    like = f"%{query}%"
+    return _connect().execute(
+        "SELECT * FROM clients WHERE name LIKE ? OR email LIKE ? ORDER BY id", (like, like)).fetchall()
+
+
+@metrics.timed("csv.export_clients")
+def export_csv(csv_path=CLIENT_CSV):
+    """Write the store out as a clients.csv (atomically) for other tools."""
+    tmp_path = csv_path + ".tmp"
+    with open(tmp_path, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for row in load_client_records():
+            writer.writerow([row[field] for field in FIELDS])
+    os.replace(tmp_path, csv_path)
+    return csv_path
+
+
+def save_sent_email(name, email):
+    """Remember ``email`` for ``name``; returns False if it was already saved."""
+    return repository.add_email(name, email)
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def normalize_name(name):
+    return " ".join(name.split())
+
+
+def _name_key(name):
+    return normalize_name(name).casefold()
+
+
+_MISSING = ("missing",)
+
+
+def _email_row(name, email):
+    """(name key, email, name) as stored in saved_emails, or None without an email."""
+    email = normalize_email(email)
+    if not email:
+        return None
+    name = normalize_name(name)
+    return _name_key(name), email, name
+
+
+def _stat_signature(*paths):
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+
+class ClientRepository:
+    """Client names and saved emails shared by the app.
+
+    Saved emails are indexed in clients.db (table saved_emails, unique on
+    normalized name and email), so a duplicate check is one indexed insert
+    in any process. emails.csv is still written for people who open it by
+    hand; rows appended to it outside the app are picked up from the byte
+    offset recorded in the store. Client names are cached in memory and
+    reloaded only when the store's files change.
+    """
+
+    def __init__(self, db_path=CLIENT_DB, emails_path=EMAILS_CSV):
+        self.db_path = db_path
+        self.emails_path = emails_path
+        self._lock = threading.RLock()
+        self._names = set()
+        self._names_sig = None
+        self._emails_sig = None    # emails.csv as last synced by this process
+        self._all_emails = None
+        self._all_emails_sig = None
+
+    def _db_signature(self):
+        # In WAL mode commits land in the -wal file before being checkpointed
+        return _stat_signature(self.db_path, self.db_path + "-wal")
+
+    def _ensure_names(self):
+        sig = self._db_signature()
+        if sig != self._names_sig:
+            rows = _connect(self.db_path).execute("SELECT DISTINCT name FROM clients")
+            self._names = {row["name"].strip() for row in rows if row["name"].strip()}
+            self._names_sig = self._db_signature()
+
+    def _csv_signature(self):
+        try:
+            st = os.stat(self.emails_path)
+        except OSError:
+            return _MISSING
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _ensure_emails(self):
+        """The store, with saved_emails caught up on emails.csv. Just a stat
+        when the file hasn't changed since this process last looked."""
+        conn = _connect(self.db_path)
+        sig = self._csv_signature()
+        if sig != self._emails_sig:
+            with self._lock, conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._sync_emails(conn)
+        return conn
+
+    def _sync_emails(self, conn):
+        # Runs inside a write transaction, so only one process reads the tail
+        row = conn.execute("SELECT value FROM meta WHERE key = 'emails_csv'").fetchone()
+        state = json.loads(row["value"]) if row else {"ino": None, "offset": 0, "cols": [0, 1]}
+        sig = self._csv_signature()
+        if sig is _MISSING:
+            if state["ino"] is not None:
+                conn.execute("DELETE FROM saved_emails")
+                self._save_state(conn, {"ino": None, "offset": 0, "cols": [0, 1]})
+            self._emails_sig = sig
+            return
+        ino, _, size = sig
+        if state["ino"] != ino or size < state["offset"]:
+            # A different or truncated file: index it again from the start
+            conn.execute("DELETE FROM saved_emails")
+            state = {"ino": ino, "offset": 0, "cols": [0, 1]}
+        if size > state["offset"]:
+            self._read_emails_from(conn, state)
+            self._save_state(conn, state)
+        self._emails_sig = sig
+
+    @staticmethod
+    def _save_state(conn, state):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('emails_csv', ?)", (json.dumps(state),))
+
+    @metrics.timed("csv.load_emails")
+    def _read_emails_from(self, conn, state):
+        with open(self.emails_path, "rb") as f:
+            f.seek(state["offset"])
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # leave a half-written last line for next time
+        lines = data[:end].decode("utf-8", errors="replace").splitlines()
+        if state["offset"] == 0 and lines:
+            header = [h.strip().lower() for h in next(csv.reader(lines[:1]))]
+            if "email" in header:
+                state["cols"] = [header.index("name") if "name" in header else 0, header.index("email")]
+                lines = lines[1:]
+        name_col, email_col = state["cols"]
+        rows = (_email_row(row[name_col], row[email_col]) for row in csv.reader(lines)
+                if len(row) > max(name_col, email_col))
+        conn.executemany("INSERT OR IGNORE INTO saved_emails (name_key, email, name) VALUES (?, ?, ?)",
+                         (row for row in rows if row is not None))
+        state["offset"] += end
+
+    def add_email(self, name, email):
+        """Append (name, email) to emails.csv unless an equivalent pair exists.
+
+        The UNIQUE index decides, and the append happens inside the same
+        write transaction, so concurrent processes never write a pair twice.
+        """
+        row = _email_row(name, email)
+        if row is None:
+            return False
+        conn = _connect(self.db_path)
+        with self._lock, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._sync_emails(conn)
+            if conn.execute("INSERT OR IGNORE INTO saved_emails (name_key, email, name) VALUES (?, ?, ?)",
+                            row).rowcount == 0:
+                return False
+
+            os.makedirs(os.path.dirname(self.emails_path) or ".", exist_ok=True)
+            file_is_new = not os.path.exists(self.emails_path) or os.path.getsize(self.emails_path) == 0
+            with open(self.emails_path, "a", newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=["name", "email"])
+                if file_is_new:
+                    writer.writeheader()
+                writer.writerow({"name": row[2], "email": row[1]})
+
+            saved = conn.execute("SELECT value FROM meta WHERE key = 'emails_csv'").fetchone()
+            cols = json.loads(saved["value"])["cols"] if saved and not file_is_new else [0, 1]
+            st = os.stat(self.emails_path)
+            self._save_state(conn, {"ino": st.st_ino, "offset": st.st_size, "cols": cols})
+            self._emails_sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+            self._all_emails = None
+            return True
+
+    def client_names(self):
+        with self._lock:
+            self._ensure_names()
+            return sorted(self._names)
+
+    def canonical_name(self, name):
+        row = self._ensure_emails().execute(
+            "SELECT name FROM saved_emails WHERE name_key = ? ORDER BY rowid LIMIT 1", (_name_key(name),)).fetchone()
+        return row["name"] if row else None
+
+    def emails_for(self, name):
+        rows = self._ensure_emails().execute(
+            "SELECT email FROM saved_emails WHERE name_key = ? ORDER BY email", (_name_key(name),))
+        return [row["email"] for row in rows]
+
+    def all_emails(self):
+        conn = self._ensure_emails()
+        with self._lock:
+            sig = self._db_signature()
+            if self._all_emails is None or sig != self._all_emails_sig:
+                self._all_emails = [row["email"] for row in
+                                    conn.execute("SELECT DISTINCT email FROM saved_emails ORDER BY email")]
+                self._all_emails_sig = sig
+            return list(self._all_emails)
+
+    def note_client(self, name):
+        """Record a client row written through this module."""
+        with self._lock:
+            if self._names_sig is None:
+                return  # never loaded; the next read loads everything anyway
+            if name.strip():
+                self._names.add(name.strip())
+            self._names_sig = self._db_signature()
+
+    def forget_names(self):
+        """Edits and deletes can drop a name entirely; re-query on next read."""
+        with self._lock:
+            self._names_sig = None
+
+
+repository = ClientRepository()
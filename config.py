@@ -1,53 +1,116 @@
 # config.py
+#
+# The one place email settings are read and written. email_config.json has
+# been written with several key spellings over time (sender/smtp/port from
+# the first-run prompt, smtp_server/smtp_port from the settings window,
+# EMAIL_SENDER/... by older builds); email_config() maps them all onto
+# sender, password, smtp_server and smtp_port.
 
 import os
 import json
-from tkinter import simpledialog, messagebox, Tk
+import threading
 
 CONFIG_FILE = "email_config.json"
+DEFAULT_SMTP_SERVER = "smtp.gmail.com"
+DEFAULT_SMTP_PORT = 587
 
-def prompt_email_config():
-    root = Tk()
-    root.withdraw()  # Hide main window
+_KEY_ALIASES = {
+    "sender": ("sender", "EMAIL_SENDER", "email"),
+    "password": ("password", "EMAIL_PASSWORD"),
+    "smtp_server": ("smtp_server", "SMTP_SERVER", "smtp"),
+    "smtp_port": ("smtp_port", "SMTP_PORT", "port"),
+}
 
-    messagebox.showinfo("Email Setup", "Please enter your email login for sending files.")
-    email = simpledialog.askstring("Email", "Enter your email address:")
-    password = simpledialog.askstring("Password", "Enter your email password:", show='*')
+_cache = {}  # path -> ((mtime_ns, size), settings)
+_cache_lock = threading.Lock()
 
-    if not email or not password:
-        messagebox.showerror("Error", "Email and password are required.")
-        root.destroy()
-        raise Exception("Email config aborted")
 
-    config = {
-        "sender": email,
-        "password": password,
-        "smtp": "smtp.gmail.com",
-        "port": 587
-    }
+def normalize_email_config(data):
+    settings = {}
+    for key, aliases in _KEY_ALIASES.items():
+        settings[key] = next((data[a] for a in aliases if data.get(a) not in (None, "")), None)
+    settings["sender"] = settings["sender"] or ""
+    settings["password"] = settings["password"] or ""
+    settings["smtp_server"] = settings["smtp_server"] or DEFAULT_SMTP_SERVER
+    try:
+        settings["smtp_port"] = int(settings["smtp_port"] or DEFAULT_SMTP_PORT)
+    except (TypeError, ValueError):
+        settings["smtp_port"] = DEFAULT_SMTP_PORT
+    return settings
 
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=4)
 
-    root.destroy()
-    return config
+def email_config(path=CONFIG_FILE):
+    """Normalized email settings. The file is parsed once and only read
+    again after it changes on disk, so callers can ask on every send."""
+    try:
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return dict(cached[1])
+        data = {}
+        if stamp is not None:
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+        settings = normalize_email_config(data if isinstance(data, dict) else {})
+        _cache[path] = (stamp, settings)
+        return dict(settings)
 
 
-def get_email_config():
-    if not os.path.exists(CONFIG_FILE):
-        return prompt_email_config()
+def save_email_config(sender, password, smtp_server=DEFAULT_SMTP_SERVER, smtp_port=DEFAULT_SMTP_PORT,
+                      path=CONFIG_FILE):
+    settings = normalize_email_config({"sender": sender, "password": password,
+                                       "smtp_server": smtp_server, "smtp_port": smtp_port})
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(settings, f, indent=4)
+    os.replace(tmp_path, path)
+    with _cache_lock:
+        _cache.pop(path, None)
+    return settings
 
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
 
+def is_email_config_missing(path=CONFIG_FILE):
+    settings = email_config(path)
+    return not settings["sender"] or not settings["password"]
 
-# Load config values as variables (use lowercase keys)
-config = get_email_config()
 
-EMAIL_SENDER = config.get("sender", "")
-EMAIL_PASSWORD = config.get("password", "")
-SMTP_SERVER = config.get("smtp", "smtp.gmail.com")
-SMTP_PORT = config.get("port", 587)
+def prompt_email_config(parent=None):
+    # Imported here so headless tools (cli.py, cron jobs) never load Tk
+    from tkinter import simpledialog, messagebox, Tk
+
+    # Reuse the app's interpreter when there is one
+    root = parent
+    if root is None:
+        root = Tk()
+        root.withdraw()  # Hide main window
+
+    try:
+        messagebox.showinfo("Email Setup", "Please enter your email login for sending files.", parent=root)
+        email = simpledialog.askstring("Email", "Enter your email address:", parent=root)
+        password = simpledialog.askstring("Password", "Enter your email password:", show='*', parent=root)
+
+        if not email or not password:
+            messagebox.showerror("Error", "Email and password are required.", parent=root)
+            raise Exception("Email config aborted")
+
+        return save_email_config(email, password)
+    finally:
+        if parent is None:
+            root.destroy()
+
+
+def get_email_config(prompt=True, parent=None):
+    if prompt and is_email_config_missing():
+        return prompt_email_config(parent)
+    return email_config()
+
 
 # Other static paths
 RECEIPTS_FOLDER = "receipts"
@@ -0,0 +1,43 @@
+# db.py
+# Shared SQLite plumbing for the local stores (receipt ledger, client store).
+import os
+import sqlite3
+import threading
+import time
+
+_local = threading.local()
+
+# Switching a new database to WAL needs it to itself and doesn't wait on the
+# busy timeout, so processes opening it at the same moment retry instead.
+WAL_RETRIES = 100
+WAL_RETRY_DELAY = 0.05
+
+
+def connect(path, schema):
+    """Return this thread's connection to ``path``, creating the schema on
+    first use. sqlite3 connections can't be shared between threads, so each
+    thread keeps its own."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        _enable_wal(conn)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(schema)
+        conns[path] = conn
+    return conn
+
+
+def _enable_wal(conn):
+    for attempt in range(WAL_RETRIES):
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            return
+        except sqlite3.OperationalError:
+            if attempt == WAL_RETRIES - 1:
+                raise
+            time.sleep(WAL_RETRY_DELAY)
@@ -0,0 +1,266 @@
+# dir_watcher.py
+# Watches folders for files being added, removed or changed by anyone (this
+# app, Explorer, another tool) and reports just those names, so views can be
+# patched instead of rebuilt from a full directory scan.
+#
+# Linux uses inotify through ctypes; everywhere else (and if inotify can't be
+# set up) each folder is polled and diffed against its last snapshot.
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+
+from logger import logger
+
+POLL_INTERVAL = 2.0   # seconds between snapshots for the polling backend
+SETTLE_DELAY = 0.3    # a name is reported once it has been quiet this long
+
+IGNORED_SUFFIXES = (".part", "-journal", "-wal", "-shm", ".tmp")
+
+# inotify(7)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+               | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _ignored(name, suffixes):
+    if name.startswith(".") or name.endswith(IGNORED_SUFFIXES):
+        return True
+    return bool(suffixes) and not name.lower().endswith(suffixes)
+
+
+def snapshot(folder, suffixes=None):
+    """``{name: (size, mtime_ns)}`` for the files directly in ``folder``."""
+    entries = {}
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if _ignored(entry.name, suffixes):
+                    continue
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries[entry.name] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue  # removed between listing and stat
+    except OSError:
+        pass
+    return entries
+
+
+def diff_snapshots(old, new):
+    """Yield ``(kind, name)`` for every difference between two snapshots."""
+    for name in old.keys() - new.keys():
+        yield "removed", name
+    for name, stamp in new.items():
+        previous = old.get(name)
+        if previous is None:
+            yield "added", name
+        elif previous != stamp:
+            yield "changed", name
+
+
+class _PollingBackend:
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._snapshots = {}
+
+    def add(self, folder, suffixes):
+        self._snapshots[folder] = (suffixes, snapshot(folder, suffixes))
+
+    def read(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        changes = []
+        for folder, (suffixes, old) in self._snapshots.items():
+            new = snapshot(folder, suffixes)
+            changes.extend((folder, kind, name) for kind, name in diff_snapshots(old, new))
+            self._snapshots[folder] = (suffixes, new)
+        return changes
+
+    def close(self):
+        self._snapshots.clear()
+
+
+class _InotifyBackend:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._folders = {}  # wd -> (folder, suffixes)
+
+    def add(self, folder, suffixes):
+        wd = self._add_watch(self._fd, os.fsencode(folder), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed: {os.strerror(errno)}", folder)
+        self._folders[wd] = (folder, suffixes)
+
+    def read(self, timeout):
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changes = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # The kernel dropped events; callers must rescan everything
+                changes.extend((folder, "rescan", None) for folder, _ in self._folders.values())
+                continue
+            watched = self._folders.get(wd)
+            if watched is None:
+                continue
+            folder, suffixes = watched
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                logger.warning(f"Watched folder {folder} was removed or moved")
+                if mask & IN_IGNORED:
+                    del self._folders[wd]
+                continue
+            if not name or mask & IN_ISDIR or _ignored(name, suffixes):
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                changes.append((folder, "added", name))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                changes.append((folder, "removed", name))
+            else:
+                changes.append((folder, "changed", name))
+        return changes
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class DirWatcher:
+    """Reports file changes in watched folders on ``events``.
+
+    Events are ``(folder, kind, name)`` tuples where kind is "added",
+    "removed" or "changed", or ``(folder, "rescan", None)`` when changes were
+    lost and the folder has to be reloaded. Bursts of events for one name
+    (a file being written, a rename over an existing file) are merged and
+    reported once the name has been quiet for ``settle`` seconds.
+    """
+
+    def __init__(self, settle=SETTLE_DELAY, poll_interval=POLL_INTERVAL, use_inotify=True):
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.events = queue.Queue()
+        self._watches = []
+        self._backend = None
+        self._pending = {}  # (folder, name) -> [kind, last_seen]
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def backend_name(self):
+        return "inotify" if isinstance(self._backend, _InotifyBackend) else "polling"
+
+    def watch(self, folder, suffixes=None):
+        """Watch ``folder``; ``suffixes`` optionally limits it to those file types."""
+        if suffixes:
+            suffixes = tuple(s.lower() for s in suffixes)
+        self._watches.append((folder, suffixes))
+        if self._backend is not None:
+            self._backend.add(folder, suffixes)
+
+    def start(self):
+        self._backend = self._make_backend()
+        self._thread = threading.Thread(target=self._run, name="dir-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {len(self._watches)} folder(s) with {self.backend_name}")
+
+    def stop(self, timeout=2):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._backend is not None:
+            self._backend.close()
+
+    def _make_backend(self):
+        if self.use_inotify and sys.platform.startswith("linux"):
+            try:
+                backend = _InotifyBackend()
+                try:
+                    for folder, suffixes in self._watches:
+                        backend.add(folder, suffixes)
+                except OSError:
+                    backend.close()
+                    raise
+                return backend
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable, falling back to polling: {e}")
+        backend = _PollingBackend(self.poll_interval)
+        for folder, suffixes in self._watches:
+            backend.add(folder, suffixes)
+        return backend
+
+    def _run(self):
+        while not self._stopping.is_set():
+            timeout = self.settle if self._pending else 0.5
+            try:
+                changes = self._backend.read(timeout)
+            except Exception as e:
+                logger.error(f"Directory watcher failed: {e}")
+                changes = [(folder, "rescan", None) for folder, _ in self._watches]
+                self._stopping.wait(self.poll_interval)
+            now = time.monotonic()
+            for folder, kind, name in changes:
+                if kind == "rescan":
+                    self.events.put((folder, kind, None))
+                    continue
+                seen = self._pending.get((folder, name))
+                if seen is None:
+                    self._pending[(folder, name)] = [kind, now]
+                else:
+                    # A name created in this burst stays "added" even if it
+                    # was written to afterwards
+                    if not (kind == "changed" and seen[0] == "added"):
+                        seen[0] = kind
+                    seen[1] = now
+            self._flush(now)
+
+    def _flush(self, now):
+        for key, (kind, last_seen) in list(self._pending.items()):
+            if now - last_seen < self.settle:
+                continue
+            del self._pending[key]
+            folder, name = key
+            exists = os.path.isfile(os.path.join(folder, name))
+            if not exists:
+                kind = "removed"
+            elif kind == "removed":
+                kind = "changed"  # removed and put back (e.g. replaced by a rename)
+            self.events.put((folder, kind, name))
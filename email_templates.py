@@ -0,0 +1,166 @@
+# email_templates.py
+# Email bodies from templates/. Each file is parsed once into literal text
+# and placeholder slots, kept until its mtime or size changes, so rendering
+# an order is one join no matter how many go out. Placeholders look like
+# {name}; write {{ and }} for literal braces. An .html template is sent as
+# HTML with a plain-text alternative made from the same file.
+#
+#   {name} {email} {files} {file_list} {file_count} {price} {tax}
+#   {discount} {total} {receipt_num} {date}
+import html
+import os
+import re
+import threading
+from datetime import datetime
+from html.parser import HTMLParser
+
+TEMPLATES_FOLDER = "templates"
+TEMPLATE_SUFFIXES = (".txt", ".html", ".htm")
+
+_TOKEN_RE = re.compile(r"\{\{|\}\}|\{(\w+)\}")
+
+_cache = {}  # path -> ((mtime_ns, size), Template)
+_listing = {}  # folder -> (mtime_ns, names)
+_lock = threading.Lock()
+
+
+def _compile(source):
+    """Split ``source`` into ((literal, field), ...); field is None at the end."""
+    parts, literal, pos = [], [], 0
+    for match in _TOKEN_RE.finditer(source):
+        literal.append(source[pos:match.start()])
+        pos = match.end()
+        if match.group(1) is None:
+            literal.append(match.group(0)[0])  # {{ -> {, }} -> }
+            continue
+        parts.append(("".join(literal), match.group(1)))
+        literal = []
+    literal.append(source[pos:])
+    parts.append(("".join(literal), None))
+    return tuple(parts)
+
+
+def _fill(parts, values):
+    out = []
+    for literal, field in parts:
+        out.append(literal)
+        if field is not None:
+            value = values.get(field)
+            out.append("{" + field + "}" if value is None else value)
+    return "".join(out)
+
+
+class _TextExtractor(HTMLParser):
+    """Readable plain text from a template's HTML, for the text/plain part."""
+
+    BREAKS = {"br", "p", "div", "tr", "li", "h1", "h2", "h3", "h4", "ul", "ol", "table"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks = []
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("style", "script", "head", "title"):
+            self.skip += 1
+        elif tag in self.BREAKS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("style", "script", "head", "title"):
+            self.skip = max(0, self.skip - 1)
+        elif tag in self.BREAKS:
+            self.chunks.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.chunks.append(re.sub(r"\s+", " ", data))
+
+    def text(self):
+        lines = [line.strip() for line in "".join(self.chunks).splitlines()]
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+
+def html_to_text(source):
+    parser = _TextExtractor()
+    parser.feed(source)
+    parser.close()
+    return parser.text()
+
+
+class Template:
+    __slots__ = ("name", "source", "is_html", "fields", "_parts", "_text_parts")
+
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.is_html = name.lower().endswith((".html", ".htm"))
+        self._parts = _compile(source)
+        # The text alternative of an HTML template is compiled once as well
+        self._text_parts = _compile(html_to_text(source)) if self.is_html else self._parts
+        self.fields = frozenset(field for _, field in self._parts if field is not None)
+
+    def render(self, values):
+        """Return ``(text, html)``; html is None for plain-text templates."""
+        text = _fill(self._text_parts, values)
+        if not self.is_html:
+            return text, None
+        escaped = {field: html.escape(values[field]).replace("\n", "<br>\n")
+                   for field in self.fields if values.get(field) is not None}
+        return text, _fill(self._parts, escaped)
+
+
+def get_template(name, folder=TEMPLATES_FOLDER):
+    """The compiled template ``name``; re-read only after the file changes."""
+    path = os.path.join(folder, os.path.basename(name))
+    st = os.stat(path)  # FileNotFoundError for a template that's gone
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    with open(path, encoding="utf-8") as f:
+        template = Template(os.path.basename(name), f.read())
+    with _lock:
+        _cache[path] = (stamp, template)
+    return template
+
+
+def available_templates(folder=TEMPLATES_FOLDER):
+    """Template file names, listed again only when the folder changes."""
+    try:
+        stamp = os.stat(folder).st_mtime_ns
+    except OSError:
+        return []
+    with _lock:
+        cached = _listing.get(folder)
+        if cached is not None and cached[0] == stamp:
+            return list(cached[1])
+    names = sorted((entry.name for entry in os.scandir(folder)
+                    if entry.name.lower().endswith(TEMPLATE_SUFFIXES) and entry.is_file()), key=str.lower)
+    with _lock:
+        _listing[folder] = (stamp, names)
+    return list(names)
+
+
+def template_values(name, email, files, price=0, tax=0, discount=0, receipt_num="", date=None):
+    """Placeholder values for one order, all as strings."""
+    file_names = [os.path.basename(path) for path in files]
+    price, tax, discount = float(price or 0), float(tax or 0), float(discount or 0)
+    return {
+        "name": name,
+        "email": email,
+        "files": ", ".join(file_names),
+        "file_list": "\n".join(f"- {file_name}" for file_name in file_names),
+        "file_count": str(len(file_names)),
+        "price": f"${price:.2f}",
+        "tax": f"${tax:.2f}",
+        "discount": f"${discount:.2f}",
+        "total": f"${price + tax - discount:.2f}",
+        "receipt_num": receipt_num or "",
+        "date": date or datetime.now().strftime("%Y-%m-%d"),
+    }
+
+
+def render_template(template_name, values, folder=TEMPLATES_FOLDER):
+    return get_template(template_name, folder).render(values)
@@ -1,56 +1,264 @@
-import smtplib
+# emailer.py
+# smtplib and the email package are imported on first send, not at startup.
 import os
-from email.message import EmailMessage  # <-- add this line
+import threading
+import time
 from logger import logger
-from config import EMAIL_SENDER, EMAIL_PASSWORD, SMTP_SERVER, SMTP_PORT
+from config import email_config
+import metrics
 
 
-# emailer.py
-from utils import load_email_config
+# Sessions idle longer than this are checked with NOOP before reuse;
+# most providers drop idle connections after a few minutes anyway.
+SMTP_IDLE_CHECK = 30
+SMTP_MAX_IDLE = 240
+SMTP_POOL_SIZE = 4
+SMTP_TIMEOUT = 60
+
+# Orders whose attachments add up to more than this are streamed instead of
+# being built in memory with EmailMessage.
+STREAM_THRESHOLD = 10 * 1024 * 1024
+
+
+class SMTPSessionPool:
+    """Keeps authenticated SMTP sessions alive between sends.
+
+    Sessions are handed out with ``session()`` and returned to the pool when
+    the block exits cleanly. A session that raised is closed instead of
+    being reused.
+    """
+
+    def __init__(self, host=None, port=None, user=None, password=None,
+                 max_size=SMTP_POOL_SIZE, max_idle=SMTP_MAX_IDLE, idle_check=SMTP_IDLE_CHECK,
+                 timeout=SMTP_TIMEOUT, starttls=True):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.idle_check = idle_check
+        self.timeout = timeout
+        self.starttls = starttls
+        self._idle = []  # list of (smtp, last_used)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _settings(self):
+        # Read per connection, so saving new settings applies to the next session
+        config = email_config()
+        return (
+            self.host or config["smtp_server"],
+            int(self.port or config["smtp_port"]),
+            self.user if self.user is not None else config["sender"],
+            self.password if self.password is not None else config["password"],
+        )
+
+    def _connect(self, settings=None):
+        import smtplib
+
+        settings = settings or self._settings()
+        host, port, user, password = settings
+        logger.info("Connecting to SMTP server %s:%s", host, port)
+        with metrics.span("smtp.connect"):
+            smtp = smtplib.SMTP(host, port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                with metrics.span("smtp.starttls"):
+                    smtp.starttls()
+            if user:
+                with metrics.span("smtp.auth"):
+                    smtp.login(user, password)
+        except Exception:
+            _close_quietly(smtp)
+            raise
+        smtp.pool_settings = settings  # sessions aren't reused once the settings change
+        return smtp
+
+    def _is_alive(self, smtp, last_used):
+        import smtplib
+
+        idle = time.monotonic() - last_used
+        if idle > self.max_idle:
+            return False
+        if idle < self.idle_check:
+            return True
+        try:
+            code, _ = smtp.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        return code == 250
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            settings = self._settings()
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    smtp, last_used = self._idle.pop()
+                if getattr(smtp, "pool_settings", settings) == settings and self._is_alive(smtp, last_used):
+                    return smtp
+                logger.info("Dropping stale SMTP session")
+                _close_quietly(smtp)
+            return self._connect(settings)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, smtp, reusable=True):
+        try:
+            if reusable:
+                with self._lock:
+                    self._idle.append((smtp, time.monotonic()))
+            else:
+                _close_quietly(smtp)
+        finally:
+            self._slots.release()
+
+    def session(self):
+        return _PooledSession(self)
 
+    def run(self, action, retries=1):
+        """Call ``action(smtp)`` on a pooled session, reconnecting once if the
+        server hung up on us (dropped socket or a 421 reply)."""
+        for attempt in range(retries + 1):
+            smtp = self.acquire()
+            try:
+                result = action(smtp)
+            except Exception as e:
+                self.release(smtp, reusable=False)
+                if attempt < retries and _is_disconnect(e):
+                    logger.warning("SMTP session lost (%s), reconnecting", e)
+                    continue
+                raise
+            self.release(smtp)
+            return result
 
+    def send_message(self, msg, retries=1):
+        return self.run(lambda smtp: _upload(smtp.send_message, msg), retries)
 
-config = load_email_config()
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            _close_quietly(smtp)
 
-EMAIL_SENDER = config.get("EMAIL_SENDER")
-EMAIL_PASSWORD = config.get("EMAIL_PASSWORD")
-SMTP_SERVER = config.get("SMTP_SERVER", "smtp.gmail.com")
-SMTP_PORT = config.get("SMTP_PORT", 587)
 
+class _PooledSession:
+    def __init__(self, pool):
+        self.pool = pool
+        self.smtp = None
 
+    def __enter__(self):
+        self.smtp = self.pool.acquire()
+        return self.smtp
 
+    def __exit__(self, exc_type, exc, tb):
+        self.pool.release(self.smtp, reusable=exc_type is None)
+        self.smtp = None
+        return False
 
-def send_files_with_receipt(to_email, client_name, file_paths, receipt_path=None, body=None):
-    msg = EmailMessage()
-    msg['Subject'] = f"Your Files and Receipt - {client_name}"
-    msg['From'] = EMAIL_SENDER
-    msg['To'] = to_email
 
+def _is_disconnect(exc):
+    import smtplib
+
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, ConnectionError)):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code == 421
+
+
+def _upload(send, *args):
+    # MAIL FROM through the end of DATA, on an already connected session
+    with metrics.span("smtp.upload"):
+        return send(*args)
+
+
+def _close_quietly(smtp):
+    try:
+        smtp.quit()
+    except Exception:
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+
+# Shared by the GUI send paths and batch callers.
+smtp_pool = SMTPSessionPool()
+
+
+def send_files_with_receipt(to_email, client_name, file_paths, receipt_path=None, body=None, pool=None,
+                            stream=None, html=None):
+    """Email ``file_paths`` (plus the receipt, if any) to ``to_email``.
+
+    ``html``, if given, is sent alongside the plain ``body`` as a
+    multipart/alternative so mail clients can pick either.
+
+    ``stream`` forces streaming on or off; by default orders larger than
+    STREAM_THRESHOLD are base64 encoded chunk by chunk straight into the
+    SMTP DATA command so memory use stays flat regardless of order size.
+    """
+    subject = f"Your Files and Receipt - {client_name}"
     # Use provided email body or fallback
-    msg.set_content(body or f"Hi {client_name},\n\nAttached are your files and receipt.\nThank you!")
+    text = body or f"Hi {client_name},\n\nAttached are your files and receipt.\nThank you!"
 
     try:
         all_attachments = list(file_paths)  # copy to avoid modifying original list
         if receipt_path:
             all_attachments.append(receipt_path)
 
+        attachments = []
         for path in all_attachments:
             if not path:
                 logger.warning("Skipping NoneType attachment path")
                 continue
-            with open(path, 'rb') as f:
-                content = f.read()
-                filename = os.path.basename(path)
-                msg.add_attachment(content, maintype='application', subtype='octet-stream', filename=filename)
+            attachments.append(path)
+
+        size = sum(os.path.getsize(p) for p in attachments)
+        if stream is None:
+            stream = size > STREAM_THRESHOLD
+        started = time.monotonic()
+
+        pool = pool or smtp_pool
+        sender = email_config()["sender"]
+        if stream:
+            from mime_stream import iter_message, send_streamed
+
+            pool.run(lambda smtp: _upload(
+                send_streamed, smtp, sender, [to_email],
+                iter_message(sender, to_email, subject, text, attachments, html=html)))
+        else:
+            from email.message import EmailMessage
 
-        logger.info(f"Connecting to SMTP server {SMTP_SERVER}:{SMTP_PORT}")
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as smtp:
-            smtp.starttls()
-            smtp.login(EMAIL_SENDER, EMAIL_PASSWORD)
-            smtp.send_message(msg)
+            with metrics.span("email.build"):
+                msg = EmailMessage()
+                msg['Subject'] = subject
+                msg['From'] = sender
+                msg['To'] = to_email
+                msg.set_content(text)
+                if html:
+                    msg.add_alternative(html, subtype="html")
+                for path in attachments:
+                    with open(path, 'rb') as f:
+                        content = f.read()
+                        filename = os.path.basename(path)
+                        msg.add_attachment(content, maintype='application', subtype='octet-stream',
+                                           filename=filename)
+            pool.send_message(msg)
 
-        logger.info(f"Email sent successfully to {to_email}")
+        elapsed = time.monotonic() - started
+        metrics.observe("email.send", elapsed)
+        metrics.count("email.sent")
+        metrics.count("email.bytes", size)
+        logger.info("Email sent successfully to %s%s", to_email, " (streamed)" if stream else "",
+                    extra={"client": client_name, "email": to_email,
+                           "receipt": receipt_path and os.path.basename(receipt_path),
+                           "bytes": size, "seconds": round(elapsed, 3)})
 
     except Exception as e:
-        logger.exception(f"Failed to send email to {to_email}: {e}")
+        metrics.count("email.failed")
+        logger.exception("Failed to send email to %s: %s", to_email, e,
+                         extra={"client": client_name, "email": to_email})
         raise
@@ -0,0 +1,126 @@
+# file_catalog.py
+# In-memory catalog of assets/files with a trigram index for fast
+# substring search. Built once with os.scandir and then kept up to date
+# entry by entry instead of rescanning the folder.
+import os
+import threading
+from datetime import datetime
+
+import metrics
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class FileEntry:
+    __slots__ = ("name", "path", "size", "mtime")
+
+    def __init__(self, name, path, size, mtime):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+
+    @property
+    def size_kb(self):
+        return f"{round(self.size / 1024, 2)} KB"
+
+    @property
+    def modified(self):
+        return datetime.fromtimestamp(self.mtime).strftime('%Y-%m-%d %H:%M')
+
+
+class FileCatalog:
+    def __init__(self, folder):
+        self.folder = folder
+        self._entries = {}
+        self._index = {}  # trigram -> set of names
+        self._sorted = None  # names in display order, rebuilt lazily after changes
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    @metrics.timed("files.scan")
+    def load(self):
+        """(Re)build the catalog from a single directory scan."""
+        with self._lock:
+            self._entries, self._index = {}, {}
+            if os.path.isdir(self.folder):
+                for entry in os.scandir(self.folder):
+                    # Dotfiles are the library's own bookkeeping (.store, .library.json)
+                    if not entry.name.startswith(".") and entry.is_file():
+                        st = entry.stat()
+                        self._add(FileEntry(entry.name, entry.path, st.st_size, st.st_mtime))
+            self.loaded = True
+
+    def _add(self, entry):
+        self._sorted = None
+        self._entries[entry.name] = entry
+        for gram in _trigrams(entry.name.lower()):
+            self._index.setdefault(gram, set()).add(entry.name)
+
+    def _discard(self, name):
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        self._sorted = None
+        for gram in _trigrams(name.lower()):
+            names = self._index.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._index[gram]
+
+    def update(self, name):
+        """Re-stat one file (added or changed); drops it if it's gone."""
+        path = os.path.join(self.folder, name)
+        with self._lock:
+            self._discard(name)
+            if name.startswith("."):
+                return None
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            if not os.path.isfile(path):
+                return None
+            entry = FileEntry(name, path, st.st_size, st.st_mtime)
+            self._add(entry)
+            return entry
+
+    def remove(self, name):
+        with self._lock:
+            self._discard(name)
+
+    def rename(self, old_name, new_name):
+        with self._lock:
+            self._discard(old_name)
+        return self.update(new_name)
+
+    def get(self, name):
+        return self._entries.get(name)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def search(self, query=""):
+        """Entries whose name contains ``query`` (case-insensitive), sorted by name."""
+        with self._lock:
+            if not self.loaded:
+                self.load()
+            if self._sorted is None:
+                self._sorted = sorted(self._entries, key=str.lower)
+            query = query.lower().strip()
+            if not query:
+                names = self._sorted
+            elif len(query) < 3:
+                names = [n for n in self._sorted if query in n.lower()]
+            else:
+                grams = sorted((self._index.get(g, set()) for g in _trigrams(query)), key=len)
+                candidates = set(grams[0]).intersection(*grams[1:]) if grams else set()
+                if len(candidates) * 8 > len(self._sorted):
+                    # Broad match: filtering the sorted list beats sorting the hits
+                    names = [n for n in self._sorted if n in candidates and query in n.lower()]
+                else:
+                    names = sorted((n for n in candidates if query in n.lower()), key=str.lower)
+            return [self._entries[n] for n in names]
@@ -1,19 +1,29 @@
 import os
-import shutil
 import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap import Treeview
 from tkinter import filedialog, messagebox
 
-from emailer import send_files_with_receipt
-from receipt_generator import create_pdf_receipt
-from client_data import save_client_info
+import client_data
+from client_data import save_sent_email
+from bulk_sender import make_job
+from outbox import Outbox
+from bundler import BUNDLE_LEVEL
+import email_templates
+import receipt_ledger
+import metrics
+from file_catalog import FileCatalog
+from library import FileLibrary
+from importer import ImportBatch
+from dir_watcher import DirWatcher
 from utils import validate_client_inputs, ensure_dir, load_email_config, save_email_config
 from logger import logger
 from datetime import datetime
 
 import csv
+import queue
+import threading
 
 
 
@@ -25,6 +35,39 @@ EMAILS_CSV_PATH = os.path.join(BASE_DIR, "assets", "client", "emails.csv")
 RECEIPT_FOLDER = os.path.join(BASE_DIR, "receipts")
 FILES_FOLDER = os.path.join(BASE_DIR, "assets", "files")
 
+CLIENT_PAGE_SIZE = 200
+CLIENT_WINDOW_PAGES = 3
+FILE_SEARCH_DELAY_MS = 150
+WATCH_POLL_MS = 250
+IMPORT_POLL_MS = 100
+DIAGNOSTICS_REFRESH_MS = 1000
+
+
+def _name_index(children, name):
+    """Where ``name`` goes among tree iids kept in case-insensitive name order."""
+    key = name.lower()
+    lo, hi = 0, len(children)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if children[mid].lower() < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _receipt_sort_key(column, value):
+    if column == "total":
+        return (value != "", float(value.lstrip("$")) if value else 0.0)
+    return value
+
 
 
 class DPOApp:
@@ -40,14 +83,35 @@ class DPOApp:
         self.tax_var = ttk.StringVar()
         self.discount_var = ttk.StringVar()
         self.send_receipt_var = ttk.BooleanVar(value=False)
+        self.bundle_var = ttk.BooleanVar(value=False)
+        self.bundle_level_var = ttk.IntVar(value=BUNDLE_LEVEL)
 
         self.template_var = ttk.StringVar()
 
         self.email_body_text = None  # Will be assigned later
 
         ensure_dir(FILES_FOLDER)
+        ensure_dir(RECEIPT_FOLDER)
+        self.library = FileLibrary(FILES_FOLDER)
+        self.file_catalog = FileCatalog(FILES_FOLDER)
+        self.watcher = DirWatcher()
+        self.watcher.watch(FILES_FOLDER)
+        self.watcher.watch(RECEIPT_FOLDER, suffixes=(".pdf",))
+        self.file_search_job = None
+        self.receipt_filter_job = None
+        self.outbox_status_var = ttk.StringVar()
+        self.outbox_message = ""
+        self.outbox = Outbox()
+        self.bulk_resends = []  # one {"pending", "total", "failures"} per Bulk Resend click
         self.build_ui()
 
+        self.outbox.start()
+        self.watcher.start()
+        # Fold files from before the library into the store (only hashes untracked files)
+        threading.Thread(target=self.library.adopt_existing, name="library-adopt", daemon=True).start()
+        self.root.after(250, self.poll_outbox)
+        self.root.after(WATCH_POLL_MS, self.poll_watcher)
+
     def build_ui(self):
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=BOTH, expand=True, padx=10, pady=10)
@@ -72,11 +136,16 @@ class DPOApp:
         self.notebook.add(self.receipts_tab, text="Client Receipts")
         self.build_receipts_tab(self.receipts_tab)
 
+        # Diagnostics tab
+        self.diagnostics_tab = ttk.Frame(self.notebook)
+        self.notebook.add(self.diagnostics_tab, text="Diagnostics")
+        self.build_diagnostics_tab(self.diagnostics_tab)
+
     def build_send_tab(self, tab):
         frm = ttk.Frame(tab, padding=10)
         frm.pack(fill=BOTH, expand=True)
 
-        # Client Name (dropdown from clients.csv)
+        # Client Name (dropdown from the client store)
         ttk.Label(frm, text="Client Name:").grid(row=0, column=0, sticky=W, padx=5, pady=2)
         self.client_name_combo = ttk.Combobox(frm, textvariable=self.client_name_var,
                                               values=self.get_client_names(),
@@ -95,6 +164,9 @@ class DPOApp:
         self.template_combo = ttk.Combobox(frm, textvariable=self.template_var,
                                            values=self.get_available_templates(),
                                            state="readonly", width=40)
+        # The listing is cached until templates/ changes, so this is cheap
+        self.template_combo.configure(
+            postcommand=lambda: self.template_combo.configure(values=self.get_available_templates()))
         self.template_combo.grid(row=2, column=1, sticky=EW, padx=5, pady=2)
         self.template_combo.bind("<<ComboboxSelected>>", self.load_selected_template)
 
@@ -117,6 +189,14 @@ class DPOApp:
         ttk.Checkbutton(frm, text="Send Receipt with Files", variable=self.send_receipt_var).grid(
             row=8, column=1, columnspan=2, sticky=W, padx=5, pady=5)
 
+        # Bundle checkbox + compression level
+        bundle_frame = ttk.Frame(frm)
+        bundle_frame.grid(row=8, column=0, sticky=W, padx=5, pady=5)
+        ttk.Checkbutton(bundle_frame, text="Send as Bundle (.zip)", variable=self.bundle_var).pack(side=LEFT)
+        ttk.Label(bundle_frame, text="Level:").pack(side=LEFT, padx=(10, 2))
+        ttk.Spinbox(bundle_frame, from_=0, to=9, width=3, textvariable=self.bundle_level_var,
+                    state="readonly").pack(side=LEFT)
+
         # Upload & Send Buttons
         ttk.Button(frm, text="Upload Files", bootstyle=INFO, command=self.add_files_from_system).grid(
             row=9, column=0, pady=10, padx=5, sticky=W)
@@ -138,6 +218,8 @@ class DPOApp:
         self.file_tree.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side="right", fill="y")
 
+        ttk.Label(frm, textvariable=self.outbox_status_var).grid(row=11, column=0, columnspan=2, sticky=W, padx=5)
+
         frm.columnconfigure(1, weight=1)
         frm.rowconfigure(4, weight=1)
         frm.rowconfigure(10, weight=1)
@@ -146,13 +228,7 @@ class DPOApp:
         self.template_combo['values'] = self.get_available_templates()
 
     def get_available_templates(self):
-        templates = []
-        templates_dir = "templates"
-        if os.path.exists(templates_dir):
-            for file in os.listdir(templates_dir):
-                if file.endswith(".txt"):
-                    templates.append(file)
-        return templates
+        return email_templates.available_templates()
 
     def load_selected_template(self, event=None):
         template_name = self.template_var.get().strip()
@@ -160,28 +236,20 @@ class DPOApp:
             messagebox.showwarning("No Template", "Please select a valid template.")
             return
 
-        template_path = os.path.join("templates", template_name)
-        if os.path.exists(template_path):
-            try:
-                with open(template_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    self.email_body_text.delete("1.0", tk.END)
-                    self.email_body_text.insert(tk.END, content)
-            except Exception as e:
-                messagebox.showerror("Template Error", f"Failed to load template:\n{e}")
-        else:
-            messagebox.showerror("Template Not Found", f"Could not find:\n{template_path}")
+        try:
+            template = email_templates.get_template(template_name)
+        except FileNotFoundError:
+            messagebox.showerror("Template Not Found", f"Could not find:\n{template_name}")
+            self.template_combo['values'] = self.get_available_templates()
+            return
+        except Exception as e:
+            messagebox.showerror("Template Error", f"Failed to load template:\n{e}")
+            return
+        self.email_body_text.delete("1.0", tk.END)
+        self.email_body_text.insert(tk.END, template.source)
 
     def get_client_names(self):
-        names = set()
-        if os.path.exists("clients.csv"):
-            with open("clients.csv", newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    name = row.get("name", "").strip()
-                    if name:
-                        names.add(name)
-        return sorted(names)
+        return client_data.client_names()
 
     def update_email_for_selected_name(self, event=None):
         selected_name = self.client_name_var.get()
@@ -193,14 +261,26 @@ class DPOApp:
             self.client_email_var.set("")
 
     def build_receipts_tab(self, tab):
+        # Filter frame
+        filter_frame = ttk.Frame(tab)
+        filter_frame.pack(fill=X, pady=(10, 0), padx=10)
+
+        ttk.Label(filter_frame, text="Filter:").pack(side=LEFT)
+        self.receipt_filter_var = ttk.StringVar()
+        filter_entry = ttk.Entry(filter_frame, textvariable=self.receipt_filter_var)
+        filter_entry.pack(side=LEFT, padx=5, fill=X, expand=True)
+        filter_entry.bind("<KeyRelease>", self.schedule_receipt_filter)
+
         tree_frame = ttk.Frame(tab)
         tree_frame.pack(fill=BOTH, expand=True, pady=10)
 
-        self.receipts_tree = Treeview(tree_frame, columns=("filename", "modified"), show="headings", height=15)
-        self.receipts_tree.heading("filename", text="Receipt File")
-        self.receipts_tree.heading("modified", text="Modified")
-        self.receipts_tree.column("filename", width=300)
-        self.receipts_tree.column("modified", width=150)
+        self.receipt_sort = ("created", True)
+        self.receipts_tree = Treeview(tree_frame, columns=("filename", "client", "total", "created"),
+                                      show="headings", height=15)
+        for column, text, width in (("filename", "Receipt File", 300), ("client", "Client", 150),
+                                    ("total", "Total", 80), ("created", "Created", 150)):
+            self.receipts_tree.heading(column, text=text, command=lambda c=column: self.sort_receipts(c))
+            self.receipts_tree.column(column, width=width)
         self.receipts_tree.pack(side=LEFT, fill=BOTH, expand=True)
 
         scrollbar = ttk.Scrollbar(tree_frame, orient=VERTICAL, command=self.receipts_tree.yview)
@@ -210,27 +290,74 @@ class DPOApp:
         btn_frame = ttk.Frame(tab)
         btn_frame.pack(pady=5)
 
-        btn_frame = ttk.Frame(tab)
-        btn_frame.pack(pady=5)
-
         ttk.Button(btn_frame, text="Refresh", command=self.refresh_receipts_tab).pack(side=LEFT, padx=5)
         ttk.Button(btn_frame, text="Open", bootstyle=INFO, command=self.open_selected_receipt).pack(side=LEFT, padx=5)
         ttk.Button(btn_frame, text="Delete", bootstyle=DANGER, command=self.delete_selected_receipt).pack(side=LEFT, padx=5)
         ttk.Button(btn_frame, text="Email", bootstyle=PRIMARY, command=self.email_selected_receipt).pack(side=LEFT, padx=5)
 
+        # Index receipts made before the ledger existed (only runs once)
+        added = receipt_ledger.backfill(RECEIPT_FOLDER)
+        if added:
+            logger.info("Indexed %d existing receipt(s) into the ledger", added)
+        # ...and forget receipts deleted while the app was closed
+        removed = receipt_ledger.prune_missing(RECEIPT_FOLDER)
+        if removed:
+            logger.info("Dropped %d receipt(s) missing from %s from the ledger", removed, RECEIPT_FOLDER)
+
+        self.refresh_receipts_tab()
 
+    def sort_receipts(self, column):
+        current, descending = self.receipt_sort
+        self.receipt_sort = (column, not descending if column == current else False)
         self.refresh_receipts_tab()
 
+    def schedule_receipt_filter(self, event=None):
+        # Debounce like the file search: only query the ledger once typing pauses
+        if self.receipt_filter_job is not None:
+            self.root.after_cancel(self.receipt_filter_job)
+        self.receipt_filter_job = self.root.after(FILE_SEARCH_DELAY_MS, self.refresh_receipts_tab)
+
     def refresh_receipts_tab(self):
+        self.receipt_filter_job = None
         self.receipts_tree.delete(*self.receipts_tree.get_children())
-        if not os.path.exists(RECEIPT_FOLDER):
+        sort, descending = self.receipt_sort
+        rows = receipt_ledger.list_receipts(self.receipt_filter_var.get().strip(), sort, descending)
+        for row in rows:
+            self.receipts_tree.insert("", "end", iid=row["filename"], values=self.receipt_values(row))
+
+    @staticmethod
+    def receipt_values(row):
+        total = "" if row["total"] is None else f"${row['total']:.2f}"
+        return row["filename"], row["client"], total, row["created"][:16]
+
+    def show_receipt_row(self, row):
+        """Insert or update one ledger row in the Receipts tree at its sorted
+        position, without reloading the rest."""
+        if row is None:
+            return
+        tree = self.receipts_tree
+        filename = row["filename"]
+        if tree.exists(filename):
+            tree.delete(filename)
+        search = self.receipt_filter_var.get().strip().lower()
+        if search and not any(search in (row[c] or "").lower() for c in ("client", "email", "filename")):
             return
 
-        for filename in os.listdir(RECEIPT_FOLDER):
-            path = os.path.join(RECEIPT_FOLDER, filename)
-            if os.path.isfile(path) and filename.endswith(".pdf"):
-                mod_time = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M")
-                self.receipts_tree.insert("", "end", values=(filename, mod_time))
+        values = self.receipt_values(row)
+        column, descending = self.receipt_sort
+        if column not in tree["columns"]:
+            column = "created"
+        key = _receipt_sort_key(column, values[tree["columns"].index(column)])
+        children = tree.get_children()
+        lo, hi = 0, len(children)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = _receipt_sort_key(column, tree.set(children[mid], column))
+            if (other > key) if descending else (other < key):
+                lo = mid + 1
+            else:
+                hi = mid
+        tree.insert("", lo, iid=filename, values=values)
 
     def open_selected_receipt(self):
         selected = self.receipts_tree.selection()
@@ -242,7 +369,7 @@ class DPOApp:
             try:
                 os.startfile(path)
             except Exception as e:
-                logger.error(f"Failed to open receipt: {e}")
+                logger.error("Failed to open receipt: %s", e, extra={"receipt": filename})
                 messagebox.showerror("Error", f"Could not open receipt:\n{e}")
 
     def delete_selected_receipt(self):
@@ -255,11 +382,13 @@ class DPOApp:
         confirm = messagebox.askyesno("Confirm Delete", f"Delete {filename}?")
         if confirm:
             try:
-                os.remove(path)
-                logger.info(f"Deleted receipt: {path}")
-                self.refresh_receipts_tab()
+                if os.path.exists(path):
+                    os.remove(path)
+                receipt_ledger.delete_receipt(filename)
+                logger.info("Deleted receipt: %s", path, extra={"receipt": filename})
+                self.receipts_tree.delete(selected[0])
             except Exception as e:
-                logger.error(f"Error deleting receipt '{path}': {e}")
+                logger.error("Error deleting receipt '%s': %s", path, e, extra={"receipt": filename})
                 messagebox.showerror("Error", f"Could not delete receipt:\n{e}")
 
     def email_selected_receipt(self):
@@ -270,10 +399,14 @@ class DPOApp:
 
         filename = self.receipts_tree.item(selected[0])["values"][0]
         receipt_path = os.path.join(RECEIPT_FOLDER, filename)
-        name = filename.split("_")[0]  # Extract name from filename
-
-        # Load saved emails
-        emails = self.get_saved_emails_for_client(name)
+        entry = receipt_ledger.get_receipt(filename)
+        name = entry["client"] if entry else filename.split("_")[0]
+
+        # The address the receipt went to first, then any other saved ones
+        emails = receipt_ledger.emails_for_client(name)
+        if entry and entry["email"]:
+            emails = [entry["email"]] + [e for e in emails if e != entry["email"]]
+        emails += [e for e in self.get_saved_emails_for_client(name) if e not in emails]
         if not emails:
             messagebox.showwarning("No Email Found", f"No saved emails found for {name}.")
             return
@@ -283,24 +416,12 @@ class DPOApp:
         if not email:
             return
 
-        try:
-            send_files_with_receipt(email, name, [], receipt_path)
-            logger.info(f"Emailed receipt {filename} to {email}")
-            messagebox.showinfo("Success", f"Receipt sent to {email}")
-        except Exception as e:
-            logger.exception(f"Failed to send receipt: {e}")
-            messagebox.showerror("Send Failed", f"Could not send receipt:\n{e}")
+        self.outbox.enqueue(make_job(name, email, [], receipt=receipt_path, record=False))
+        logger.info("Queued receipt %s for %s", filename, email,
+                    extra={"client": name, "email": email, "receipt": filename})
 
     def get_saved_emails_for_client(self, name):
-        filepath = "assets/client/emails.csv"
-        emails = []
-
-        if os.path.exists(filepath):
-            with open(filepath, newline='') as f:
-                reader = csv.DictReader(f)
-                emails = [row["email"] for row in reader if row.get("name", "").strip().lower() == name.lower()]
-
-        return sorted(set(emails))
+        return client_data.repository.emails_for(name)
 
     def ask_email_dropdown(self, name, email_options):
         popup = tk.Toplevel(self.root)
@@ -331,43 +452,183 @@ class DPOApp:
         return result["email"]
 
     def get_saved_emails(self):
-        filepath = "assets/client/emails.csv"
-        emails = []
-        if os.path.exists(filepath):
-            with open(filepath, newline='') as f:
-                reader = csv.DictReader(f)
-                emails = sorted({row["email"] for row in reader if "email" in row})
-        return emails
+        return client_data.repository.all_emails()
 
     def add_files_from_system(self):
         selected_files = filedialog.askopenfilenames(title="Select Files")
-        for original_path in selected_files:
-            filename = os.path.basename(original_path)
-            dest_path = os.path.join(FILES_FOLDER, filename)
+        if not selected_files:
+            return
+        # Copying runs in the background; the Files tab fills in as files finish
+        batch = ImportBatch(self.library, selected_files)
+        self.open_import_window(batch)
+        batch.start()
 
-            base, ext = os.path.splitext(filename)
-            counter = 1
-            while os.path.exists(dest_path):
-                dest_path = os.path.join(FILES_FOLDER, f"{base}_{counter}{ext}")
-                counter += 1
+    def open_import_window(self, batch):
+        win = tk.Toplevel(self.root)
+        win.title("Importing Files")
+        win.geometry("560x360")
+
+        total_var = ttk.StringVar(value="Starting...")
+        ttk.Label(win, textvariable=total_var).pack(anchor=W, padx=10, pady=(10, 5))
+        total_bar = ttk.Progressbar(win, maximum=100, bootstyle=SUCCESS)
+        total_bar.pack(fill=X, padx=10)
+
+        tree_frame = ttk.Frame(win)
+        tree_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        tree = Treeview(tree_frame, columns=("file", "progress"), show="headings", height=8)
+        tree.heading("file", text="File")
+        tree.heading("progress", text="Progress")
+        tree.column("file", width=380)
+        tree.column("progress", width=120, anchor="e")
+        tree.pack(side=LEFT, fill=BOTH, expand=True)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=RIGHT, fill=Y)
 
-            try:
-                shutil.copy2(original_path, dest_path)
-                logger.info(f"Added file: {dest_path}")
-            except Exception as e:
-                logger.error(f"Error copying file '{original_path}': {e}")
-                messagebox.showerror("Copy Error", f"Could not copy {filename}:\n{e}")
+        rows = {}
+        for index, path in enumerate(batch.paths):
+            rows[path] = str(index)
+            tree.insert("", "end", iid=str(index), values=(os.path.basename(path), "waiting"))
 
-        self.load_files_from_folder()
+        def cancel():
+            if state["summary"] is not None:
+                win.destroy()
+            else:
+                batch.cancel()
+                button.configure(state=DISABLED)
+                total_var.set("Cancelling...")
 
-    def load_files_from_folder(self):
-        self.file_tree.delete(*self.file_tree.get_children())
-        for filename in os.listdir(FILES_FOLDER):
-            path = os.path.join(FILES_FOLDER, filename)
-            if os.path.isfile(path):
-                size_kb = round(os.path.getsize(path) / 1024, 2)
-                self.file_tree.insert("", "end", values=(filename, f"{size_kb} KB"))
+        button = ttk.Button(win, text="Cancel", bootstyle=DANGER, command=cancel)
+        button.pack(pady=(0, 10))
+        win.protocol("WM_DELETE_WINDOW", cancel)
+
+        state = {"summary": None, "percent": {}, "done": set(), "errors": []}
 
+        def poll():
+            changed = []
+            while True:
+                try:
+                    kind, data = batch.events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "finished":
+                    state["summary"] = data
+                    continue
+                status = self.record_import_result(data, changed, state["errors"])
+                state["done"].add(data["source"])
+                if win.winfo_exists():
+                    tree.set(rows[data["source"]], "progress", status)
+            if changed:
+                self.apply_file_changes(changed)
+
+            if not win.winfo_exists():
+                # Closed mid-import: keep adding finished files to the Files tab
+                if state["summary"] is None:
+                    self.root.after(IMPORT_POLL_MS, poll)
+                return
+
+            # Only touch rows whose status moved
+            for path, (done, total) in batch.progress.items():
+                if path in state["done"] or not done and batch.phase[path] == "hashing":
+                    continue
+                percent = int(done * 100 / total) if total else 0
+                shown = f"copying {percent}%" if batch.phase[path] == "copying" else f"{percent}%"
+                if state["percent"].get(path) != shown:
+                    state["percent"][path] = shown
+                    tree.set(rows[path], "progress", shown)
+
+            total, done = batch.total_bytes, batch.done_bytes
+            total_bar["value"] = done * 100 / total if total else 100
+            summary = state["summary"]
+            if summary is None:
+                if not batch.cancelled.is_set():
+                    copying = batch.copying
+                    total_var.set(f"{len(state['done'])}/{len(rows)} files, "
+                                  f"{_format_bytes(done)} of {_format_bytes(total)} checked"
+                                  + (f", {copying} copying" if copying else ""))
+                self.root.after(IMPORT_POLL_MS, poll)
+                return
+
+            total_var.set(f"Done: {summary['added']} added, {summary['duplicates']} already in library, "
+                          f"{summary['failed']} failed, {summary['cancelled']} cancelled")
+            button.configure(text="Close", bootstyle=SECONDARY, state=NORMAL)
+            if state["errors"]:
+                messagebox.showerror("Copy Error", "Could not import:\n" + "\n".join(state["errors"]), parent=win)
+
+        self.root.after(IMPORT_POLL_MS, poll)
+
+    def record_import_result(self, result, changed, errors):
+        """Book one finished import; returns the status to show for it."""
+        if result["error"] == "cancelled":
+            return "cancelled"
+        if result["error"] is not None:
+            logger.error("Error importing file '%s': %s", result["source"], result["error"])
+            errors.append(f"{os.path.basename(result['source'])}: {result['error']}")
+            return "failed"
+        if result["added"]:
+            self.file_catalog.update(result["name"])
+            changed.append(result["name"])
+            logger.info("Added file: %s", result["name"])
+            return "done"
+        logger.info("Skipped duplicate file '%s', already stored as %s", result["source"], result["name"])
+        return f"same as {result['name']}"
+
+    @staticmethod
+    def file_row(entry):
+        return entry.name, entry.size_kb
+
+    @staticmethod
+    def files_tab_row(entry):
+        return entry.name, entry.size_kb, entry.modified
+
+    def load_files_from_folder(self, changed=()):
+        self.sync_file_tree(self.file_tree, self.file_catalog.search(), self.file_row, changed)
+
+    def apply_file_changes(self, names):
+        """Show catalog changes to ``names`` in both file trees."""
+        self.patch_file_tree(self.file_tree, self.file_catalog, names, self.file_row)
+        self.patch_file_tree(self.files_tree, self.file_catalog, names, self.files_tab_row, self.search_var.get())
+
+    @staticmethod
+    def patch_file_tree(tree, catalog, names, values, query=""):
+        """Add, update or drop just the rows for ``names`` in a tree kept in
+        name order (as sync_file_tree leaves it); other rows aren't touched."""
+        query = query.lower().strip()
+        children = list(tree.get_children())
+        for name in names:
+            entry = catalog.get(name)
+            if entry is None or query not in name.lower():
+                if tree.exists(name):
+                    tree.delete(name)
+                    children.remove(name)
+            elif tree.exists(name):
+                tree.item(name, values=values(entry))
+            else:
+                index = _name_index(children, name)
+                tree.insert("", index, iid=name, values=values(entry))
+                children.insert(index, name)
+
+    @staticmethod
+    def sync_file_tree(tree, entries, values, changed=()):
+        """Make ``tree`` show ``entries`` touching only rows that differ.
+
+        Rows already shown keep their relative (name) order, so new ones can
+        be inserted at their final index without moving anything else.
+        ``changed`` names get their values refreshed.
+        """
+        wanted = {e.name for e in entries}
+        current = tree.get_children()
+        stale = [iid for iid in current if iid not in wanted]
+        if stale:
+            tree.delete(*stale)
+        shown = set(current).difference(stale)
+        for index, entry in enumerate(entries):
+            if entry.name not in shown:
+                tree.insert("", index, iid=entry.name, values=values(entry))
+            elif entry.name in changed:
+                tree.item(entry.name, values=values(entry))
+
+    @metrics.timed("gui.send_all")
     def send_all(self):
         name = self.client_name_var.get().strip()
         email = self.client_email_var.get().strip()
@@ -387,60 +648,58 @@ class DPOApp:
             messagebox.showerror("Invalid Input", "Price, tax, and discount must be numeric.")
             return
 
-        # Get template content if selected
-        email_body = None
-        selected_template = self.template_var.get()
-        if selected_template:
-            template_path = os.path.join("templates", selected_template)
-            if os.path.exists(template_path):
-                with open(template_path, "r", encoding="utf-8") as f:
-                    email_body = f.read()
-                    # Optional: Replace placeholders
-                    email_body = email_body.replace("{name}", name)
-
-        try:
-            receipt_path = create_pdf_receipt(name, selected_files, price, tax, discount)
-            logger.info(f"Receipt created: {receipt_path}")
-
-            if self.send_receipt_var.get():
-                send_files_with_receipt(email, name, selected_files, receipt_path, body=email_body)
-                logger.info(f"Email with receipt sent to {email} for {name}")
+        # The template is filled in by the outbox worker once the receipt
+        # (and its number) exists, together with upload and bookkeeping
+        job = make_job(name, email, selected_files, price, tax, discount,
+                       template=self.template_var.get() or None,
+                       send_receipt=self.send_receipt_var.get(),
+                       bundle=self.bundle_var.get(), bundle_level=self.bundle_level_var.get())
+        self.outbox.enqueue(job)
+        logger.info("Queued order for %s (%s), %d file(s)", name, email, len(selected_files),
+                    extra={"client": name, "email": email, "files": len(selected_files)})
+        self.reset_form()
+
+    def poll_outbox(self):
+        refresh = False
+        while True:
+            try:
+                kind, job_id, job, detail = self.outbox.events.get_nowait()
+            except queue.Empty:
+                break
+
+            who = f"{job['name']} ({job['email']})"
+            if kind == "queued":
+                self.outbox_message = f"Queued order for {who}"
+            elif kind == "retry":
+                self.outbox_message = (f"Send to {who} failed, retry {detail['attempt']} "
+                                       f"in {detail['delay']}s: {detail['error']}")
+            elif kind == "done":
+                self.outbox_message = f"Sent to {who}"
+                if detail:
+                    self.show_receipt_row(receipt_ledger.get_receipt(os.path.basename(detail)))
+                if job.get("record", True):
+                    self.clients_total += 1
+                refresh = True
+                self.note_bulk_result(job_id)
+            elif kind == "failed":
+                self.outbox_message = f"Giving up on {who}"
+                if not self.note_bulk_result(job_id, f"{who}: {detail}"):
+                    messagebox.showerror("Send Failed", f"Could not send to {who}:\n{detail}")
+
+        pending = self.outbox.pending_count()
+        status = self.outbox_message
+        if pending:
+            status = f"{status}  |  {pending} pending"
+        self.outbox_status_var.set(status)
+
+        if refresh:
+            if self.clients_exhausted:
+                self.load_more_clients()  # append just the new orders
             else:
-                send_files_with_receipt(email, name, selected_files, None, body=email_body)
-                logger.info(f"Email sent to {email} for {name} (no receipt)")
+                self.update_clients_status()
+            self.client_name_combo['values'] = self.get_client_names()
 
-            save_client_info(name, email, selected_files)
-
-            # Save the sent email for future use
-            self.save_sent_email(name, email)
-
-            messagebox.showinfo("Success", "Files sent successfully.")
-            self.reset_form()
-        except Exception as e:
-            logger.exception(f"Send failed: {e}")
-            messagebox.showerror("Error", str(e))
-
-    def save_sent_email(self, name, email):
-        os.makedirs("assets/client", exist_ok=True)
-        filepath = "assets/client/emails.csv"
-        existing = set()
-
-        # Load existing to avoid duplicates
-        if os.path.exists(filepath):
-            with open(filepath, newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    existing.add((row['name'], row['email']))
-
-        # Write header if file is new or empty
-        file_is_new = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
-
-        if (name, email) not in existing:
-            with open(filepath, "a", newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=["name", "email"])
-                if file_is_new:
-                    writer.writeheader()
-                writer.writerow({"name": name, "email": email})
+        self.root.after(250, self.poll_outbox)
 
     def reset_form(self):
         self.client_name_var.set("")
@@ -449,7 +708,8 @@ class DPOApp:
         self.tax_var.set("")
         self.discount_var.set("")
         self.send_receipt_var.set(False)
-        self.load_files_from_folder()
+        self.bundle_var.set(False)
+        self.file_tree.selection_remove(*self.file_tree.selection())
         # Refresh email combo list with new emails
         self.client_email_combo['values'] = self.get_saved_emails()
 
@@ -470,12 +730,16 @@ class DPOApp:
 
         self.client_tree.pack(side=LEFT, fill=BOTH, expand=True)
 
-        scrollbar = ttk.Scrollbar(tree_frame, orient=VERTICAL, command=self.client_tree.yview)
-        self.client_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=RIGHT, fill=Y)
+        self.clients_scrollbar = ttk.Scrollbar(tree_frame, orient=VERTICAL, command=self.client_tree.yview)
+        self.client_tree.configure(yscrollcommand=self.on_clients_scroll)
+        self.clients_scrollbar.pack(side=RIGHT, fill=Y)
+
+        self.clients_status_var = ttk.StringVar()
+        ttk.Label(tab, textvariable=self.clients_status_var).pack(side=BOTTOM, anchor=W, padx=5)
 
         ttk.Button(tab, text="Refresh", command=self.load_clients).pack(side=LEFT, padx=5)
         ttk.Button(tab, text="Resend Selected", bootstyle=SUCCESS, command=self.resend_selected).pack(side=LEFT, padx=5)
+        ttk.Button(tab, text="Bulk Resend", bootstyle=SUCCESS, command=self.bulk_resend_selected).pack(side=LEFT, padx=5)
 
         ttk.Button(tab, text="Add Client", bootstyle=PRIMARY, command=self.open_add_client_window).pack(side=LEFT, padx=5)
         ttk.Button(tab, text="Delete Selected", bootstyle=DANGER, command=self.delete_selected_client).pack(side=LEFT, padx=5)
@@ -485,18 +749,87 @@ class DPOApp:
         self.load_clients()
 
     def load_clients(self):
+        # The tree holds a sliding window of at most CLIENT_WINDOW_PAGES pages
+        # of rows: scrolling near either edge fetches the next page by keyset
+        # on the store's row ids and evicts one from the other end, so Tk
+        # items stay bounded however long the order history is.
         self.client_tree.delete(*self.client_tree.get_children())
-        if not os.path.exists("clients.csv"):
+        self.clients_first_id = self.clients_last_id = 0
+        self.clients_at_start = True
+        self.clients_exhausted = False
+        self.clients_page_pending = False
+        self.clients_total = client_data.count_clients()  # kept current by adds and deletes
+        self.load_more_clients()
+
+    def load_more_clients(self):
+        self.clients_page_pending = False
+        rows = client_data.load_client_page(self.clients_last_id, CLIENT_PAGE_SIZE)
+        first, _ = self.client_tree.yview()
+        before = len(self.client_tree.get_children())
+        for row in rows:
+            self.client_tree.insert("", "end", iid=str(row["id"]),
+                                    values=(row["name"], row["email"], row["date"], row["files"]))
+        if rows:
+            self.clients_last_id = rows[-1]["id"]
+            if not before:
+                self.clients_first_id = rows[0]["id"]
+        self.clients_exhausted = len(rows) < CLIENT_PAGE_SIZE
+        evicted = self.trim_clients(from_top=True)
+        if evicted:
+            # Keep the same rows on screen after the ones above them are gone
+            total = len(self.client_tree.get_children())
+            self.client_tree.yview_moveto(max(0.0, (first * before - evicted) / total))
+        self.update_clients_status()
+
+    def load_previous_clients(self):
+        self.clients_page_pending = False
+        rows = client_data.load_client_page_before(self.clients_first_id, CLIENT_PAGE_SIZE)
+        first, _ = self.client_tree.yview()
+        before = len(self.client_tree.get_children())
+        for row in reversed(rows):
+            self.client_tree.insert("", 0, iid=str(row["id"]),
+                                    values=(row["name"], row["email"], row["date"], row["files"]))
+        if rows:
+            self.clients_first_id = rows[0]["id"]
+        self.clients_at_start = len(rows) < CLIENT_PAGE_SIZE
+        self.trim_clients(from_top=False)
+        if rows:
+            total = len(self.client_tree.get_children())
+            self.client_tree.yview_moveto((first * before + len(rows)) / total)
+        self.update_clients_status()
+
+    def trim_clients(self, from_top):
+        """Evict rows beyond the window from one end; returns how many went."""
+        children = self.client_tree.get_children()
+        excess = len(children) - CLIENT_PAGE_SIZE * CLIENT_WINDOW_PAGES
+        if excess <= 0:
+            return 0
+        if from_top:
+            self.client_tree.delete(*children[:excess])
+            self.clients_first_id = int(children[excess])
+            self.clients_at_start = False
+        else:
+            self.client_tree.delete(*children[-excess:])
+            self.clients_last_id = int(children[-excess - 1])
+            self.clients_exhausted = False
+        return excess
+
+    def update_clients_status(self):
+        shown = len(self.client_tree.get_children())
+        self.clients_status_var.set(f"Showing {shown} of {self.clients_total} orders" if shown else
+                                    f"{self.clients_total} orders")
+
+    def on_clients_scroll(self, first, last):
+        self.clients_scrollbar.set(first, last)
+        if self.clients_page_pending:
             return
-
-        with open("clients.csv", newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                name = row.get('name', "")
-                email = row.get('email', "")
-                date = row.get('date', "")
-                files = row.get('files', "")
-                self.client_tree.insert("", "end", values=(name, email, date, files))
+        # Near either edge of the window: slide it
+        if not self.clients_exhausted and float(last) > 0.9:
+            self.clients_page_pending = True
+            self.root.after_idle(self.load_more_clients)
+        elif not self.clients_at_start and float(first) < 0.1:
+            self.clients_page_pending = True
+            self.root.after_idle(self.load_previous_clients)
 
     def resend_selected(self):
         selected = self.client_tree.selection()
@@ -507,14 +840,50 @@ class DPOApp:
         name, email, _, files_str = item['values']
         file_paths = files_str.split("|")
 
-        try:
-            receipt_path = create_pdf_receipt(name, file_paths)
-            send_files_with_receipt(email, name, file_paths, receipt_path)
-            messagebox.showinfo("Sent", f"Files resent to {email}")
-            logger.info(f"Resent files to {email} for {name}")
-        except Exception as e:
-            logger.exception(f"Resend failed: {e}")
-            messagebox.showerror("Error", f"Could not resend files:\n{e}")
+        self.outbox.enqueue(make_job(name, email, file_paths, record=False))
+        logger.info("Queued resend to %s for %s", email, name, extra={"client": name, "email": email})
+
+    def bulk_resend_selected(self):
+        selected = self.client_tree.selection()
+        if not selected:
+            messagebox.showwarning("No Selection", "Please select one or more clients to resend.")
+            return
+
+        # Through the outbox like every other send: journaled, retried, and
+        # sharing its SMTP sessions. A resend isn't a new order, so nothing
+        # is added to the client store.
+        pending = set()
+        for iid in selected:
+            name, email, _, files_str = self.client_tree.item(iid)['values']
+            pending.add(self.outbox.enqueue(make_job(name, email, files_str, record=False)))
+        self.bulk_resends.append({"pending": pending, "total": len(pending), "failures": []})
+        logger.info("Bulk resend queued for %d client(s)", len(pending))
+
+    def note_bulk_result(self, job_id, failure=None):
+        """Count a finished outbox job towards its Bulk Resend, if it has
+        one; returns False for jobs that aren't part of one."""
+        for batch in self.bulk_resends:
+            if job_id in batch["pending"]:
+                break
+        else:
+            return False
+        batch["pending"].discard(job_id)
+        if failure:
+            batch["failures"].append(failure)
+        if batch["pending"]:
+            return True
+
+        # The batch is done
+        self.bulk_resends.remove(batch)
+        self.refresh_receipts_tab()
+        self.load_clients()
+        failures = batch["failures"]
+        message = f"Sent {batch['total'] - len(failures)} of {batch['total']}."
+        if failures:
+            messagebox.showerror("Bulk Resend", message + "\n\nFailed:\n" + "\n".join(failures))
+        else:
+            messagebox.showinfo("Bulk Resend", message)
+        return True
 
     def ask_email(self, name):
         import tkinter.simpledialog as sd
@@ -556,21 +925,15 @@ class DPOApp:
                 messagebox.showerror("Missing Info", "Name and email are required.")
                 return
 
-            filepath = "clients.csv"
-            file_exists = os.path.exists(filepath)
-            with open(filepath, "a", newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=["name", "email", "date", "files"])
-                if not file_exists or os.path.getsize(filepath) == 0:
-                    writer.writeheader()
-                writer.writerow({
-                    "name": name,
-                    "email": email,
-                    "date": date,
-                    "files": files
-                })
-
-            logger.info(f"Added new client: {name} ({email})")
-            self.load_clients()
+            client_id = client_data.save_client_info(name, email, files, date=date)
+
+            logger.info("Added new client: %s (%s)", name, email, extra={"client": name, "email": email})
+            self.clients_total += 1
+            if self.clients_exhausted:
+                self.client_tree.insert("", "end", iid=str(client_id), values=(name, email, date, files))
+                self.clients_last_id = client_id
+                self.trim_clients(from_top=True)
+            self.update_clients_status()
             win.destroy()
 
         ttk.Button(win, text="Save Client", command=save_client, bootstyle=SUCCESS).grid(row=3, column=0, columnspan=3,
@@ -582,7 +945,8 @@ class DPOApp:
             messagebox.showwarning("No Selection", "Please select a client to edit.")
             return
 
-        item = self.client_tree.item(selected[0])
+        client_id = selected[0]
+        item = self.client_tree.item(client_id)
         name, email, date, files = item["values"]
 
         edit_win = tk.Toplevel(self.root)
@@ -618,27 +982,10 @@ class DPOApp:
                 messagebox.showerror("Invalid Data", "Name and Email are required.")
                 return
 
-            # Update CSV
-            filepath = "clients.csv"
-            rows = []
-            with open(filepath, newline='') as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-
-            for row in rows:
-                if row["name"] == name and row["email"] == email and row["date"] == date:
-                    row["name"] = new_name
-                    row["email"] = new_email
-                    row["files"] = new_files
-                    break
-
-            with open(filepath, "w", newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=["name", "email", "date", "files"])
-                writer.writeheader()
-                writer.writerows(rows)
+            client_data.update_client(int(client_id), new_name, new_email, new_files)
 
-            logger.info(f"Updated client: {new_name}")
-            self.load_clients()
+            logger.info("Updated client: %s", new_name, extra={"client": new_name, "email": new_email})
+            self.client_tree.item(client_id, values=(new_name, new_email, date, new_files))
             edit_win.destroy()
 
         ttk.Button(edit_win, text="Save Changes", bootstyle=SUCCESS, command=save_edits).grid(row=3, column=0,
@@ -657,22 +1004,12 @@ class DPOApp:
         if not confirm:
             return
 
-        filepath = "clients.csv"
-        rows = []
-
-        with open(filepath, newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row['name'] != name or row['email'] != email:
-                    rows.append(row)
+        client_data.delete_client(int(selected[0]))
 
-        with open(filepath, "w", newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=["name", "email", "date", "files"])
-            writer.writeheader()
-            writer.writerows(rows)
-
-        logger.info(f"Deleted client: {name} ({email})")
-        self.load_clients()
+        logger.info("Deleted client: %s (%s)", name, email, extra={"client": name, "email": email})
+        self.client_tree.delete(selected[0])
+        self.clients_total -= 1
+        self.update_clients_status()
 
     def build_files_tab(self, tab):
         # Search frame
@@ -683,7 +1020,7 @@ class DPOApp:
         self.search_var = ttk.StringVar()
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(side=LEFT, padx=5, fill=X, expand=True)
-        search_entry.bind("<KeyRelease>", lambda e: self.refresh_files_tab())
+        search_entry.bind("<KeyRelease>", self.schedule_file_search)
 
         # Treeview frame
         tree_frame = ttk.Frame(tab)
@@ -719,7 +1056,7 @@ class DPOApp:
         ttk.Button(btn_frame, text="Open", bootstyle=SECONDARY, command=self.open_selected_file).pack(side=LEFT, padx=5)
         ttk.Button(btn_frame, text="Delete", bootstyle=DANGER, command=self.delete_selected_file).pack(side=LEFT,
                                                                                                        padx=5)
-        ttk.Button(btn_frame, text="Refresh", command=self.refresh_files_tab).pack(side=LEFT, padx=5)
+        ttk.Button(btn_frame, text="Refresh", command=self.rescan_files).pack(side=LEFT, padx=5)
 
         self.refresh_files_tab()
 ###########################################
@@ -732,13 +1069,15 @@ class DPOApp:
 
         item = self.files_tree.item(selected[0])
         old_name = item["values"][0]
-        old_path = os.path.join(FILES_FOLDER, old_name)
 
         def save_new_name():
             new_name = entry_var.get().strip()
             if not new_name:
                 messagebox.showerror("Invalid Name", "Filename cannot be empty.")
                 return
+            if new_name.startswith(".") or os.sep in new_name or "/" in new_name:
+                messagebox.showerror("Invalid Name", "Filename cannot start with '.' or contain a folder.")
+                return
             if new_name == old_name:
                 edit_win.destroy()
                 return
@@ -747,12 +1086,13 @@ class DPOApp:
                 messagebox.showerror("File Exists", "A file with that name already exists.")
                 return
             try:
-                os.rename(old_path, new_path)
-                logger.info(f"Renamed file '{old_name}' to '{new_name}'")
-                self.refresh_files_tab()
+                self.library.rename(old_name, new_name)
+                self.file_catalog.rename(old_name, new_name)
+                logger.info("Renamed file '%s' to '%s'", old_name, new_name)
+                self.apply_file_changes([old_name, new_name])
                 edit_win.destroy()
             except Exception as e:
-                logger.error(f"Error renaming file '{old_name}': {e}")
+                logger.error("Error renaming file '%s': %s", old_name, e)
                 messagebox.showerror("Error", f"Could not rename file:\n{e}")
 
         edit_win = tk.Toplevel(self.root)
@@ -772,22 +1112,59 @@ class DPOApp:
         ttk.Button(btn_frame, text="Cancel", bootstyle=SECONDARY, command=edit_win.destroy).pack(side=LEFT, padx=5)
         ttk.Button(btn_frame, text="Save", bootstyle=SUCCESS, command=save_new_name).pack(side=LEFT, padx=5)
 
-    def refresh_files_tab(self):
-        search_query = self.search_var.get().lower().strip()
-        self.files_tree.delete(*self.files_tree.get_children())
+    def schedule_file_search(self, event=None):
+        # Debounce: only search once typing pauses
+        if self.file_search_job is not None:
+            self.root.after_cancel(self.file_search_job)
+        self.file_search_job = self.root.after(FILE_SEARCH_DELAY_MS, self.refresh_files_tab)
 
-        if not os.path.exists(FILES_FOLDER):
-            return
+    def refresh_files_tab(self, changed=()):
+        self.file_search_job = None
+        entries = self.file_catalog.search(self.search_var.get())
+        self.sync_file_tree(self.files_tree, entries, self.files_tab_row, changed)
+
+    def rescan_files(self):
+        self.file_catalog.load()
+        self.files_tree.delete(*self.files_tree.get_children())
+        self.file_tree.delete(*self.file_tree.get_children())
+        self.refresh_files_tab()
+        self.load_files_from_folder()
 
-        for filename in os.listdir(FILES_FOLDER):
-            if search_query and search_query not in filename.lower():
-                continue
+    def poll_watcher(self):
+        """Apply what changed on disk in assets/files and receipts/."""
+        file_changes, receipt_changes, rescan = set(), {}, set()
+        while True:
+            try:
+                folder, kind, name = self.watcher.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "rescan":
+                rescan.add(folder)
+            elif folder == FILES_FOLDER:
+                file_changes.add(name)
+            else:
+                receipt_changes[name] = kind
+
+        if FILES_FOLDER in rescan:
+            self.rescan_files()
+        elif file_changes:
+            for name in file_changes:
+                self.file_catalog.update(name)
+            self.apply_file_changes(file_changes)
+
+        if RECEIPT_FOLDER in rescan:
+            receipt_ledger.backfill(RECEIPT_FOLDER, force=True)
+            self.refresh_receipts_tab()
+        else:
+            for name, kind in receipt_changes.items():
+                if kind == "removed":
+                    receipt_ledger.delete_receipt(name)
+                    if self.receipts_tree.exists(name):
+                        self.receipts_tree.delete(name)
+                else:
+                    self.show_receipt_row(receipt_ledger.index_file(os.path.join(RECEIPT_FOLDER, name)))
 
-            path = os.path.join(FILES_FOLDER, filename)
-            if os.path.isfile(path):
-                size_kb = round(os.path.getsize(path) / 1024, 2)
-                mod_time = datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M')
-                self.files_tree.insert("", "end", values=(filename, f"{size_kb} KB", mod_time))
+        self.root.after(WATCH_POLL_MS, self.poll_watcher)
 
     def open_selected_file(self):
         selected = self.files_tree.selection()
@@ -799,7 +1176,7 @@ class DPOApp:
             try:
                 os.startfile(path)
             except Exception as e:
-                logger.error(f"Failed to open file: {e}")
+                logger.error("Failed to open file: %s", e)
                 messagebox.showerror("Error", f"Could not open file:\n{e}")
 
     def delete_selected_file(self):
@@ -816,13 +1193,14 @@ class DPOApp:
             for filename in file_list:
                 path = os.path.join(FILES_FOLDER, filename)
                 try:
-                    os.remove(path)
-                    logger.info(f"Deleted file: {path}")
+                    self.library.remove(filename)
+                    self.file_catalog.remove(filename)
+                    logger.info("Deleted file: %s", path)
                 except Exception as e:
-                    logger.error(f"Error deleting file '{path}': {e}")
+                    logger.error("Error deleting file '%s': %s", path, e)
                     errors.append(filename)
 
-            self.refresh_files_tab()
+            self.apply_file_changes(file_list)
 
             if errors:
                 messagebox.showerror("Delete Errors", f"Could not delete:\n" + "\n".join(errors))
@@ -831,23 +1209,74 @@ class DPOApp:
 
     @staticmethod
     def save_sent_email(name, email):
-        os.makedirs("assets/client", exist_ok=True)
-        filepath = "assets/client/emails.csv"
-        existing = set()
-
-        # Load existing to avoid duplicates
-        if os.path.exists(filepath):
-            with open(filepath, newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    existing.add((row['name'], row['email']))
-
-        if (name, email) not in existing:
-            with open(filepath, "a", newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=["name", "email"])
-                if os.path.getsize(filepath) == 0:
-                    writer.writeheader()
-                writer.writerow({"name": name, "email": email})
+        save_sent_email(name, email)
+
+    def build_diagnostics_tab(self, tab):
+        tree_frame = ttk.Frame(tab)
+        tree_frame.pack(fill=BOTH, expand=True, pady=10)
+
+        columns = ("name", "count", "p50", "p95", "p99", "max")
+        self.diagnostics_tree = Treeview(tree_frame, columns=columns, show="headings", height=15)
+        for column, text, width in (("name", "Span / Counter", 220), ("count", "Count", 80), ("p50", "p50 ms", 90),
+                                    ("p95", "p95 ms", 90), ("p99", "p99 ms", 90), ("max", "Max ms", 90)):
+            self.diagnostics_tree.heading(column, text=text)
+            self.diagnostics_tree.column(column, width=width, anchor=W if column == "name" else E)
+        self.diagnostics_tree.pack(side=LEFT, fill=BOTH, expand=True)
+
+        scrollbar = ttk.Scrollbar(tree_frame, orient=VERTICAL, command=self.diagnostics_tree.yview)
+        self.diagnostics_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=RIGHT, fill=Y)
+
+        btn_frame = ttk.Frame(tab)
+        btn_frame.pack(pady=5)
+        self.diagnostics_status_var = ttk.StringVar()
+        ttk.Button(btn_frame, text="Export", bootstyle=INFO, command=self.export_diagnostics).pack(side=LEFT, padx=5)
+        ttk.Button(btn_frame, text="Reset", bootstyle=DANGER, command=self.reset_diagnostics).pack(side=LEFT, padx=5)
+        ttk.Label(btn_frame, textvariable=self.diagnostics_status_var).pack(side=LEFT, padx=10)
+
+        if not metrics.enabled():
+            self.diagnostics_status_var.set("Timing is off (DPO_METRICS=0)")
+        self.root.after(DIAGNOSTICS_REFRESH_MS, self.poll_diagnostics)
+
+    @staticmethod
+    def diagnostics_rows(data):
+        for name, stats in data["spans"].items():
+            yield name, (name, stats["count"], f"{stats['p50_ms']:.2f}", f"{stats['p95_ms']:.2f}",
+                         f"{stats['p99_ms']:.2f}", f"{stats['max_ms']:.2f}")
+        for name, value in data["counters"].items():
+            shown = _format_bytes(value) if name.endswith(".bytes") else value
+            yield "#" + name, (name, shown, "", "", "", "")
+
+    def refresh_diagnostics_tab(self):
+        tree = self.diagnostics_tree
+        rows = dict(self.diagnostics_rows(metrics.snapshot()))
+        stale = [iid for iid in tree.get_children() if iid not in rows]
+        if stale:
+            tree.delete(*stale)
+        for index, (iid, values) in enumerate(rows.items()):
+            if tree.exists(iid):
+                tree.item(iid, values=values)
+            else:
+                tree.insert("", index, iid=iid, values=values)
+
+    def poll_diagnostics(self):
+        # Only redraw while the tab is on screen
+        if self.notebook.select() == str(self.diagnostics_tab):
+            self.refresh_diagnostics_tab()
+        self.root.after(DIAGNOSTICS_REFRESH_MS, self.poll_diagnostics)
+
+    def export_diagnostics(self):
+        try:
+            metrics.export()
+        except OSError as e:
+            messagebox.showerror("Export Failed", f"Could not write {metrics.METRICS_FILE}:\n{e}")
+            return
+        self.diagnostics_status_var.set(f"Saved to {metrics.METRICS_FILE}")
+
+    def reset_diagnostics(self):
+        metrics.reset()
+        self.diagnostics_tree.delete(*self.diagnostics_tree.get_children())
+        self.diagnostics_status_var.set("")
 
     # Inside your DPOApp class (e.g., add to build_ui or as a new button/tab)
 
@@ -857,10 +1286,10 @@ class DPOApp:
 
         current = load_email_config()
 
-        sender_var = tk.StringVar(value=current.get("EMAIL_SENDER", ""))
-        pass_var = tk.StringVar(value=current.get("EMAIL_PASSWORD", ""))
-        smtp_var = tk.StringVar(value=current.get("SMTP_SERVER", "smtp.gmail.com"))
-        port_var = tk.StringVar(value=current.get("SMTP_PORT", "587"))
+        sender_var = tk.StringVar(value=current["sender"])
+        pass_var = tk.StringVar(value=current["password"])
+        smtp_var = tk.StringVar(value=current["smtp_server"])
+        port_var = tk.StringVar(value=str(current["smtp_port"]))
 
         ttk.Label(win, text="Sender Email:").grid(row=0, column=0, sticky="e", padx=5, pady=5)
         ttk.Entry(win, textvariable=sender_var, width=30).grid(row=0, column=1, padx=5, pady=5)
@@ -875,11 +1304,16 @@ class DPOApp:
         ttk.Entry(win, textvariable=port_var, width=30).grid(row=3, column=1, padx=5, pady=5)
 
         def save_and_close():
+            try:
+                port = int(port_var.get().strip())
+            except ValueError:
+                messagebox.showerror("Invalid Port", "SMTP port must be a number.", parent=win)
+                return
             save_email_config(
                 sender_var.get().strip(),
                 pass_var.get().strip(),
                 smtp_var.get().strip(),
-                int(port_var.get().strip())
+                port
             )
             messagebox.showinfo("Saved", "Email configuration saved.")
             win.destroy()
@@ -0,0 +1,108 @@
+# importer.py
+# Background import of files into the library. Files are hashed and copied
+# on a small thread pool while the GUI polls progress from root.after, the
+# same way it follows the outbox.
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from library import ImportCancelled
+from logger import logger
+
+IMPORT_WORKERS = 4
+
+
+class ImportBatch:
+    """Imports ``paths`` into ``library`` in the background.
+
+    Each file is hashed, then copied unless the content is already stored.
+    ``progress`` maps every source to ``[bytes_done, bytes_total]`` for the
+    pass it is in, and ``phase`` to "hashing", "copying" or "done"; both can
+    be read at any time. Finished files are reported on ``events`` as ``("file", result)``, with
+    result dicts like ``FileLibrary.import_files`` returns, followed by one
+    ``("finished", summary)``.
+    """
+
+    def __init__(self, library, paths, workers=IMPORT_WORKERS):
+        self.library = library
+        self.paths = list(paths)
+        self.workers = workers
+        self.events = queue.Queue()
+        self.cancelled = threading.Event()
+        self.progress = {}
+        self.phase = {}
+        for path in self.paths:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            self.progress[path] = [0, size]
+            self.phase[path] = "hashing"
+        self._thread = None
+
+    @property
+    def total_bytes(self):
+        return sum(total for _, total in self.progress.values())
+
+    @property
+    def done_bytes(self):
+        """Bytes hashed so far; each byte counts once, copying is a phase."""
+        return sum(total if self.phase[path] != "hashing" else done
+                   for path, (done, total) in self.progress.items())
+
+    @property
+    def copying(self):
+        return sum(1 for phase in self.phase.values() if phase == "copying")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="file-import", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _import(self, source):
+        counter = self.progress[source]
+
+        def advance(nbytes):
+            counter[0] += nbytes
+
+        def copying():
+            counter[0] = 0
+            self.phase[source] = "copying"
+
+        result = {"source": source, "name": None, "added": False, "error": None}
+        try:
+            if self.cancelled.is_set():
+                raise ImportCancelled()
+            result["name"], result["added"] = self.library.import_file(source, advance, self.cancelled, copying)
+        except ImportCancelled:
+            result["error"] = "cancelled"
+        except OSError as e:
+            result["error"] = str(e)
+        counter[0] = counter[1]
+        self.phase[source] = "done"
+        self.events.put(("file", result))
+        return result
+
+    def _run(self):
+        results = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(self._import, self.paths))
+        finally:
+            self.library.save()
+        summary = {
+            "added": sum(1 for r in results if r["added"]),
+            "duplicates": sum(1 for r in results if r["name"] and not r["added"]),
+            "failed": sum(1 for r in results if r["error"] and r["error"] != "cancelled"),
+            "cancelled": sum(1 for r in results if r["error"] == "cancelled"),
+        }
+        logger.info(f"Import finished: {summary['added']} added, {summary['duplicates']} already stored, "
+                    f"{summary['failed']} failed, {summary['cancelled']} cancelled")
+        self.events.put(("finished", summary))
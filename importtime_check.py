@@ -0,0 +1,116 @@
+# importtime_check.py
+# Cold-start guard. Imports what the app loads before its window appears in
+# a fresh interpreter under ``-X importtime`` and fails if that takes longer
+# than the budget, or if a module that should load on first use sneaked
+# into startup.
+#
+#   python importtime_check.py
+#   python importtime_check.py --budget-ms 300 --top 15
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+STARTUP_MODULES = ("main", "gui")
+# Loaded with the first receipt / send, never at startup. A third-party
+# package that pulls one in itself (ttkbootstrap reads its version through
+# importlib.metadata, which imports email.message) is reported, not failed:
+# the app can't defer that import.
+LAZY_MODULES = ("fpdf", "smtplib", "email", "email.message", "mime_stream", "reportlab")
+DEFAULT_BUDGET_MS = 500
+DEFAULT_RUNS = 3
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(modules=STARTUP_MODULES, cwd=None):
+    """Import ``modules`` in a new interpreter; returns ``(rows, loaded)``
+    where rows are ``(self_us, cumulative_us, depth, name)`` and loaded is
+    the set of module names present afterwards."""
+    code = f"import sys; import {', '.join(modules)}; print('\\n'.join(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd or os.path.dirname(
+        os.path.abspath(__file__)), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import failed:\n{proc.stderr}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return rows, set(proc.stdout.split())
+
+
+def importer_of(rows, name):
+    """The nearest module outside the standard library that (indirectly)
+    imported ``name``, or None if it was imported at the top level."""
+    for i, (_, _, depth, row_name) in enumerate(rows):
+        if row_name == name:
+            break
+    else:
+        return None
+    # importtime lists a module's imports before the module itself, one level deeper
+    for _, _, parent_depth, parent in rows[i + 1:]:
+        if parent_depth < depth:
+            depth = parent_depth
+            if parent.partition(".")[0] not in sys.stdlib_module_names:
+                return parent
+            if depth == 0:
+                return None
+    return None
+
+
+def is_first_party(module):
+    here = os.path.dirname(os.path.abspath(__file__))
+    return os.path.exists(os.path.join(here, module.partition(".")[0] + ".py"))
+
+
+def total_ms(rows):
+    # Top-level entries' cumulative times add up to the whole import
+    return sum(cumulative for _, cumulative, depth, _ in rows if depth == 0) / 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the app's import time against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="best of N runs (default: 3)")
+    parser.add_argument("--top", type=int, default=10, help="show the N slowest modules")
+    args = parser.parse_args(argv)
+
+    best = None
+    for _ in range(max(1, args.runs)):
+        rows, loaded = measure()
+        if best is None or total_ms(rows) < total_ms(best[0]):
+            best = (rows, loaded)
+    rows, loaded = best
+    elapsed = total_ms(rows)
+
+    print(f"Startup imports ({', '.join(STARTUP_MODULES)}): {elapsed:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"Slowest modules (self time):")
+    for self_us, cumulative_us, _, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}  (cumulative {cumulative_us / 1000:.1f} ms)")
+
+    failed = False
+    eager, by_dependency = [], []
+    for module in sorted(m for m in LAZY_MODULES if m in loaded):
+        importer = importer_of(rows, module)
+        if importer is not None and not is_first_party(importer):
+            by_dependency.append(f"{module} (via {importer})")
+        else:
+            eager.append(module)
+    if by_dependency:
+        print(f"note: loaded at startup by a dependency, not by the app: {', '.join(by_dependency)}")
+    if eager:
+        print(f"FAIL: loaded at startup but should load on first use: {', '.join(eager)}")
+        failed = True
+    if elapsed > args.budget_ms:
+        print(f"FAIL: startup imports took {elapsed:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,514 @@
+# library.py
+# Content-addressed file library under assets/files.
+#
+# Every distinct file body is stored once as .store/<sha256>; the names shown
+# in the Files tab are hard links to those objects (or plain copies where the
+# filesystem can't link), so the rest of the app keeps opening and sending
+# assets/files/<name> as before. .library.json maps each name to its digest
+# and remembers the digest of every imported source file by size and mtime,
+# so importing the same file again only costs a stat.
+#
+# Stored objects, and with them every link, are made read-only: editing one
+# name in place would otherwise change every other name with that content.
+# A file adopted from before the library existed is the exception while it
+# is the only name for its content; it keeps its permissions until a second
+# name links to it. The size and mtime of each name are kept as well, and a
+# name that no longer matches them (replaced by an editor's save-as, made
+# writable and changed) stops counting as a copy of its old digest.
+#
+# The GUI and the command line can both import into the same folder, so the
+# index is saved under a file lock and merged with what is on disk.
+import errno
+import hashlib
+import json
+import os
+import shutil
+import stat
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from logger import logger
+from receipt_ids import lock_file, unlock_file
+
+STORE_DIR = ".store"
+INDEX_FILE = ".library.json"
+HASH_CHUNK = 1024 * 1024
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+COPY_CHUNK = 8 * 1024 * 1024  # per kernel copy call; progress and cancel are checked in between
+
+# A kernel copy failing with one of these before any byte moved just means
+# "not supported for these files"; fall back to the next method.
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF,
+                errno.EPERM, errno.ENOTSOCK}
+
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+def _check(cancelled):
+    if cancelled is not None and cancelled.is_set():
+        raise ImportCancelled()
+
+
+def hash_file(path, chunk_size=HASH_CHUNK, progress=None, cancelled=None):
+    """SHA-256 of a file, read in fixed-size chunks (hashlib releases the GIL,
+    so several files hash in parallel on a thread pool)."""
+    digest = hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            _check(cancelled)
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+            if progress:
+                progress(n)
+    return digest.hexdigest()
+
+
+def _kernel_copy(copy, infd, outfd, progress, cancelled, chunk_size):
+    """Copy with ``copy(infd, outfd, count)`` until EOF. Returns False if the
+    method isn't usable here (nothing has been written in that case)."""
+    copied = 0
+    while True:
+        _check(cancelled)
+        try:
+            n = copy(infd, outfd, chunk_size)
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED:
+                return False
+            raise
+        if not n:
+            return True
+        copied += n
+        if progress:
+            progress(n)
+
+
+def _kernel_copiers():
+    # Only Linux's sendfile accepts a regular file as the destination
+    if not sys.platform.startswith("linux"):
+        return
+    if hasattr(os, "copy_file_range"):  # in-kernel, and a reflink on btrfs/xfs
+        yield lambda infd, outfd, count: os.copy_file_range(infd, outfd, count)
+    yield lambda infd, outfd, count: os.sendfile(outfd, infd, None, count)
+
+
+def copy_file(src, dst, progress=None, cancelled=None, chunk_size=COPY_CHUNK):
+    """Copy ``src`` to ``dst`` (data and timestamps) in chunks, using a
+    kernel-side copy where the platform has one and a buffered copy
+    otherwise. ``progress(nbytes)`` is called as data moves; setting the
+    ``cancelled`` event raises ImportCancelled between chunks."""
+    with open(src, "rb", buffering=0) as fsrc, open(dst, "wb", buffering=0) as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        for copy in _kernel_copiers():
+            if _kernel_copy(copy, infd, outfd, progress, cancelled, chunk_size):
+                break
+        else:
+            buf = bytearray(min(chunk_size, HASH_CHUNK))
+            view = memoryview(buf)
+            while True:
+                _check(cancelled)
+                n = fsrc.readinto(buf)
+                if not n:
+                    break
+                fdst.write(view[:n])
+                if progress:
+                    progress(n)
+    shutil.copystat(src, dst)
+
+
+def _hash_quietly(path):
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _protect(path):
+    """Make a stored object (and so every hard link to it) read-only."""
+    os.chmod(path, _READ_ONLY)
+
+
+def _merge(disk, base, mine):
+    """Three-way merge of one index section: keys this process changed since
+    ``base`` (the section as last read or written) win over ``disk``."""
+    merged = dict(disk)
+    for key in base.keys() | mine.keys():
+        if mine.get(key) != base.get(key):
+            if key in mine:
+                merged[key] = mine[key]
+            else:
+                merged.pop(key, None)
+    return merged
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except PermissionError:
+        # Windows won't delete a read-only file
+        os.chmod(path, _READ_ONLY | stat.S_IWUSR)
+        os.remove(path)
+
+
+class FileLibrary:
+    def __init__(self, folder, workers=HASH_WORKERS):
+        self.folder = folder
+        self.store = os.path.join(folder, STORE_DIR)
+        self.index_path = os.path.join(folder, INDEX_FILE)
+        self.workers = workers
+        self._names = {}    # name -> digest
+        self._digests = {}  # digest -> set of names
+        self._sources = {}  # absolute source path -> [size, mtime_ns, digest]
+        self._stamps = {}   # name -> [size, mtime_ns] when it was linked
+        self._reserved = set()  # names being written by an import
+        self._inflight = {}  # digest -> Event set when that object is stored
+        self._lock = threading.RLock()
+        self._synced = {}  # the index as this process last read or wrote it
+        self._load()
+        self._remove_partials()
+
+    def _remove_partials(self):
+        # Left behind by an import that was killed mid-copy
+        if not os.path.isdir(self.store):
+            return
+        for entry in os.scandir(self.store):
+            if entry.name.endswith(".part"):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.error(f"Library index {self.index_path} is unreadable, starting a new one: {e}")
+            return {}
+
+    def _use_index(self, data):
+        self._names, self._digests = {}, {}
+        for name, digest in data.get("files", {}).items():
+            self._link_name(name, digest)
+        self._sources = data.get("sources", {})
+        self._stamps = data.get("stamps", {})
+
+    def _load(self):
+        data = self._read_index()
+        self._synced = json.loads(json.dumps(data))
+        self._use_index(data)
+        for name in self._names.keys() - self._stamps.keys():
+            self._stamp(name)  # indexes written before stamps were kept
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        """Write the index, keeping what other processes saved since this one
+        last read it; their names are picked up here as well."""
+        os.makedirs(self.folder, exist_ok=True)
+        fd = os.open(self.index_path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+") as lock:
+            lock_file(lock)
+            try:
+                disk = self._read_index()
+                mine = {"files": self._names, "sources": self._sources, "stamps": self._stamps}
+                merged = {key: _merge(disk.get(key, {}), self._synced.get(key, {}), section)
+                          for key, section in mine.items()}
+                text = json.dumps(merged)
+                tmp = f"{self.index_path}.{uuid.uuid4().hex[:8]}.tmp"
+                try:
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        f.write(text)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp, self.index_path)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+            finally:
+                unlock_file(lock)
+        self._synced = json.loads(text)
+        self._use_index(merged)
+
+    def _link_name(self, name, digest):
+        self._names[name] = digest
+        self._digests.setdefault(digest, set()).add(name)
+
+    def _stamp(self, name):
+        try:
+            self._stamps[name] = _source_stamp(os.path.join(self.folder, name))
+        except OSError:
+            self._stamps.pop(name, None)
+
+    def _unlink_name(self, name):
+        self._stamps.pop(name, None)
+        digest = self._names.pop(name, None)
+        if digest is None:
+            return None
+        names = self._digests.get(digest)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self._digests[digest]
+        return digest
+
+    def _live_names(self, digest):
+        """Names for ``digest`` that still exist unchanged, forgetting any
+        deleted or rewritten behind the library's back."""
+        names = self._digests.get(digest, set())
+        for name in list(names):
+            try:
+                current = _source_stamp(os.path.join(self.folder, name))
+            except OSError:
+                current = None
+            if current is None or current != self._stamps.get(name, current):
+                if current is not None:
+                    logger.warning(f"Library: {name} changed on disk, no longer counted as {digest[:12]}")
+                self._unlink_name(name)
+        return self._digests.get(digest, set())
+
+    def object_path(self, digest):
+        return os.path.join(self.store, digest)
+
+    def digest_of(self, name):
+        return self._names.get(name)
+
+    def names_for(self, digest):
+        return sorted(self._digests.get(digest, ()))
+
+    def _digest_source(self, path, progress=None, cancelled=None):
+        """Digest of a source file, from the cache when it hasn't changed."""
+        path = os.path.abspath(path)
+        stamp = _source_stamp(path)
+        with self._lock:
+            cached = self._sources.get(path)
+        if cached and cached[:2] == stamp:
+            if progress:
+                progress(stamp[0])
+            return cached[2]
+        digest = hash_file(path, progress=progress, cancelled=cancelled)
+        with self._lock:
+            self._sources[path] = stamp + [digest]
+        return digest
+
+    def _unique_name(self, filename):
+        base, ext = os.path.splitext(filename)
+        name, counter = filename, 1
+        while (name in self._names or name in self._reserved
+               or os.path.lexists(os.path.join(self.folder, name))):
+            name = f"{base}_{counter}{ext}"
+            counter += 1
+        return name
+
+    def _store_object(self, source, digest, progress=None, cancelled=None):
+        obj = self.object_path(digest)
+        if os.path.exists(obj):
+            # Left over from earlier names; reuse it only if it still holds this content
+            if os.path.getsize(obj) == os.path.getsize(source) and hash_file(obj, cancelled=cancelled) == digest:
+                _protect(obj)  # an adopted file's object becomes shared now
+                return obj
+            logger.warning(f"Library: stored object {digest[:12]} doesn't match its digest, replacing it")
+            _remove_file(obj)
+        os.makedirs(self.store, exist_ok=True)
+        tmp = f"{obj}.{uuid.uuid4().hex[:8]}.part"
+        try:
+            copy_file(source, tmp, progress, cancelled)
+            _protect(tmp)
+            os.replace(tmp, obj)
+        finally:
+            if os.path.exists(tmp):
+                _remove_file(tmp)
+        return obj
+
+    def _materialize(self, obj, name, cancelled=None):
+        dest = os.path.join(self.folder, name)
+        try:
+            os.link(obj, dest)
+        except OSError:
+            # No hard links here (FAT, network share)
+            tmp = os.path.join(self.folder, f".{name}.part")
+            try:
+                copy_file(obj, tmp, cancelled=cancelled)
+                _protect(tmp)
+                os.replace(tmp, dest)
+            finally:
+                if os.path.exists(tmp):
+                    _remove_file(tmp)
+        return dest
+
+    @metrics.timed("library.import")
+    def import_file(self, source, progress=None, cancelled=None, copying=None):
+        """Add one file to the library; safe to call from several threads.
+
+        Returns ``(name, added)``: ``added`` is False when the same content
+        was already stored (under ``name``) and nothing was copied. The index
+        isn't written; call save() once the batch is done. ``progress`` is
+        called for the hash and then again for the copy; ``copying()`` marks
+        the switch, for callers that report the two passes apart.
+        """
+        digest = self._digest_source(source, progress, cancelled)
+        while True:
+            with self._lock:
+                existing = self._live_names(digest)
+                if existing:
+                    return min(existing), False
+                busy = self._inflight.get(digest)
+                if busy is None:
+                    self._inflight[digest] = threading.Event()
+                    name = self._unique_name(os.path.basename(source))
+                    self._reserved.add(name)
+                    break
+            busy.wait()  # the same content is being imported by another worker
+
+        obj = None
+        try:
+            if copying:
+                copying()
+            obj = self._store_object(source, digest, progress, cancelled)
+            _check(cancelled)
+            self._materialize(obj, name, cancelled)
+            with self._lock:
+                self._link_name(name, digest)
+                self._stamp(name)
+            return name, True
+        except BaseException:
+            # Cancelled or failed after the object was stored: don't leave it
+            # in .store with no name pointing at it
+            with self._lock:
+                if obj is not None and digest not in self._digests:
+                    try:
+                        _remove_file(obj)
+                    except OSError:
+                        pass
+            raise
+        finally:
+            with self._lock:
+                self._reserved.discard(name)
+                self._inflight.pop(digest).set()
+
+    def import_files(self, paths):
+        """Add files to the library in parallel.
+
+        Returns one result dict per file with the library ``name`` it is
+        available under, ``added`` (False when the same content was already
+        there, so nothing was copied) and ``error`` if it couldn't be imported.
+        """
+        def run(source):
+            try:
+                name, added = self.import_file(source)
+                return {"source": source, "name": name, "added": added, "error": None}
+            except OSError as e:
+                return {"source": source, "name": None, "added": False, "error": e}
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                return list(executor.map(run, paths))
+        finally:
+            self.save()
+
+    def rename(self, old_name, new_name):
+        with self._lock:
+            os.rename(os.path.join(self.folder, old_name), os.path.join(self.folder, new_name))
+            digest = self._unlink_name(old_name)
+            if digest is not None:
+                self._link_name(new_name, digest)
+                self._stamp(new_name)
+                self._save()
+
+    def remove(self, name):
+        """Delete a name; the stored object goes once no name refers to it."""
+        with self._lock:
+            path = os.path.join(self.folder, name)
+            if os.path.lexists(path):
+                _remove_file(path)
+            digest = self._unlink_name(name)
+            if digest is None:
+                return
+            if digest not in self._digests:
+                try:
+                    _remove_file(self.object_path(digest))
+                except FileNotFoundError:
+                    pass
+            self._save()
+
+    @metrics.timed("library.adopt")
+    def adopt_existing(self):
+        """Move files that predate the library into the store, replacing
+        byte-identical copies with links to one object. Content found more
+        than once becomes read-only like every other stored object; a file
+        with unique content keeps its permissions. Returns the number of
+        bytes freed."""
+        with self._lock:
+            untracked = [entry.path for entry in os.scandir(self.folder)
+                         if not entry.name.startswith(".") and entry.name not in self._names
+                         and entry.is_file()]
+        if not untracked:
+            return 0
+        stamps = {}
+        for path in untracked:
+            try:
+                stamps[path] = _source_stamp(path)
+            except OSError:
+                pass
+        untracked = list(stamps)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            digests = list(executor.map(_hash_quietly, untracked))
+
+        freed = 0
+        with self._lock:
+            try:
+                for path, digest in zip(untracked, digests):
+                    name = os.path.basename(path)
+                    try:
+                        # Skip files renamed, deleted or rewritten while hashing
+                        if digest is None or name in self._names or _source_stamp(path) != stamps[path]:
+                            continue
+                    except OSError:
+                        continue
+                    obj = self.object_path(digest)
+                    try:
+                        if os.path.exists(obj) and not os.path.samefile(path, obj) and hash_file(obj) != digest:
+                            logger.warning(f"Library: stored object {digest[:12]} doesn't match its digest, "
+                                           f"replacing it with {name}")
+                            _remove_file(obj)
+                        if not os.path.exists(obj):
+                            os.makedirs(self.store, exist_ok=True)
+                            os.link(path, obj)  # this file becomes the stored object
+                        elif not os.path.samefile(path, obj):
+                            size = os.path.getsize(path)
+                            # Swap the duplicate for a link to the object in one step
+                            tmp = os.path.join(self.folder, f".{name}.part")
+                            os.link(obj, tmp)
+                            os.replace(tmp, path)
+                            _protect(obj)
+                            freed += size
+                    except OSError as e:
+                        logger.warning(f"Library: keeping {name} as a plain file: {e}")
+                        if not os.path.exists(obj):
+                            continue  # nothing was stored, so there is no object to index it under
+                    self._link_name(name, digest)
+                    self._stamp(name)
+            finally:
+                self._save()
+        if freed:
+            logger.info(f"Library: freed {freed} bytes by linking duplicate files")
+        return freed
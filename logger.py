@@ -1,18 +1,151 @@
 # logger.py
+#
+# Log calls only put the record on a queue; a QueueListener thread formats
+# it and writes logs/dpo.log, so the Tk thread never waits on the disk. The
+# file rotates at LOG_MAX_BYTES (or daily with DPO_LOG_ROTATE=daily) and old
+# files are gzipped. DPO_LOG_FORMAT=json writes one JSON object per line,
+# including any ``extra`` fields passed to the call, e.g.
+#
+#   logger.info("Email sent to %s", email, extra={"email": email, "bytes": size})
+#
+# Only the process that imported this module first owns the file and rotates
+# it. Worker processes send their records back to it:
+#
+#   ProcessPoolExecutor(initializer=init_worker_logging, initargs=(worker_log_queue(),))
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
 
 LOG_FILE = "dpo.log"
 LOG_FOLDER = "logs"
 LOG_PATH = os.path.join(LOG_FOLDER, LOG_FILE)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(name)s | %(message)s'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 10
 
-os.makedirs(LOG_FOLDER, exist_ok=True)
+_queue_handler = None
+_file = None           # the one rotating handler, shared by both listeners
+_worker_queue = None   # multiprocessing queue for worker records, made on first use
 
-logging.basicConfig(
-    filename=LOG_PATH,
-    filemode='a',
-    format='%(asctime)s | %(levelname)s | %(name)s | %(message)s',
-    level=logging.INFO
-)
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
 
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Interpolate the message now, while its arguments still hold the
+        # values they had at the call. Timestamps, the formatter and any
+        # traceback text are left to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _file_handler():
+    if os.environ.get("DPO_LOG_ROTATE", "").lower() == "daily":
+        handler = logging.handlers.TimedRotatingFileHandler(LOG_PATH, when="midnight", backupCount=LOG_BACKUPS,
+                                                            encoding="utf-8")
+    else:
+        handler = logging.handlers.RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                                       encoding="utf-8")
+    handler.namer = lambda name: name + ".gz"
+    handler.rotator = _gzip_rotator
+    if os.environ.get("DPO_LOG_FORMAT", "").lower() == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def _route_to(handler):
+    # Swap whatever this module put on the root logger for ``handler``
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        if old is _queue_handler or isinstance(old, (logging.handlers.QueueHandler, logging.FileHandler)):
+            root.removeHandler(old)
+            if isinstance(old, logging.FileHandler):
+                old.close()
+    root.addHandler(handler)
+
+
+def _after_fork_in_child():
+    # A forked child inherits the queue handler but not the listener thread.
+    # Until init_worker_logging points it at the parent, append to the file
+    # without ever rotating it; only the parent rotates.
+    handler = logging.FileHandler(LOG_PATH, encoding="utf-8", delay=True)
+    handler.setFormatter(_file.formatter)
+    _route_to(handler)
+
+
+def worker_log_queue():
+    """A multiprocessing queue whose records the parent's listener writes;
+    pass it to init_worker_logging in each worker."""
+    global _worker_queue
+    if _worker_queue is None:
+        import multiprocessing
+
+        _worker_queue = multiprocessing.Queue()
+        worker_listener = logging.handlers.QueueListener(_worker_queue, _file, respect_handler_level=True)
+        worker_listener.start()
+        atexit.register(worker_listener.stop)
+    return _worker_queue
+
+
+def init_worker_logging(records):
+    """Process pool initializer: send this worker's log records to the
+    parent through ``records`` (from worker_log_queue)."""
+    # A spawned worker opened the log file on import; let go of it so only
+    # the parent holds it (Windows can't rotate a file another process has open)
+    _file.close()
+    # The stock QueueHandler formats the record before it is pickled
+    _route_to(logging.handlers.QueueHandler(records))
+    logging.getLogger().setLevel(logging.INFO)
+
+
+def _start():
+    global _queue_handler, _file
+    os.makedirs(LOG_FOLDER, exist_ok=True)
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    _queue_handler = _QueueHandler(records)
+    root.addHandler(_queue_handler)
+    root.setLevel(logging.INFO)
+    _file = _file_handler()
+    listener = logging.handlers.QueueListener(records, _file, respect_handler_level=True)
+    listener.start()
+    # Drain the queue and close the file on the way out
+    atexit.register(listener.stop)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+    return listener
+
+
+listener = _start()
 logger = logging.getLogger("DPO")
@@ -1,17 +1,103 @@
 # login.py
 
+import queue
 import tkinter as tk
-from tkinter import simpledialog, messagebox
+from tkinter import ttk, messagebox
 
-def show_login():
-    login_win = tk.Tk()
-    login_win.withdraw()  # Hide the root
+import auth
+from logger import logger
 
-    username = simpledialog.askstring("Login", "Enter username:", parent=login_win)
-    password = simpledialog.askstring("Login", "Enter password:", parent=login_win, show="*")
+LOGIN_POLL_MS = 50
 
-    if username == "" and password == "":
-        return True
-    else:
-        messagebox.showerror("Login Failed", "Invalid username or password.")
-        return False
\ No newline at end of file
+
+def show_login(parent=None):
+    """Ask for a login and return the username, or None if the user gave up.
+
+    A session saved by an earlier login is accepted without asking. The
+    bcrypt check runs on auth's worker thread, so the window keeps
+    repainting while it runs.
+    """
+    username = auth.load_session()
+    if username:
+        logger.info(f"Resumed session for {username}")
+        return username
+
+    # Ask over the app's own (still hidden) window so there is only one Tk
+    # interpreter; a private root is made only when none is passed in.
+    root = parent
+    if root is None:
+        root = tk.Tk()
+        root.withdraw()  # Hide the root
+
+    first_user = not auth.users.has_users()
+    win = tk.Toplevel(root)
+    win.title("Create Account" if first_user else "Login")
+    win.resizable(False, False)
+    win.grab_set()
+
+    frame = ttk.Frame(win, padding=15)
+    frame.pack(fill="both", expand=True)
+    if first_user:
+        ttk.Label(frame, text="No users yet: choose a username and password.").grid(
+            row=0, column=0, columnspan=2, pady=(0, 10))
+    ttk.Label(frame, text="Username:").grid(row=1, column=0, sticky="e", padx=5, pady=5)
+    user_var = tk.StringVar()
+    user_entry = ttk.Entry(frame, textvariable=user_var, width=25)
+    user_entry.grid(row=1, column=1, pady=5)
+    ttk.Label(frame, text="Password:").grid(row=2, column=0, sticky="e", padx=5, pady=5)
+    pass_var = tk.StringVar()
+    ttk.Entry(frame, textvariable=pass_var, show="*", width=25).grid(row=2, column=1, pady=5)
+    status_var = tk.StringVar()
+    ttk.Label(frame, textvariable=status_var).grid(row=3, column=0, columnspan=2, pady=(5, 0))
+    button = ttk.Button(frame, text="Create" if first_user else "Login")
+    button.grid(row=4, column=0, columnspan=2, pady=(10, 0))
+    user_entry.focus_set()
+
+    results = queue.Queue()
+    outcome = {"username": None}
+
+    def check_result():
+        try:
+            ok, error = results.get_nowait()
+        except queue.Empty:
+            win.after(LOGIN_POLL_MS, check_result)
+            return
+        if ok:
+            username = user_var.get().strip()
+            try:
+                auth.save_session(auth.issue_session(username))
+            except OSError as e:
+                logger.warning(f"Could not save login session: {e}")
+            outcome["username"] = username
+            win.destroy()
+            return
+        status_var.set("")
+        button.configure(state="normal")
+        messagebox.showerror("Login Failed", error or "Invalid username or password.", parent=win)
+
+    def submit(event=None):
+        if str(button["state"]) == "disabled":
+            return  # a check is already running
+        username, password = user_var.get().strip(), pass_var.get()
+        if not username or not password:
+            messagebox.showerror("Login Failed", "Enter a username and password.", parent=win)
+            return
+        button.configure(state="disabled")
+        status_var.set("Checking...")
+        if first_user:
+            auth.create_user_async(username, password,
+                                   lambda error: results.put((error is None, error and str(error))))
+        else:
+            auth.authenticate_async(username, password, lambda ok: results.put((ok, None)))
+        win.after(LOGIN_POLL_MS, check_result)
+
+    button.configure(command=submit)
+    win.bind("<Return>", submit)
+    win.protocol("WM_DELETE_WINDOW", win.destroy)
+    win.wait_window()
+
+    if parent is None:
+        root.destroy()
+    if outcome["username"]:
+        logger.info(f"Logged in as {outcome['username']}")
+    return outcome["username"]
@@ -4,23 +4,34 @@ import ttkbootstrap as ttk
 from utils import ensure_dir, is_email_config_missing
 from config import RECEIPTS_FOLDER
 from login import show_login
-from gui import DPOApp  # Don't forget this
+from emailer import smtp_pool
 
 if __name__ == "__main__":
     ensure_dir("assets/files")
     ensure_dir(RECEIPTS_FOLDER)
 
+    # One Tk interpreter for the whole run: the main window stays hidden
+    # while the login dialogs use it as their parent.
+    root = ttk.Window(themename="cosmo")
+    root.title("Digital Product Organizer")
+    root.withdraw()
+
     # Step 1: Login window
-    login_success = show_login()
+    login_success = show_login(root)
 
     if login_success:
         # Step 2: Launch main app only after successful login
-        root = ttk.Window(themename="cosmo")
-        root.title("Digital Product Organizer")
+        from gui import DPOApp  # loaded after login so the dialog comes up sooner
 
         dpo = DPOApp(root)
+        root.deiconify()
 
         if is_email_config_missing():
             dpo.open_email_settings()
 
         root.mainloop()
+        dpo.outbox.stop()
+        dpo.watcher.stop()
+        smtp_pool.close()
+    else:
+        root.destroy()
@@ -0,0 +1,173 @@
+# metrics.py
+# In-process timing for the slow paths (receipt rendering, SMTP connect,
+# AUTH and upload, store/CSV bookkeeping, folder scans). Code marks them
+# with span()/timed() and count(); snapshot() turns the recorded samples
+# into p50/p95/p99 per name and export() writes that to logs/metrics.json.
+#
+#   with metrics.span("smtp.auth"):
+#       smtp.login(user, password)
+#
+# Set DPO_METRICS=0 to turn it off: span() then hands back one shared
+# no-op object and timed() functions cost a single flag check.
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+METRICS_FILE = os.path.join("logs", "metrics.json")
+# Percentiles are taken over the most recent samples of each span
+MAX_SAMPLES = 2048
+
+_enabled = os.environ.get("DPO_METRICS", "1").lower() not in ("0", "false", "no", "off")
+_lock = threading.Lock()
+_spans = {}     # name -> _Histogram
+_counters = {}  # name -> number
+
+
+class _Histogram:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start)
+        if exc_type is not None:
+            count(self.name + ".errors")
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def span(name):
+    """Context manager that records how long its block took under ``name``."""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def timed(name):
+    """Decorator version of span()."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe(name, seconds):
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _spans.get(name)
+        if histogram is None:
+            histogram = _spans[name] = _Histogram()
+        histogram.add(seconds)
+
+
+def count(name, n=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(1, math.ceil(len(ordered) * fraction)) - 1]
+
+
+def snapshot():
+    """Durations in milliseconds per span, plus the counters."""
+    with _lock:
+        spans = {name: (h.count, h.total, h.max, sorted(h.samples)) for name, h in _spans.items()}
+        counters = dict(_counters)
+    summary = {}
+    for name, (n, total, longest, ordered) in sorted(spans.items()):
+        summary[name] = {
+            "count": n,
+            "mean_ms": round(total / n * 1000, 3),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round(longest * 1000, 3),
+        }
+    return {"updated": datetime.now().isoformat(timespec="seconds"), "spans": summary,
+            "counters": dict(sorted(counters.items()))}
+
+
+def export(path=None):
+    """Write snapshot() to ``path`` (METRICS_FILE by default, atomically) and return it."""
+    path = path or METRICS_FILE
+    data = snapshot()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+    return data
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+@atexit.register
+def _export_at_exit():
+    if _enabled and (_spans or _counters):
+        try:
+            export()
+        except OSError:
+            pass
@@ -0,0 +1,117 @@
+# mime_stream.py
+# Builds a multipart/mixed message as a stream of byte chunks so large
+# attachments never have to sit in memory as a whole.
+import base64
+import os
+import smtplib
+import uuid
+from email import policy
+from email.message import EmailMessage, MIMEPart
+from email.utils import formatdate, make_msgid
+
+# 57 raw bytes -> one 76 character base64 line, so every chunk ends on a line.
+READ_CHUNK = 57 * 1024
+CRLF = b"\r\n"
+
+
+def _header_block(headers):
+    return b"".join(policy.SMTP.fold_binary(name, value) for name, value in headers.items())
+
+
+def _b64_lines(data):
+    return base64.encodebytes(data).replace(b"\n", CRLF)
+
+
+def _text_part(subtype, text):
+    part = MIMEPart(policy=policy.SMTP)
+    part['Content-Type'] = f'text/{subtype}; charset="utf-8"'
+    part['Content-Transfer-Encoding'] = "base64"
+    return _header_block(part) + CRLF + _b64_lines(text.encode("utf-8"))
+
+
+def iter_message(sender, to_email, subject, body, attachments, html=None):
+    """Yield the message as CRLF-terminated, SMTP-ready byte chunks.
+
+    Every part is base64 encoded, so no line can start with "." and the
+    DATA payload needs no dot-stuffing. With ``html`` the body goes out as
+    a multipart/alternative of ``body`` and ``html``.
+    """
+    boundary = f"===============dpo{uuid.uuid4().hex}=="
+    top = EmailMessage(policy=policy.SMTP)
+    top['Subject'] = subject
+    top['From'] = sender
+    top['To'] = to_email
+    top['Date'] = formatdate(localtime=True)
+    top['Message-ID'] = make_msgid()
+    top['MIME-Version'] = "1.0"
+    top['Content-Type'] = f'multipart/mixed; boundary="{boundary}"'
+    delimiter = f"--{boundary}".encode() + CRLF
+
+    yield _header_block(top) + CRLF
+
+    if html:
+        inner = f"===============dpo{uuid.uuid4().hex}=="
+        alternative = MIMEPart(policy=policy.SMTP)
+        alternative['Content-Type'] = f'multipart/alternative; boundary="{inner}"'
+        yield (delimiter + _header_block(alternative) + CRLF
+               + f"--{inner}".encode() + CRLF + _text_part("plain", body)
+               + f"--{inner}".encode() + CRLF + _text_part("html", html)
+               + f"--{inner}--".encode() + CRLF)
+    else:
+        yield delimiter + _text_part("plain", body)
+
+    for path in attachments:
+        part = MIMEPart(policy=policy.SMTP)
+        part['Content-Type'] = "application/octet-stream"
+        part['Content-Transfer-Encoding'] = "base64"
+        part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(path))
+        yield delimiter + _header_block(part) + CRLF
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(READ_CHUNK)
+                if not data:
+                    break
+                yield _b64_lines(data)
+
+    yield f"--{boundary}--".encode() + CRLF
+
+
+def send_streamed(smtp, sender, recipients, chunks):
+    """Run MAIL/RCPT/DATA on ``smtp`` and write ``chunks`` straight to the socket."""
+    smtp.ehlo_or_helo_if_needed()
+    code, resp = smtp.mail(sender)
+    if code != 250:
+        _rset_quietly(smtp)
+        raise smtplib.SMTPSenderRefused(code, resp, sender)
+
+    refused = {}
+    for rcpt in recipients:
+        code, resp = smtp.rcpt(rcpt)
+        if code not in (250, 251):
+            refused[rcpt] = (code, resp)
+    if len(refused) == len(recipients):
+        _rset_quietly(smtp)
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    smtp.putcmd("data")
+    code, resp = smtp.getreply()
+    if code != 354:
+        _rset_quietly(smtp)
+        raise smtplib.SMTPDataError(code, resp)
+
+    for chunk in chunks:
+        smtp.send(chunk)
+    smtp.send(b"." + CRLF)
+
+    code, resp = smtp.getreply()
+    if code != 250:
+        _rset_quietly(smtp)
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
+
+
+def _rset_quietly(smtp):
+    try:
+        smtp.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
@@ -0,0 +1,195 @@
+# outbox.py
+# Persistent send queue. Every state change is appended to a JSON-lines
+# journal next to clients.csv, so jobs still pending after a crash or restart
+# are picked up again on the next start.
+import heapq
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from functools import partial
+
+from bulk_sender import deliver
+from logger import logger
+
+OUTBOX_FILE = "outbox.jsonl"
+OUTBOX_WORKERS = 2
+MAX_ATTEMPTS = 5
+BASE_DELAY = 2      # seconds before the first retry
+MAX_DELAY = 300     # backoff ceiling
+
+
+def backoff_delay(attempt, base=BASE_DELAY, ceiling=MAX_DELAY):
+    return min(ceiling, base * (2 ** (attempt - 1)))
+
+
+def replay_journal(path=OUTBOX_FILE):
+    """Return ``{job_id: entry}`` for every job in the journal that has not
+    finished, where entry holds the job and how many attempts it has used."""
+    pending = {}
+    if not os.path.exists(path):
+        return pending
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn last line from a crash mid-write; everything before it is intact.
+                logger.warning(f"Skipping unreadable outbox record in {path}")
+                continue
+            op, job_id = record.get("op"), record.get("id")
+            if op == "queued":
+                pending[job_id] = {"job": record["job"], "attempts": 0}
+            elif op == "attempt" and job_id in pending:
+                pending[job_id]["attempts"] = record.get("attempt", 0)
+            elif op == "progress" and job_id in pending:
+                # receipt made / message sent: a resumed job picks up from there
+                pending[job_id]["job"].update(record.get("update", {}))
+            elif op in ("done", "failed"):
+                pending.pop(job_id, None)
+    return pending
+
+
+class Outbox:
+    """Runs queued delivery jobs on background workers.
+
+    Progress is reported on ``events`` (a ``queue.Queue``) as tuples of
+    ``(kind, job_id, job, detail)`` where kind is "queued", "retry", "done"
+    or "failed", so the GUI can poll it from ``root.after``.
+
+    ``handler(job, checkpoint=...)`` may call ``checkpoint(update)`` with
+    fields to merge into the job; they are journaled before the handler
+    moves on, so retries and restarts see them.
+    """
+
+    def __init__(self, path=OUTBOX_FILE, handler=deliver, workers=OUTBOX_WORKERS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.events = queue.Queue()
+        self._jobs = {}
+        self._ready = []  # heap of (not_before, seq, job_id)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._journal_lock = threading.Lock()
+        self._threads = []
+        self._stopping = False
+
+    def start(self):
+        pending = replay_journal(self.path)
+        self._compact(pending)
+        with self._cond:
+            for job_id, entry in pending.items():
+                self._jobs[job_id] = entry
+                self._push(job_id, 0)
+        if pending:
+            logger.info(f"Resuming {len(pending)} pending outbox job(s)")
+
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"outbox-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=5):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+
+    def enqueue(self, job):
+        job_id = uuid.uuid4().hex
+        self._append({"op": "queued", "id": job_id, "job": job, "ts": time.time()})
+        with self._cond:
+            self._jobs[job_id] = {"job": job, "attempts": 0}
+            self._push(job_id, 0)
+            self._cond.notify()
+        self.events.put(("queued", job_id, job, None))
+        return job_id
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._jobs)
+
+    def _push(self, job_id, not_before):
+        self._seq += 1
+        heapq.heappush(self._ready, (not_before, self._seq, job_id))
+
+    def _next_job(self):
+        with self._cond:
+            while not self._stopping:
+                if self._ready:
+                    not_before, _, job_id = self._ready[0]
+                    wait = not_before - time.time()
+                    if wait <= 0:
+                        heapq.heappop(self._ready)
+                        return job_id, self._jobs[job_id]
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            return None, None
+
+    def _work(self):
+        while True:
+            job_id, entry = self._next_job()
+            if job_id is None:
+                return
+            job = entry["job"]
+            entry["attempts"] += 1
+            try:
+                result = self.handler(job, checkpoint=partial(self._checkpoint, job_id))
+            except Exception as e:
+                self._failed_attempt(job_id, entry, e)
+                continue
+
+            self._append({"op": "done", "id": job_id, "result": result, "ts": time.time()})
+            with self._cond:
+                self._jobs.pop(job_id, None)
+            logger.info(f"Outbox job {job_id} delivered to {job.get('email')}")
+            self.events.put(("done", job_id, job, result))
+
+    def _checkpoint(self, job_id, update):
+        self._append({"op": "progress", "id": job_id, "update": update, "ts": time.time()})
+
+    def _failed_attempt(self, job_id, entry, error):
+        job, attempt = entry["job"], entry["attempts"]
+        if attempt >= self.max_attempts:
+            self._append({"op": "failed", "id": job_id, "error": str(error), "ts": time.time()})
+            with self._cond:
+                self._jobs.pop(job_id, None)
+            logger.error(f"Outbox job {job_id} for {job.get('email')} failed after {attempt} attempts: {error}")
+            self.events.put(("failed", job_id, job, str(error)))
+            return
+
+        delay = backoff_delay(attempt)
+        self._append({"op": "attempt", "id": job_id, "attempt": attempt, "error": str(error), "ts": time.time()})
+        logger.warning(f"Outbox job {job_id} attempt {attempt} failed ({error}); retrying in {delay}s")
+        with self._cond:
+            self._push(job_id, time.time() + delay)
+            self._cond.notify()
+        self.events.put(("retry", job_id, job, {"attempt": attempt, "delay": delay, "error": str(error)}))
+
+    def _append(self, record):
+        line = json.dumps(record) + "\n"
+        with self._journal_lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _compact(self, pending):
+        """Rewrite the journal with only the still-pending jobs."""
+        if not os.path.exists(self.path):
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for job_id, entry in pending.items():
+                f.write(json.dumps({"op": "queued", "id": job_id, "job": entry["job"], "ts": time.time()}) + "\n")
+                if entry["attempts"]:
+                    f.write(json.dumps({"op": "attempt", "id": job_id, "attempt": entry["attempts"]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -1,82 +1,183 @@
-from fpdf import FPDF
+# receipt_generator.py
+# fpdf takes a third of a second to import, so it is loaded with the first
+# receipt rather than at startup.
+import copy
 import os
+import threading
 from datetime import datetime
 
-def create_pdf_receipt(client_name, files, price=0, tax=0, discount=0):
+import metrics
+from logger import logger
+from receipt_ids import next_receipt_id
+from receipt_ledger import record_receipt
+
+LOGO_PATH = "assets/logo.png"
+BUSINESS_NAME = "Digital Product Organizer"
+FOOTER_TEXT = "Thank you for your purchase!"
+
+# Pre-seeding the logo relies on the layout of fpdf2's per-document image
+# cache (image_cache.images entries with "i", "usages" and "iccp_i"), which
+# is not public API. It is only done on the fpdf2 releases it was checked
+# against (see requirements.txt); anything else gets the plain image() call.
+SEEDED_FPDF_VERSIONS = ("2.8.",)
+
+
+class ReceiptRenderer:
+    """Long-lived receipt renderer.
+
+    Decoding and recompressing the logo is most of the cost of a receipt, so
+    it is parsed once and handed to every new document pre-loaded. The logo
+    is re-read when the file's mtime or size changes.
+    """
+
+    def __init__(self, logo_path=LOGO_PATH):
+        self.logo_path = logo_path
+        self._logo_info = None
+        self._logo_stamp = None
+        self._lock = threading.Lock()
+
+    def _cached_logo(self):
+        """Return the parsed logo info, or None if it can't be cached."""
+        try:
+            from fpdf import __version__ as fpdf_version
+            from fpdf.image_parsing import preload_image
+            from fpdf.image_datastructures import ImageCache
+        except ImportError:  # older fpdf: no reusable image cache, logo is parsed per receipt
+            return None
+        if not fpdf_version.startswith(SEEDED_FPDF_VERSIONS):
+            return None
+        try:
+            st = os.stat(self.logo_path)
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if stamp != self._logo_stamp:
+                scratch = ImageCache()
+                _, _, info = preload_image(scratch, self.logo_path)
+                # ICC profiles are registered and numbered per document (and
+                # "iccp" is cleared once they are); let fpdf handle those itself.
+                icc = info.get("iccp_i") is not None or scratch.icc_profiles
+                self._logo_info = None if icc else info
+                self._logo_stamp = stamp
+            return self._logo_info
+
+    def _draw_logo(self, pdf):
+        if not os.path.exists(self.logo_path):
+            return
+        info = self._cached_logo()
+        images = getattr(getattr(pdf, "image_cache", None), "images", None)
+        if info is not None and isinstance(images, dict) and {"i", "usages"} <= info.keys():
+            # Seed this document's cache so fpdf reuses the parsed image
+            seeded = copy.copy(info)
+            seeded.update(i=1, usages=0, iccp_i=None)
+            images[self.logo_path] = seeded
+        pdf.image(self.logo_path, x=10, y=10, h=20)
+
+    def _draw_header(self, pdf, receipt_num):
+        # Logo (top left)
+        self._draw_logo(pdf)
+
+        # Receipt number (top right)
+        pdf.set_xy(150, 10)
+        pdf.set_font("Helvetica", size=9, style='B')
+        pdf.cell(0, 10, f"Receipt #: {receipt_num}", ln=True)
+
+        # Business Name
+        pdf.set_xy(10, 35)
+        pdf.set_font("Helvetica", size=14, style='B')
+        pdf.cell(0, 10, BUSINESS_NAME, ln=True)
+
+        # Line under header
+        pdf.set_draw_color(180, 180, 180)
+        pdf.set_line_width(0.4)
+        pdf.line(10, 48, 200, 48)
+
+    @staticmethod
+    def _draw_footer(pdf):
+        # Footer spacing (no email or contact info)
+        pdf.set_y(-30)
+        pdf.set_draw_color(200, 200, 200)
+        pdf.set_line_width(0.3)
+        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+
+        pdf.set_font("Helvetica", size=8)
+        pdf.ln(2)
+        pdf.cell(0, 6, FOOTER_TEXT, ln=True, align='C')
+
+    def render(self, receipt_path, receipt_num, client_name, timestamp, files, price=0, tax=0, discount=0):
+        from fpdf import FPDF
+
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=False)
+        pdf.set_margins(10, 10, 10)
+        pdf.set_font("Helvetica", size=10)
+
+        self._draw_header(pdf, receipt_num)
+
+        # Client Info
+        pdf.set_y(52)
+        pdf.set_font("Helvetica", size=10)
+        pdf.cell(0, 8, f"Client: {client_name}", ln=True)
+        pdf.cell(0, 8, f"Date: {timestamp}", ln=True)
+
+        pdf.ln(2)
+        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+
+        # Files
+        pdf.ln(4)
+        pdf.set_font("Helvetica", size=10, style='B')
+        pdf.cell(0, 8, "Files Sent:", ln=True)
+
+        pdf.set_font("Helvetica", size=10)
+        for file_path in files:
+            filename = os.path.basename(file_path)
+            pdf.cell(0, 6, f"- {filename}", ln=True)
+
+        # Totals
+        pdf.ln(4)
+        pdf.set_font("Helvetica", size=10)
+        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+        pdf.ln(2)
+        pdf.cell(0, 8, f"Price: ${price:.2f}", ln=True)
+        pdf.cell(0, 8, f"Tax: ${tax:.2f}", ln=True)
+        pdf.cell(0, 8, f"Discount: -${discount:.2f}", ln=True)
+
+        total = price + tax - discount
+        pdf.set_font("Helvetica", size=11, style='B')
+        pdf.cell(0, 10, f"Total: ${total:.2f}", ln=True)
+
+        self._draw_footer(pdf)
+
+        pdf.output(receipt_path)
+        return receipt_path
+
+
+# Shared by every caller in this process
+renderer = ReceiptRenderer()
+
+
+@metrics.timed("receipt.create")
+def create_pdf_receipt(client_name, files, price=0, tax=0, discount=0, email=None):
     os.makedirs("receipts", exist_ok=True)
-    date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-    receipt_num = datetime.now().strftime("R-%Y%m%d-%H%M%S")
+    # The sequence number keeps receipts made in the same second (batch or
+    # concurrent sends) from overwriting each other.
+    seq = next_receipt_id()
+    now = datetime.now()
+    date_str = now.strftime("%Y%m%d_%H%M%S")
+    timestamp = now.strftime("%Y-%m-%d %H:%M")
+    receipt_num = f"R-{now:%Y%m%d}-{seq:06d}"
     safe_name = client_name.replace(' ', '_')
-    receipt_path = f"receipts/{safe_name}_{date_str}.pdf"
-
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=False)
-    pdf.set_margins(10, 10, 10)
-    pdf.set_font("Helvetica", size=10)
-
-    # Logo (top left)
-    logo_path = "assets/logo.png"
-    if os.path.exists(logo_path):
-        pdf.image(logo_path, x=10, y=10, h=20)
-
-    # Receipt number (top right)
-    pdf.set_xy(150, 10)
-    pdf.set_font("Helvetica", size=9, style='B')
-    pdf.cell(0, 10, f"Receipt #: {receipt_num}", ln=True)
-
-    # Business Name
-    pdf.set_xy(10, 35)
-    pdf.set_font("Helvetica", size=14, style='B')
-    pdf.cell(0, 10, "Digital Product Organizer", ln=True)
-
-    # Line under header
-    pdf.set_draw_color(180, 180, 180)
-    pdf.set_line_width(0.4)
-    pdf.line(10, 48, 200, 48)
-
-    # Client Info
-    pdf.set_y(52)
-    pdf.set_font("Helvetica", size=10)
-    pdf.cell(0, 8, f"Client: {client_name}", ln=True)
-    pdf.cell(0, 8, f"Date: {timestamp}", ln=True)
-
-    pdf.ln(2)
-    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-
-    # Files
-    pdf.ln(4)
-    pdf.set_font("Helvetica", size=10, style='B')
-    pdf.cell(0, 8, "Files Sent:", ln=True)
-
-    pdf.set_font("Helvetica", size=10)
-    for file_path in files:
-        filename = os.path.basename(file_path)
-        pdf.cell(0, 6, f"- {filename}", ln=True)
-
-    # Totals
-    pdf.ln(4)
-    pdf.set_font("Helvetica", size=10)
-    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-    pdf.ln(2)
-    pdf.cell(0, 8, f"Price: ${price:.2f}", ln=True)
-    pdf.cell(0, 8, f"Tax: ${tax:.2f}", ln=True)
-    pdf.cell(0, 8, f"Discount: -${discount:.2f}", ln=True)
-
-    total = price + tax - discount
-    pdf.set_font("Helvetica", size=11, style='B')
-    pdf.cell(0, 10, f"Total: ${total:.2f}", ln=True)
-
-    # Footer spacing (no email or contact info)
-    pdf.set_y(-30)
-    pdf.set_draw_color(200, 200, 200)
-    pdf.set_line_width(0.3)
-    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-
-    pdf.set_font("Helvetica", size=8)
-    pdf.ln(2)
-    pdf.cell(0, 6, "Thank you for your purchase!", ln=True, align='C')
-
-    pdf.output(receipt_path)
+    receipt_path = f"receipts/{safe_name}_{date_str}_{seq:06d}.pdf"
+
+    with metrics.span("receipt.render"):
+        renderer.render(receipt_path, receipt_num, client_name, timestamp, files, price, tax, discount)
+    try:
+        with metrics.span("receipt.ledger"):
+            record_receipt(receipt_num, receipt_path, client_name, files, price, tax, discount, email=email,
+                           created=now.strftime("%Y-%m-%d %H:%M:%S"))
+    except Exception as e:
+        # The PDF is already written; the ledger can be backfilled later
+        logger.error(f"Could not record receipt {receipt_path} in ledger: {e}")
     return receipt_path
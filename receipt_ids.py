@@ -0,0 +1,95 @@
+# receipt_ids.py
+# Monotonic receipt numbers that stay unique across threads and processes.
+#
+# The next free number lives in receipts/.receipt_counter. Each process
+# reserves a block of numbers under a file lock and then hands them out
+# without any lock at all, so parallel receipt generation only touches the
+# counter file once per RESERVE_BLOCK receipts.
+import os
+import threading
+
+COUNTER_FILE = os.path.join("receipts", ".receipt_counter")
+RESERVE_BLOCK = 64
+
+if os.name == "nt":
+    import msvcrt
+
+    def lock_file(f):
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK gives up after ~10s; keep waiting
+
+    def unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def reserve_block(path=COUNTER_FILE, size=RESERVE_BLOCK):
+    """Atomically claim ``size`` numbers from the counter file; returns the first."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, "r+") as f:
+        lock_file(f)
+        try:
+            f.seek(0)
+            text = f.read().strip()
+            start = int(text) if text else 1
+            f.seek(0)
+            f.write(f"{start + size:<20}\n")  # fixed width, so no truncate is needed
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            unlock_file(f)
+    return start
+
+
+class ReceiptIdAllocator:
+    """Hands out receipt sequence numbers from per-process reserved blocks.
+
+    Numbers are unique and increasing within a process and never reused
+    across processes; numbers left in a block when a process exits are
+    simply skipped.
+    """
+
+    def __init__(self, path=COUNTER_FILE, block_size=RESERVE_BLOCK):
+        self.path = path
+        self.block_size = block_size
+        self._ids = iter(())
+        self._pid = None
+        self._refill_lock = threading.Lock()
+
+    def next_id(self):
+        if self._pid == os.getpid():
+            # next() on a range iterator is atomic under the GIL: no lock needed
+            seq = next(self._ids, None)
+            if seq is not None:
+                return seq
+        with self._refill_lock:
+            # A forked worker must not keep using its parent's block
+            if self._pid == os.getpid():
+                seq = next(self._ids, None)
+                if seq is not None:
+                    return seq
+            start = reserve_block(self.path, self.block_size)
+            self._ids = iter(range(start, start + self.block_size))
+            self._pid = os.getpid()
+            return next(self._ids)
+
+
+allocator = ReceiptIdAllocator()
+
+
+def next_receipt_id():
+    return allocator.next_id()
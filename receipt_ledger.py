@@ -0,0 +1,166 @@
+# receipt_ledger.py
+# SQLite index of every generated receipt, so the Receipts tab can list,
+# sort, filter and look up clients without rescanning receipts/.
+import os
+import re
+from datetime import datetime
+
+from db import connect
+import metrics
+
+LEDGER_PATH = os.path.join("receipts", "ledger.db")
+
+SORT_COLUMNS = {"filename", "client", "email", "total", "created"}
+
+# <safe_name>_<YYYYmmdd_HHMMSS>[_<seq>].pdf, as written by create_pdf_receipt
+_FILENAME_RE = re.compile(r"^(?P<name>.+)_(?P<stamp>\d{8}_\d{6})(?:_(?P<seq>\d+))?\.pdf$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    receipt_num TEXT PRIMARY KEY,
+    filename    TEXT NOT NULL UNIQUE,
+    path        TEXT NOT NULL,
+    client      TEXT NOT NULL,
+    email       TEXT,
+    files       TEXT,
+    price       REAL,
+    tax         REAL,
+    discount    REAL,
+    total       REAL,
+    created     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_receipts_client ON receipts (client COLLATE NOCASE, created);
+CREATE INDEX IF NOT EXISTS idx_receipts_created ON receipts (created);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _connect(path=LEDGER_PATH):
+    return connect(path, _SCHEMA)
+
+
+def record_receipt(receipt_num, receipt_path, client, files, price=0, tax=0, discount=0, email=None,
+                   created=None, path=LEDGER_PATH):
+    conn = _connect(path)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO receipts (receipt_num, filename, path, client, email, files, price, tax,"
+            " discount, total, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (receipt_num, os.path.basename(receipt_path), receipt_path, client, email, "|".join(files),
+             price, tax, discount, price + tax - discount,
+             created or datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        )
+
+
+@metrics.timed("receipts.list")
+def list_receipts(search=None, sort="created", descending=True, limit=None, path=LEDGER_PATH):
+    """Return ledger rows, optionally filtered by client/email/file name."""
+    if sort not in SORT_COLUMNS:
+        sort = "created"
+    sql = "SELECT * FROM receipts"
+    params = []
+    if search:
+        sql += " WHERE client LIKE ? OR email LIKE ? OR filename LIKE ?"
+        params = [f"%{search}%"] * 3
+    sql += f" ORDER BY {sort} {'DESC' if descending else 'ASC'}"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return _connect(path).execute(sql, params).fetchall()
+
+
+def get_receipt(filename, path=LEDGER_PATH):
+    return _connect(path).execute("SELECT * FROM receipts WHERE filename = ?", (filename,)).fetchone()
+
+
+def emails_for_client(client, path=LEDGER_PATH):
+    rows = _connect(path).execute(
+        "SELECT DISTINCT email FROM receipts WHERE client = ? COLLATE NOCASE AND email IS NOT NULL AND email != ''",
+        (client,),
+    )
+    return [row["email"] for row in rows]
+
+
+def delete_receipt(filename, path=LEDGER_PATH):
+    conn = _connect(path)
+    with conn:
+        conn.execute("DELETE FROM receipts WHERE filename = ?", (filename,))
+
+
+def _legacy_row(filename, file_path, mtime):
+    match = _FILENAME_RE.match(filename)
+    if match:
+        client = match.group("name").replace("_", " ")
+    else:
+        client = os.path.splitext(filename)[0].split("_")[0]
+    created = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
+    return f"legacy:{filename}", filename, file_path, client, created
+
+
+def index_file(file_path, path=LEDGER_PATH):
+    """Make sure a receipt PDF that appeared on disk has a ledger row and
+    return it. Receipts this app wrote are already recorded; anything else
+    gets a row parsed from its file name."""
+    filename = os.path.basename(file_path)
+    row = get_receipt(filename, path)
+    if row is not None:
+        return row
+    try:
+        mtime = os.path.getmtime(file_path)
+    except OSError:
+        return None
+    conn = _connect(path)
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO receipts (receipt_num, filename, path, client, created)"
+                     " VALUES (?, ?, ?, ?, ?)", _legacy_row(filename, file_path, mtime))
+    return get_receipt(filename, path)
+
+
+@metrics.timed("receipts.backfill")
+def backfill(folder="receipts", path=LEDGER_PATH, force=False):
+    """Index receipts that predate the ledger and drop rows whose PDF is
+    gone. Runs once unless ``force``."""
+    conn = _connect(path)
+    if not force and conn.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone():
+        return 0
+    if not os.path.isdir(folder):
+        return 0
+
+    known = {row["filename"] for row in conn.execute("SELECT filename FROM receipts")}
+    on_disk = set()
+    added = 0
+    with conn:
+        for entry in os.scandir(folder):
+            if not entry.name.endswith(".pdf") or not entry.is_file():
+                continue
+            on_disk.add(entry.name)
+            if entry.name in known:
+                continue
+            conn.execute(
+                "INSERT OR IGNORE INTO receipts (receipt_num, filename, path, client, created)"
+                " VALUES (?, ?, ?, ?, ?)",
+                _legacy_row(entry.name, entry.path, entry.stat().st_mtime),
+            )
+            added += 1
+        _delete_rows(conn, known - on_disk)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', ?)",
+                     (datetime.now().isoformat(timespec="seconds"),))
+    return added
+
+
+def prune_missing(folder="receipts", path=LEDGER_PATH):
+    """Drop rows for receipts no longer in ``folder`` (deleted while the app
+    wasn't watching); returns how many went."""
+    try:
+        on_disk = set(os.listdir(folder))
+    except OSError:
+        return 0
+    conn = _connect(path)
+    missing = {row["filename"] for row in conn.execute("SELECT filename FROM receipts")} - on_disk
+    with conn:
+        _delete_rows(conn, missing)
+    return len(missing)
+
+
+def _delete_rows(conn, filenames):
+    conn.executemany("DELETE FROM receipts WHERE filename = ?", ((name,) for name in filenames))
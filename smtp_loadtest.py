@@ -0,0 +1,474 @@
+# smtp_loadtest.py
+# Offline load test for the send path. Starts a stand-in SMTP server in
+# this process (optionally with STARTTLS and AUTH, and with injected
+# latency and failures), pushes orders through the app's own code and
+# reports throughput, latency percentiles and peak memory.
+#
+#   python smtp_loadtest.py --messages 200 --concurrency 4 --size 1MB
+#   python smtp_loadtest.py --mode send_all --messages 50 --starttls --auth --latency-ms 40 --fail-rate 0.05
+#
+# "send" calls emailer.send_files_with_receipt from a thread pool. "send_all"
+# follows the GUI's Send button: orders go through the Outbox into
+# bulk_sender.deliver, so receipts, retries and bookkeeping are included.
+# Everything runs in a scratch folder and nothing leaves the machine. The
+# server only counts what it receives, so peak RSS is the client's.
+import argparse
+import base64
+import json
+import os
+import random
+import shutil
+import socketserver
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SENDER = "loadtest@example.com"
+AUTH_USER = "loadtest"
+AUTH_PASSWORD = "loadtest-password"
+END_OF_DATA = b"\r\n.\r\n"
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """Just enough ESMTP for smtplib: EHLO/HELO, STARTTLS, AUTH PLAIN/LOGIN,
+    MAIL, RCPT, DATA, RSET, NOOP and QUIT. Message bodies are counted and
+    dropped.
+
+    ``latency`` (+ up to ``jitter``) seconds are spent before answering each
+    DATA; ``fail_rate`` of messages get a 451 and ``disconnect_rate`` a 421
+    followed by a hang-up.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), tls_context=None, auth=None, latency=0.0, jitter=0.0,
+                 fail_rate=0.0, disconnect_rate=0.0, seed=None):
+        super().__init__(address, _SMTPHandler)
+        self.tls_context = tls_context
+        self.auth = auth  # (user, password) or None
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.disconnect_rate = disconnect_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"sessions": 0, "messages": 0, "bytes": 0, "rejected": 0, "disconnected": 0,
+                      "auth_failures": 0}
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def outcome(self):
+        with self.lock:
+            roll = self.random.random()
+            delay = self.latency + (self.random.random() * self.jitter if self.jitter else 0)
+        if roll < self.disconnect_rate:
+            return delay, "disconnect"
+        if roll < self.disconnect_rate + self.fail_rate:
+            return delay, "reject"
+        return delay, "ok"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-smtp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, *lines):
+        # Multi-line replies use "250-" on every line but the last
+        text = "".join(f"{line[:3]}{'-' if i < len(lines) - 1 else ' '}{line[4:]}\r\n"
+                       for i, line in enumerate(lines))
+        self.wfile.write(text.encode())
+        self.wfile.flush()
+
+    def handle(self):
+        server = self.server
+        server.count("sessions")
+        self.tls = False
+        self.authed = server.auth is None
+        self.reply("220 localhost fake ESMTP ready")
+        while True:
+            line = self.rfile.readline(65536)
+            if not line:
+                return
+            command, _, argument = line.decode("ascii", "replace").strip().partition(" ")
+            command = command.upper()
+            if command == "EHLO":
+                lines = ["250 localhost", "250 8BITMIME"]
+                if server.tls_context is not None and not self.tls:
+                    lines.append("250 STARTTLS")
+                if server.auth is not None:
+                    lines.append("250 AUTH PLAIN LOGIN")
+                self.reply(*lines, "250 SMTPUTF8")
+            elif command == "HELO":
+                self.reply("250 localhost")
+            elif command == "STARTTLS":
+                if server.tls_context is None or self.tls:
+                    self.reply("502 STARTTLS not available")
+                    continue
+                self.reply("220 Ready to start TLS")
+                self.connection = server.tls_context.wrap_socket(self.connection, server_side=True)
+                self.rfile = self.connection.makefile("rb")
+                self.wfile = self.connection.makefile("wb")
+                self.tls, self.authed = True, server.auth is None
+            elif command == "AUTH":
+                self.authenticate(argument)
+            elif command == "MAIL":
+                if self.authed:
+                    self.reply("250 OK")
+                else:
+                    self.reply("530 Authentication required")
+            elif command == "RCPT":
+                self.reply("250 OK")
+            elif command == "DATA":
+                if not self.receive_data():
+                    return
+            elif command in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("500 Command not recognized")
+
+    def authenticate(self, argument):
+        mechanism, _, initial = argument.partition(" ")
+        mechanism = mechanism.upper()
+        try:
+            if mechanism == "PLAIN":
+                if not initial:
+                    self.reply("334 ")
+                    initial = self.rfile.readline().strip().decode()
+                _, user, password = base64.b64decode(initial).decode().split("\0")
+            elif mechanism == "LOGIN":
+                self.reply("334 VXNlcm5hbWU6")
+                user = base64.b64decode(self.rfile.readline().strip()).decode()
+                self.reply("334 UGFzc3dvcmQ6")
+                password = base64.b64decode(self.rfile.readline().strip()).decode()
+            else:
+                self.reply("504 Unrecognized authentication type")
+                return
+        except ValueError:
+            self.reply("501 Malformed AUTH")
+            return
+        if (user, password) == self.server.auth:
+            self.authed = True
+            self.reply("235 Authentication successful")
+        else:
+            self.server.count("auth_failures")
+            self.reply("535 Authentication credentials invalid")
+
+    def receive_data(self):
+        """Read a DATA payload up to the lone "."; False if the session ends."""
+        self.reply("354 End data with <CR><LF>.<CR><LF>")
+        tail, size = b"\r\n", 0
+        while True:
+            chunk = self.rfile.read1(256 * 1024)
+            if not chunk:
+                return False
+            size += len(chunk)
+            window = tail + chunk
+            if END_OF_DATA in window:
+                break
+            tail = window[-4:]
+        delay, outcome = self.server.outcome()
+        if delay:
+            time.sleep(delay)
+        if outcome == "disconnect":
+            self.server.count("disconnected")
+            self.reply("421 Service closing transmission channel")
+            return False
+        if outcome == "reject":
+            self.server.count("rejected")
+            self.reply("451 Temporary failure, try again later")
+            return True
+        self.server.count("messages")
+        self.server.count("bytes", size)
+        self.reply("250 OK: queued")
+        return True
+
+
+# --- Harness ----------------------------------------------------------------
+
+def parse_size(text):
+    text = text.strip().upper()
+    for suffix, factor in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024), ("B", 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def self_signed_context(folder):
+    """A server TLS context with a throwaway certificate made by openssl."""
+    cert, key = os.path.join(folder, "cert.pem"), os.path.join(folder, "key.pem")
+    try:
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+                        "-days", "1", "-subj", "/CN=localhost"], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise SystemExit(f"error: --starttls needs openssl to make a test certificate ({e}); "
+                         f"or pass --certfile/--keyfile")
+    return server_context(cert, key)
+
+
+def server_context(certfile, keyfile):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def latency_summary(seconds):
+    import metrics
+
+    ordered = sorted(seconds)
+    if not ordered:
+        return {}
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(metrics.percentile(ordered, 0.50) * 1000, 2),
+        "p90_ms": round(metrics.percentile(ordered, 0.90) * 1000, 2),
+        "p95_ms": round(metrics.percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(metrics.percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def make_attachments(folder, size, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"attachment-{i + 1}.bin")
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining > 0:
+                block = os.urandom(min(remaining, 1024 * 1024))
+                f.write(block)
+                remaining -= len(block)
+        paths.append(path)
+    return paths
+
+
+def run_send(args, pool, attachments):
+    """send_files_with_receipt from ``args.concurrency`` threads."""
+    from emailer import send_files_with_receipt
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            send_files_with_receipt(f"client{i}@example.com", f"Client {i}", attachments, pool=pool)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(args.messages)))
+    return latencies, errors, {}
+
+
+def run_send_all(args, pool, attachments):
+    """The GUI's send path: Outbox workers running bulk_sender.deliver."""
+    from bulk_sender import deliver, make_job
+    from outbox import Outbox
+
+    service = []
+    lock = threading.Lock()
+
+    def handler(job, checkpoint=None):
+        start = time.perf_counter()
+        result = deliver(job, pool=pool, checkpoint=checkpoint)
+        with lock:
+            service.append(time.perf_counter() - start)
+        return result
+
+    outbox = Outbox(path="outbox.jsonl", handler=handler, workers=args.concurrency, max_attempts=args.max_attempts)
+    outbox.start()
+    queued_at, end_to_end, errors = {}, [], []
+    try:
+        for i in range(args.messages):
+            job = make_job(f"Client {i}", f"client{i}@example.com", attachments, price=10,
+                           send_receipt=not args.no_receipt)
+            queued_at[outbox.enqueue(job)] = time.perf_counter()
+        finished = 0
+        while finished < args.messages:
+            kind, job_id, _, detail = outbox.events.get()
+            if kind == "done":
+                end_to_end.append(time.perf_counter() - queued_at[job_id])
+            elif kind == "failed":
+                errors.append(detail)
+            else:
+                continue
+            finished += 1
+    finally:
+        outbox.stop()
+    return service, errors, {"end_to_end": latency_summary(end_to_end)}
+
+
+def run(args):
+    import metrics
+
+    workdir = tempfile.mkdtemp(prefix="dpo-loadtest-")
+    cwd = os.getcwd()
+    server = None
+    try:
+        # The app's paths (email_config.json, receipts/, clients.db, logs/)
+        # are relative, so the whole run happens in the scratch folder.
+        os.chdir(workdir)
+        tls_context = None
+        if args.starttls:
+            tls_context = (server_context(args.certfile, args.keyfile) if args.certfile
+                           else self_signed_context(workdir))
+        server = FakeSMTPServer(("127.0.0.1", args.port), tls_context=tls_context,
+                                auth=(AUTH_USER, AUTH_PASSWORD) if args.auth else None,
+                                latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                                fail_rate=args.fail_rate, disconnect_rate=args.disconnect_rate,
+                                seed=args.seed).start()
+
+        from config import save_email_config
+        save_email_config(SENDER, AUTH_PASSWORD if args.auth else "", "127.0.0.1", server.port)
+
+        from emailer import SMTPSessionPool
+
+        attachments = make_attachments(workdir, args.size, args.attachments)
+        pool = SMTPSessionPool(user=AUTH_USER if args.auth else "", max_size=args.concurrency,
+                               starttls=args.starttls)
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            driver = run_send_all if args.mode == "send_all" else run_send
+            latencies, errors, extra = driver(args, pool, attachments)
+        finally:
+            pool.close()
+        elapsed = time.perf_counter() - start
+
+        sent = len(latencies)
+        payload = args.size * args.attachments
+        wire_bytes = server.stats["bytes"]
+        report = {
+            "mode": args.mode,
+            "messages": args.messages,
+            "sent": sent,
+            "failed": len(errors),
+            "concurrency": args.concurrency,
+            "attachment_bytes": payload,
+            "starttls": args.starttls,
+            "auth": args.auth,
+            "injected": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "fail_rate": args.fail_rate,
+                         "disconnect_rate": args.disconnect_rate},
+            "seconds": round(elapsed, 3),
+            "msgs_per_sec": round(sent / elapsed, 2) if elapsed else 0.0,
+            "payload_bytes_per_sec": round(sent * payload / elapsed) if elapsed else 0,
+            "wire_bytes_per_sec": round(wire_bytes / elapsed) if elapsed else 0,
+            "latency": latency_summary(latencies),
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_mb_before": rss_before,
+            "server": dict(server.stats),
+            "spans": metrics.snapshot()["spans"],
+        }
+        report.update(extra)
+        if errors:
+            report["errors"] = sorted(set(errors))[:10]
+        return report
+    finally:
+        if server is not None:
+            server.stop()
+        # The numbers are in the report; don't let the exit hook write
+        # logs/metrics.json into the folder we return to
+        metrics.set_enabled(False)
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report):
+    latency = report["latency"]
+    print(f"{report['mode']}: {report['sent']}/{report['messages']} sent, {report['failed']} failed "
+          f"in {report['seconds']}s with {report['concurrency']} worker(s)")
+    print(f"  throughput   {report['msgs_per_sec']} msgs/sec, "
+          f"{report['payload_bytes_per_sec'] / 1024 / 1024:.2f} MB/s of attachments, "
+          f"{report['wire_bytes_per_sec'] / 1024 / 1024:.2f} MB/s on the wire")
+    if latency:
+        print(f"  latency      p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms, "
+              f"p99 {latency['p99_ms']} ms, max {latency['max_ms']} ms")
+    if report.get("end_to_end"):
+        e2e = report["end_to_end"]
+        print(f"  queued->done p50 {e2e['p50_ms']} ms, p95 {e2e['p95_ms']} ms, p99 {e2e['p99_ms']} ms")
+    if report["peak_rss_mb"] is not None:
+        print(f"  peak RSS     {report['peak_rss_mb']} MB (before sending: {report['peak_rss_mb_before']} MB)")
+    print(f"  server       {report['server']}")
+    for error in report.get("errors", []):
+        print(f"  error        {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the send path against a local SMTP stand-in.")
+    parser.add_argument("--mode", choices=("send", "send_all"), default="send",
+                        help="send: send_files_with_receipt only; send_all: outbox, receipt and bookkeeping too")
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--size", type=parse_size, default=256 * 1024,
+                        help="bytes per attachment, e.g. 512KB or 20MB (default: 256KB)")
+    parser.add_argument("--attachments", type=int, default=1, help="attachments per message")
+    parser.add_argument("--no-receipt", action="store_true", help="send_all: don't attach the receipt")
+    parser.add_argument("--max-attempts", type=int, default=3, help="send_all: outbox attempts per order")
+    parser.add_argument("--starttls", action="store_true")
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    parser.add_argument("--auth", action="store_true", help="require AUTH before MAIL")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="server delay before answering DATA")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay, up to this much")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of messages answered with 451")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="fraction answered with 421 + hang-up")
+    parser.add_argument("--port", type=int, default=0, help="server port (default: any free port)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+    if args.certfile and not args.keyfile:
+        parser.error("--certfile needs --keyfile")
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    args.concurrency = max(1, args.concurrency)
+    if args.certfile:
+        args.certfile, args.keyfile = os.path.abspath(args.certfile), os.path.abspath(args.keyfile)
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failed"] and not (args.fail_rate or args.disconnect_rate) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
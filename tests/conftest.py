@@ -0,0 +1,56 @@
+# tests/conftest.py
+# The app keeps its data in paths relative to the working folder
+# (clients.db, receipts/, assets/, email_config.json), so every test runs
+# in its own temporary folder.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Don't leave logs/metrics.json behind in whatever folder pytest ran from
+os.environ.setdefault("DPO_METRICS", "0")
+
+
+def _close_connections():
+    import db
+
+    for conn in getattr(db._local, "conns", {}).values():
+        conn.close()
+    db._local.conns = {}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the test in an empty folder, with no store connections or
+    cached settings carried over from another test."""
+    import client_data
+    import config
+
+    monkeypatch.chdir(tmp_path)
+    _close_connections()
+    client_data._imported.clear()
+    monkeypatch.setattr(client_data, "repository", client_data.ClientRepository())
+    config._cache.clear()
+    yield tmp_path
+    _close_connections()
+    client_data._imported.clear()
+
+
+@pytest.fixture
+def smtp_server(workdir):
+    """A FakeSMTPServer on a free local port, set as the app's SMTP server.
+
+    Assign ``server.outcomes`` a list of "ok", "reject" or "disconnect" to
+    script what each DATA gets; without it every message is accepted.
+    """
+    from config import save_email_config
+    from smtp_loadtest import FakeSMTPServer
+
+    server = FakeSMTPServer(("127.0.0.1", 0))
+    server.outcomes = []
+    server.outcome = lambda: (0, server.outcomes.pop(0) if server.outcomes else "ok")
+    server.start()
+    save_email_config("shop@example.com", "", "127.0.0.1", server.port)
+    yield server
+    server.stop()
@@ -0,0 +1,81 @@
+import os
+import stat
+
+import pytest
+
+import auth
+from auth import UserStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr(auth, "SESSION_FILE", str(tmp_path / "config" / "session"))
+    monkeypatch.setattr(auth, "SESSION_KEY_FILE", str(tmp_path / "config" / "session_key"))
+    store = UserStore(str(tmp_path / "users.csv"))
+    auth.create_user("jane", "secret", store=store)
+    return store
+
+
+def test_login(store):
+    assert auth.authenticate_user("jane", "secret", store=store)
+    assert not auth.authenticate_user("jane", "wrong", store=store)
+    assert not auth.authenticate_user("nobody", "secret", store=store)
+    with pytest.raises(ValueError):
+        auth.create_user("jane", "again", store=store)
+
+
+def test_users_reload_when_the_file_changes(store):
+    other = UserStore(store.path)
+    assert other.exists("jane")
+    auth.create_user("bob", "pw", store=store)
+    assert other.exists("bob")
+
+
+def test_hash_is_upgraded_to_the_current_cost(store, monkeypatch):
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 5)
+    assert auth.authenticate_user("jane", "secret", store=store)
+    assert store.get_hash("jane").startswith("$2b$05$")
+    assert UserStore(store.path).get_hash("jane").startswith("$2b$05$")
+
+
+def test_async_login_calls_back(store):
+    results = []
+    auth.authenticate_async("jane", "secret", results.append, store=store).result(timeout=30)
+    assert results == [True]
+
+
+def test_session_round_trip(store):
+    token = auth.issue_session("jane", store=store)
+    assert auth.verify_session(token, store=store) == "jane"
+    auth.save_session(token)
+    assert auth.load_session(store=store) == "jane"
+    auth.clear_session()
+    assert auth.load_session(store=store) is None
+    auth.clear_session()  # nothing to clear is fine
+
+
+def test_session_files_are_private(store):
+    auth.save_session(auth.issue_session("jane", store=store))
+    for path in (auth.SESSION_FILE, auth.SESSION_KEY_FILE):
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(auth.SESSION_FILE)).st_mode) == 0o700
+
+
+def test_rejected_sessions(store):
+    token = auth.issue_session("jane", store=store)
+    payload, signature = token.rsplit(".", 1)
+    assert auth.verify_session(payload + "." + "0" * len(signature), store=store) is None
+    assert auth.verify_session("garbage", store=store) is None
+    assert auth.verify_session(auth.issue_session("jane", ttl=-1, store=store), store=store) is None
+
+    # Changing the password invalidates tokens issued before
+    store.set_hash("jane", auth.hash_password("new password"))
+    assert auth.verify_session(token, store=store) is None
+
+
+def test_config_dir_override(monkeypatch, tmp_path):
+    monkeypatch.setenv("DPO_CONFIG_DIR", str(tmp_path))
+    assert auth._config_dir() == str(tmp_path)
+    monkeypatch.delenv("DPO_CONFIG_DIR")
+    assert os.path.basename(auth._config_dir()).lower() == "dpo"
@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+import bulk_sender
+import client_data
+from bulk_sender import load_jobs_from_jsonl, make_job, send_bulk
+from emailer import SMTPSessionPool
+
+
+@pytest.fixture
+def order_files(workdir):
+    paths = []
+    for name in ("a.txt", "b.txt"):
+        path = workdir / name
+        path.write_bytes(name.encode() * 100)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def pool(smtp_server):
+    pool = SMTPSessionPool(max_size=3, starttls=False, user="")
+    yield pool
+    pool.close()
+
+
+def test_make_job():
+    job = make_job("Jane", "jane@example.com", "a.txt|b.txt|", price="10", tax=None)
+    assert job["files"] == ["a.txt", "b.txt"]
+    assert (job["price"], job["tax"], job["discount"]) == (10.0, 0.0, 0.0)
+    assert job["record"] and job["send_receipt"] and not job["bundle"]
+
+
+def test_send_bulk_delivers_every_job(smtp_server, pool, order_files):
+    jobs = [make_job(f"Client {n}", f"c{n}@example.com", order_files, price=5) for n in range(6)]
+    seen = []
+    results, stats = send_bulk(jobs, max_workers=3, pool=pool, on_result=seen.append)
+
+    assert (stats["jobs"], stats["sent"], stats["failed"], stats["workers"]) == (6, 6, 0, 3)
+    assert len(seen) == 6
+    assert smtp_server.stats["messages"] == 6
+    # Three workers share at most three sessions
+    assert smtp_server.stats["sessions"] <= 3
+    receipts = {result["receipt"] for result in results}
+    assert len(receipts) == 6 and all(os.path.exists(path) for path in receipts)
+    assert client_data.count_clients() == 6
+
+
+def test_failures_are_reported_per_job(pool, order_files):
+    jobs = [make_job("Jane", "jane@example.com", order_files),
+            make_job("Bob", "bob@example.com", [str(order_files[0]) + ".missing"])]
+    results, stats = send_bulk(jobs, max_workers=2, pool=pool)
+    by_name = {result["job"]["name"]: result for result in results}
+    assert by_name["Jane"]["ok"]
+    assert not by_name["Bob"]["ok"] and by_name["Bob"]["error"]
+    assert (stats["sent"], stats["failed"]) == (1, 1)
+
+
+def test_resend_does_not_record_an_order(pool, order_files):
+    _, stats = send_bulk([make_job("Jane", "jane@example.com", order_files, record=False)], pool=pool)
+    assert stats["sent"] == 1
+    assert client_data.count_clients() == 0
+
+
+def test_load_jobs_from_jsonl(workdir):
+    with open("orders.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"name": "Jane", "email": "jane@example.com", "files": ["a.txt"], "price": 3}) + "\n\n")
+        f.write(json.dumps({"name": "Bob", "email": "bob@example.com", "template": "order.txt"}) + "\n")
+    jobs = load_jobs_from_jsonl("orders.jsonl")
+    assert [(job["name"], job["files"], job["price"], job["template"]) for job in jobs] == [
+        ("Jane", ["a.txt"], 3.0, None), ("Bob", [], 0.0, "order.txt")]
+
+
+def test_load_jobs_from_csv(workdir):
+    with open("orders.csv", "w", newline="", encoding="utf-8") as f:
+        f.write("name,email,date,files\nJane,jane@example.com,,a.txt|b.txt\nBob,bob@example.com,,c.txt\n")
+    jobs = bulk_sender.load_jobs_from_csv("orders.csv", rows={1})
+    assert [(job["name"], job["files"]) for job in jobs] == [("Bob", ["c.txt"])]
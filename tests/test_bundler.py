@@ -0,0 +1,124 @@
+import os
+import zipfile
+
+import pytest
+
+import bundler
+from bundler import attachment_name, build_bundle
+
+
+def _files(folder, contents):
+    paths = []
+    for name, data in contents.items():
+        path = os.path.join(folder, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def _members(path):
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        return {info.filename: zf.read(info) for info in zf.infolist()}
+
+
+@pytest.fixture
+def files(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    return _files(str(source), {"a.txt": b"hello " * 1000, "photo.jpg": os.urandom(2048), "b.txt": b""})
+
+
+def test_attachment_name():
+    assert attachment_name("Jane Doe") == "Jane_Doe_files.zip"
+    assert attachment_name("../José/") == "José_files.zip"
+    assert attachment_name("") == attachment_name(None) == "files.zip"
+
+
+def test_bundle_is_readable_and_named_for_the_client(tmp_path, files):
+    folder = str(tmp_path / "bundles")
+    path = build_bundle(files, folder=folder, client="Jane Doe")
+    assert os.path.basename(path) == "Jane_Doe_files.zip"
+    members = _members(path)
+    assert sorted(members) == ["a.txt", "b.txt", "photo.jpg"]
+    for source in files:
+        with open(source, "rb") as f:
+            assert members[os.path.basename(source)] == f.read()
+    with zipfile.ZipFile(path) as zf:
+        assert zf.getinfo("photo.jpg").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("a.txt").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_cached_bundle_is_shared_between_clients(tmp_path, files):
+    folder = str(tmp_path / "bundles")
+    jane = build_bundle(files, folder=folder, client="Jane")
+    bob = build_bundle(files, folder=folder, client="Bob")
+    assert os.path.basename(bob) == "Bob_files.zip"
+    assert os.path.samefile(jane, bob) or _members(jane) == _members(bob)
+    assert len([name for name in os.listdir(folder) if name.endswith(".zip")]) == 1
+
+
+def test_changed_file_gets_a_new_bundle(tmp_path, files):
+    folder = str(tmp_path / "bundles")
+    first = build_bundle(files, folder=folder)
+    with open(files[0], "ab") as f:
+        f.write(b"more")
+    second = build_bundle(files, folder=folder)
+    assert os.path.dirname(first) != os.path.dirname(second)
+    assert _members(second)["a.txt"].endswith(b"more")
+
+
+def test_duplicate_member_names(tmp_path):
+    one, two = tmp_path / "one", tmp_path / "two"
+    one.mkdir()
+    two.mkdir()
+    paths = _files(str(one), {"a.txt": b"1"}) + _files(str(two), {"A.txt": b"2"})
+    assert sorted(_members(build_bundle(paths, folder=str(tmp_path / "bundles")))) == ["A (1).txt", "a.txt"]
+
+
+def test_too_many_members_fall_back_to_zip64(tmp_path, files, monkeypatch):
+    monkeypatch.setattr(bundler, "_ZIP32_MAX_ENTRIES", 2)
+    path = build_bundle(files, folder=str(tmp_path / "bundles"))
+    members = _members(path)
+    assert sorted(members) == ["a.txt", "b.txt", "photo.jpg"]
+    assert members["a.txt"] == b"hello " * 1000
+
+
+def test_prune_drops_least_recently_used(tmp_path, files):
+    folder = str(tmp_path / "bundles")
+    old = build_bundle(files[:2], folder=folder, client="Old")
+    os.utime(os.path.join(folder, os.path.basename(os.path.dirname(old)) + ".zip"), (1, 1))
+    new = build_bundle(files[1:], folder=folder, client="New")
+    bundler.prune_bundles(folder, max_bytes=os.path.getsize(new))
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+
+
+def test_members_carry_unix_mode_bits(tmp_path, files):
+    with zipfile.ZipFile(build_bundle(files, folder=str(tmp_path / "bundles"))) as zf:
+        for info in zf.infolist():
+            assert info.create_system == 3
+            assert info.external_attr >> 16 == 0o644
+
+
+def test_offsets_past_the_zip32_limit_fall_back_to_zip64(tmp_path, files, monkeypatch):
+    # Every file is under the limit, but together with headers they are not
+    monkeypatch.setattr(bundler, "_ZIP32_LIMIT", 3000)
+    calls = []
+    write_zip64 = bundler._write_zip64
+    monkeypatch.setattr(bundler, "_write_zip64", lambda *args: calls.append(args) or write_zip64(*args))
+    path = build_bundle(files, folder=str(tmp_path / "bundles"))
+    assert len(calls) == 1
+    assert _members(path)["a.txt"] == b"hello " * 1000
+    assert not [name for name in os.listdir(tmp_path / "bundles") if name.endswith(".member")]
+
+
+def test_prune_keeps_recently_used_bundles(tmp_path, files):
+    folder = str(tmp_path / "bundles")
+    first = build_bundle(files[:2], folder=folder, client="First")
+    second = build_bundle(files[1:], folder=folder, client="Second")
+    bundler.prune_bundles(folder, max_bytes=0)
+    assert os.path.exists(first) and os.path.exists(second)
+    bundler.prune_bundles(folder, max_bytes=0, grace=-1)
+    assert not os.path.exists(first) and not os.path.exists(second)
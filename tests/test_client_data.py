@@ -0,0 +1,160 @@
+import csv
+import multiprocessing
+import os
+import sqlite3
+
+import pytest
+
+import client_data
+from client_data import ClientRepository
+
+
+def _emails_csv_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+@pytest.fixture
+def repo(workdir):
+    return ClientRepository(str(workdir / "clients.db"), str(workdir / "assets" / "client" / "emails.csv"))
+
+
+def test_clients_csv_is_imported_once(workdir):
+    with open("clients.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(client_data.FIELDS)
+        writer.writerow(["Jane", "jane@example.com", "2025-01-01 10:00", "a.txt|b.txt"])
+        writer.writerow(["Bob", "bob@example.com", "2025-01-02 10:00", "c.txt"])
+
+    assert client_data.count_clients() == 2
+    assert client_data.is_client_csv(str(workdir / "clients.csv"))
+    assert not client_data.is_client_csv("other.csv")
+    # Later starts don't import the (now stale) file again
+    client_data._imported.clear()
+    assert client_data.count_clients() == 2
+
+
+def test_paging(workdir):
+    ids = [client_data.save_client_info(f"Client {n}", f"c{n}@example.com", ["f.txt"]) for n in range(10)]
+    page = client_data.load_client_page(0, 4)
+    assert [row["id"] for row in page] == ids[:4]
+    assert [row["id"] for row in client_data.load_client_page(page[-1]["id"], 4)] == ids[4:8]
+    assert [row["id"] for row in client_data.load_client_page_before(ids[6], 4)] == ids[2:6]
+    assert [row["id"] for row in client_data.load_client_page_before(ids[2], 4)] == ids[:2]
+
+
+def test_edit_and_delete(workdir):
+    client_id = client_data.save_client_info("Jane", "jane@example.com", ["a.txt"])
+    assert client_data.client_names() == ["Jane"]
+    client_data.update_client(client_id, "Jane Doe", "jane@example.com", ["a.txt", "b.txt"])
+    assert client_data.get_client(client_id)["files"] == "a.txt|b.txt"
+    assert client_data.client_names() == ["Jane Doe"]
+    client_data.delete_client(client_id)
+    assert client_data.count_clients() == 0
+    assert client_data.client_names() == []
+
+
+def test_names_follow_writes_from_other_connections(workdir):
+    client_data.save_client_info("Jane", "jane@example.com", ["a.txt"])
+    assert client_data.client_names() == ["Jane"]
+    # Another process writing to the store changes its signature
+    other = sqlite3.connect(client_data.CLIENT_DB)
+    with other:
+        other.execute("INSERT INTO clients (name, email, date, files) VALUES ('Bob', '', '', '')")
+    other.close()
+    assert client_data.client_names() == ["Bob", "Jane"]
+
+
+def test_own_writes_update_the_cache_in_place(workdir, monkeypatch):
+    client_data.save_client_info("Jane", "jane@example.com", ["a.txt"])
+    assert client_data.client_names() == ["Jane"]
+    client_data.save_client_info("  Bob ", "bob@example.com", ["b.txt"])
+
+    def requery(*args):
+        raise AssertionError("names were re-queried")
+
+    with monkeypatch.context() as m:
+        m.setattr(client_data, "_connect", requery)
+        assert client_data.client_names() == ["Bob", "Jane"]
+
+    client_data.repository.forget_names()
+    assert client_data.client_names() == ["Bob", "Jane"]
+
+
+def test_saved_emails_are_shared(workdir):
+    client_data.save_sent_email("Jane Doe", "jane@example.com")
+    assert client_data.repository.emails_for("jane doe") == ["jane@example.com"]
+    assert client_data.repository.all_emails() == ["jane@example.com"]
+    client_data.save_sent_email("Bob", "bob@example.com")
+    assert client_data.repository.all_emails() == ["bob@example.com", "jane@example.com"]
+
+
+def test_saved_emails_are_deduplicated(repo):
+    assert repo.add_email("Jane Doe", "Jane@Example.com")
+    assert not repo.add_email("  jane   DOE ", "jane@example.com ")
+    assert not repo.add_email("Jane Doe", "")
+    assert repo.add_email("Jane Doe", "jane.doe@work.example.com")
+    assert repo.add_email("Bob", "jane@example.com")
+
+    assert _emails_csv_rows(repo.emails_path) == [
+        ["name", "email"],
+        ["Jane Doe", "jane@example.com"],
+        ["Jane Doe", "jane.doe@work.example.com"],
+        ["Bob", "jane@example.com"],
+    ]
+    assert repo.emails_for("JANE DOE") == ["jane.doe@work.example.com", "jane@example.com"]
+    assert repo.canonical_name("jane  doe") == "Jane Doe"
+    assert repo.canonical_name("Nobody") is None
+    assert repo.all_emails() == ["jane.doe@work.example.com", "jane@example.com"]
+
+
+def test_rows_added_by_hand_are_picked_up(repo):
+    repo.add_email("Jane", "jane@example.com")
+    with open(repo.emails_path, "a", newline="", encoding="utf-8") as f:
+        f.write("Bob,bob@example.com\nJane,JANE@example.com\n")
+    assert repo.emails_for("Bob") == ["bob@example.com"]
+    assert repo.emails_for("Jane") == ["jane@example.com"]
+    assert not repo.add_email("Bob", "bob@example.com")
+    assert len(_emails_csv_rows(repo.emails_path)) == 4
+
+
+def test_existing_file_is_indexed_and_replacement_reindexed(repo):
+    os.makedirs(os.path.dirname(repo.emails_path))
+    with open(repo.emails_path, "w", encoding="utf-8") as f:
+        f.write("email,name\nold@example.com,Old Client\n")
+    assert repo.emails_for("Old Client") == ["old@example.com"]
+
+    tmp = repo.emails_path + ".new"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("name,email\nNew Client,new@example.com\n")
+    os.replace(tmp, repo.emails_path)
+    assert repo.emails_for("Old Client") == []
+    assert repo.emails_for("New Client") == ["new@example.com"]
+
+    os.remove(repo.emails_path)
+    assert repo.all_emails() == []
+
+
+def test_two_repositories_share_the_index(repo):
+    other = ClientRepository(repo.db_path, repo.emails_path)
+    assert repo.add_email("Jane", "jane@example.com")
+    assert not other.add_email("Jane", "jane@example.com")
+    assert other.emails_for("Jane") == ["jane@example.com"]
+
+
+def _add_emails(db_path, emails_path, results):
+    repo = ClientRepository(db_path, emails_path)
+    results.put(sum(repo.add_email(f"Client {n}", f"c{n}@example.com") for n in range(20)))
+
+
+def test_concurrent_processes_write_each_pair_once(repo):
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_add_emails, args=(repo.db_path, repo.emails_path, results))
+               for _ in range(4)]
+    for p in workers:
+        p.start()
+    added = sum(results.get(timeout=60) for _ in workers)
+    for p in workers:
+        p.join()
+    assert added == 20
+    assert len(_emails_csv_rows(repo.emails_path)) == 21
@@ -0,0 +1,60 @@
+import os
+import queue
+import time
+
+import pytest
+
+from dir_watcher import DirWatcher, diff_snapshots, snapshot
+
+
+def _write(folder, name, data=b"x"):
+    with open(os.path.join(folder, name), "wb") as f:
+        f.write(data)
+
+
+def _events(watcher, count, timeout=5):
+    events, deadline = [], time.monotonic() + timeout
+    while len(events) < count:
+        try:
+            events.append(watcher.events.get(timeout=max(0, deadline - time.monotonic())))
+        except queue.Empty:
+            break
+    return events
+
+
+def test_snapshot_skips_bookkeeping_files(tmp_path):
+    for name in ("a.pdf", "b.txt", ".library.json", "c.pdf.part", "ledger.db-wal"):
+        _write(str(tmp_path), name)
+    (tmp_path / "sub").mkdir()
+    assert sorted(snapshot(str(tmp_path))) == ["a.pdf", "b.txt"]
+    assert sorted(snapshot(str(tmp_path), suffixes=(".pdf",))) == ["a.pdf"]
+    assert snapshot(str(tmp_path / "missing")) == {}
+
+
+def test_diff_snapshots():
+    old = {"kept": (1, 1), "gone": (1, 1), "edited": (1, 1)}
+    new = {"kept": (1, 1), "edited": (2, 2), "new": (1, 1)}
+    assert sorted(diff_snapshots(old, new)) == [("added", "new"), ("changed", "edited"), ("removed", "gone")]
+
+
+@pytest.mark.parametrize("use_inotify", [True, False], ids=["inotify", "polling"])
+def test_changes_are_reported_once_settled(tmp_path, use_inotify):
+    folder = str(tmp_path)
+    _write(folder, "old.pdf")
+    _write(folder, "edit.pdf")
+    watcher = DirWatcher(settle=0.1, poll_interval=0.1, use_inotify=use_inotify)
+    watcher.watch(folder)
+    watcher.start()
+    try:
+        # A burst of writes to one file comes out as a single "added"
+        for n in range(3):
+            _write(folder, "new.pdf", b"x" * n)
+        _write(folder, "edit.pdf", b"edited")
+        os.remove(os.path.join(folder, "old.pdf"))
+        _write(folder, "skip.pdf.part")
+        events = _events(watcher, 3)
+    finally:
+        watcher.stop()
+    assert sorted(events) == [(folder, "added", "new.pdf"), (folder, "changed", "edit.pdf"),
+                              (folder, "removed", "old.pdf")]
+    assert watcher.events.empty()
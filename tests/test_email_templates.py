@@ -0,0 +1,63 @@
+import os
+import time
+
+import email_templates
+from email_templates import Template, _compile, get_template, template_values
+
+
+def test_compile_splits_literals_and_fields():
+    assert _compile("Hi {name}, {{not a field}} total {total}.") == (
+        ("Hi ", "name"), (", {not a field} total ", "total"), (".", None))
+    assert _compile("no fields") == (("no fields", None),)
+    assert _compile("") == (("", None),)
+
+
+def test_plain_render():
+    template = Template("order.txt", "Hi {name}, {unknown} {{braces}}")
+    text, html = template.render({"name": "Jane"})
+    assert text == "Hi Jane, {unknown} {braces}"
+    assert html is None
+    assert template.fields == {"name", "unknown"}
+
+
+def test_html_render_escapes_values():
+    template = Template("order.html", "<html><head><title>x</title></head>"
+                                      "<body><p>Hi {name}</p><ul><li>{file_list}</li></ul></body></html>")
+    text, html = template.render({"name": "<Jane & Co>", "file_list": "- a.txt\n- b.txt"})
+    assert "<p>Hi &lt;Jane &amp; Co&gt;</p>" in html
+    assert "- a.txt<br>\n- b.txt" in html
+    assert "Hi <Jane & Co>" in text
+    assert "<p>" not in text and "x" not in text.split("Hi")[0]
+
+
+def test_template_values():
+    values = template_values("Jane", "jane@example.com", ["/tmp/a.txt", "b.pdf"], price=10, tax="1.5",
+                             discount=None, receipt_num="R-1", date="2025-01-01")
+    assert values["files"] == "a.txt, b.pdf"
+    assert values["file_list"] == "- a.txt\n- b.pdf"
+    assert values["file_count"] == "2"
+    assert (values["price"], values["tax"], values["discount"], values["total"]) == \
+        ("$10.00", "$1.50", "$0.00", "$11.50")
+
+
+def test_templates_are_reread_only_after_a_change(tmp_path):
+    path = tmp_path / "order.txt"
+    path.write_text("v1 {name}", encoding="utf-8")
+    first = get_template("order.txt", str(tmp_path))
+    assert get_template("order.txt", str(tmp_path)) is first
+
+    path.write_text("version 2 {name}", encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert get_template("order.txt", str(tmp_path)).render({"name": "Jane"}) == ("version 2 Jane", None)
+
+
+def test_available_templates(tmp_path):
+    for name in ("b.html", "A.txt", "notes.md"):
+        (tmp_path / name).write_text("x", encoding="utf-8")
+    assert email_templates.available_templates(str(tmp_path)) == ["A.txt", "b.html"]
+    time.sleep(0.01)
+    (tmp_path / "c.htm").write_text("x", encoding="utf-8")
+    os.utime(tmp_path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert email_templates.available_templates(str(tmp_path)) == ["A.txt", "b.html", "c.htm"]
+    assert email_templates.available_templates(str(tmp_path / "missing")) == []
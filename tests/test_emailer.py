@@ -0,0 +1,106 @@
+import smtplib
+from email.message import EmailMessage
+
+import pytest
+
+from emailer import SMTPSessionPool
+
+
+def _pool(server, **kwargs):
+    return SMTPSessionPool(host="127.0.0.1", port=server.port, user="", starttls=False, **kwargs)
+
+
+def _message(n=0):
+    msg = EmailMessage()
+    msg["Subject"] = f"Order {n}"
+    msg["From"] = "shop@example.com"
+    msg["To"] = "client@example.com"
+    msg.set_content("Attached are your files.")
+    return msg
+
+
+def test_sessions_are_reused(smtp_server):
+    pool = _pool(smtp_server)
+    try:
+        for n in range(3):
+            pool.send_message(_message(n))
+    finally:
+        pool.close()
+    assert smtp_server.stats["messages"] == 3
+    assert smtp_server.stats["sessions"] == 1
+
+
+def test_idle_session_is_checked_with_noop_and_reused(smtp_server):
+    pool = _pool(smtp_server, idle_check=0)
+    try:
+        pool.send_message(_message(1))
+        pool.send_message(_message(2))
+    finally:
+        pool.close()
+    assert smtp_server.stats["sessions"] == 1
+
+
+def test_session_idle_too_long_is_replaced(smtp_server):
+    pool = _pool(smtp_server, max_idle=-1)
+    try:
+        pool.send_message(_message(1))
+        pool.send_message(_message(2))
+    finally:
+        pool.close()
+    assert smtp_server.stats["sessions"] == 2
+    assert smtp_server.stats["messages"] == 2
+
+
+def test_reconnects_once_after_421(smtp_server):
+    smtp_server.outcomes = ["disconnect", "ok"]
+    pool = _pool(smtp_server)
+    try:
+        pool.send_message(_message())
+    finally:
+        pool.close()
+    assert smtp_server.stats["disconnected"] == 1
+    assert smtp_server.stats["messages"] == 1
+    assert smtp_server.stats["sessions"] == 2
+
+
+def test_gives_up_after_the_retry(smtp_server):
+    smtp_server.outcomes = ["disconnect", "disconnect"]
+    pool = _pool(smtp_server)
+    try:
+        with pytest.raises(smtplib.SMTPException):
+            pool.send_message(_message())
+    finally:
+        pool.close()
+    assert smtp_server.stats["disconnected"] == 2
+    assert smtp_server.stats["messages"] == 0
+
+
+def test_rejection_is_not_retried(smtp_server):
+    smtp_server.outcomes = ["reject"]
+    pool = _pool(smtp_server)
+    try:
+        with pytest.raises(smtplib.SMTPDataError):
+            pool.send_message(_message())
+        # The failed session was closed, not put back
+        assert pool._idle == []
+    finally:
+        pool.close()
+    assert smtp_server.stats["rejected"] == 1
+    assert smtp_server.stats["sessions"] == 1
+
+
+def test_changed_settings_drop_pooled_sessions(smtp_server):
+    from config import save_email_config
+    from smtp_loadtest import FakeSMTPServer
+
+    pool = SMTPSessionPool(user="", starttls=False)
+    other = FakeSMTPServer(("127.0.0.1", 0)).start()
+    try:
+        pool.send_message(_message(1))
+        save_email_config("shop@example.com", "", "127.0.0.1", other.port)
+        pool.send_message(_message(2))
+    finally:
+        pool.close()
+        other.stop()
+    assert smtp_server.stats["messages"] == 1
+    assert other.stats["messages"] == 1
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from file_catalog import FileCatalog
+
+
+def _touch(folder, name, data=b"x"):
+    with open(os.path.join(folder, name), "wb") as f:
+        f.write(data)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    for name in ("Invoice_2024.pdf", "invoice_2025.pdf", "photo.JPG", "notes.txt", ".library.json"):
+        _touch(str(tmp_path), name)
+    (tmp_path / ".store").mkdir()
+    (tmp_path / "subdir").mkdir()
+    return FileCatalog(str(tmp_path))
+
+
+def _names(entries):
+    return [entry.name for entry in entries]
+
+
+def test_search_is_case_insensitive_and_sorted(catalog):
+    assert _names(catalog.search()) == ["Invoice_2024.pdf", "invoice_2025.pdf", "notes.txt", "photo.JPG"]
+    assert _names(catalog.search("INVOICE")) == ["Invoice_2024.pdf", "invoice_2025.pdf"]
+    assert _names(catalog.search(" jpg ")) == ["photo.JPG"]
+    # Short queries skip the trigram index
+    assert _names(catalog.search("e_")) == ["Invoice_2024.pdf", "invoice_2025.pdf"]
+    assert _names(catalog.search("2025")) == ["invoice_2025.pdf"]
+    assert catalog.search("missing") == []
+
+
+def test_matches_agree_with_a_plain_scan(catalog):
+    names = [entry.name for entry in catalog.search()]
+    for query in ("in", "voice_20", "pdf", ".p", "e_2", "xyz", "txt"):
+        assert _names(catalog.search(query)) == [n for n in names if query in n.lower()]
+
+
+def test_entries_are_kept_up_to_date(catalog):
+    catalog.search()
+    _touch(catalog.folder, "receipt.pdf", b"12345")
+    entry = catalog.update("receipt.pdf")
+    assert entry.size == 5
+    assert _names(catalog.search("pdf")) == ["Invoice_2024.pdf", "invoice_2025.pdf", "receipt.pdf"]
+
+    os.rename(os.path.join(catalog.folder, "notes.txt"), os.path.join(catalog.folder, "todo.txt"))
+    catalog.rename("notes.txt", "todo.txt")
+    assert _names(catalog.search("txt")) == ["todo.txt"]
+    assert catalog.get("notes.txt") is None
+
+    catalog.remove("todo.txt")
+    assert catalog.search("txt") == []
+    # Gone from disk: update drops it
+    os.remove(os.path.join(catalog.folder, "receipt.pdf"))
+    assert catalog.update("receipt.pdf") is None
+    assert len(catalog) == 3
+    assert catalog.update(".library.json") is None
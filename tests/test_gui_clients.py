@@ -0,0 +1,110 @@
+# The Clients tab's sliding window, driven through a stand-in Treeview so it
+# runs without a display.
+import pytest
+
+gui = pytest.importorskip("gui")
+import client_data
+
+
+class FakeTree:
+    def __init__(self):
+        self.items = []
+        self.view = (0.0, 1.0)
+
+    def get_children(self):
+        return tuple(self.items)
+
+    def insert(self, parent, index, iid, values):
+        if index == "end":
+            self.items.append(iid)
+        else:
+            self.items.insert(index, iid)
+
+    def delete(self, *iids):
+        gone = set(iids)
+        self.items = [iid for iid in self.items if iid not in gone]
+
+    def yview(self):
+        return self.view
+
+    def yview_moveto(self, fraction):
+        self.view = (fraction, fraction)
+
+
+class FakeVar:
+    value = None
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeRoot:
+    def __init__(self):
+        self.idle = []
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+
+class ClientsTab:
+    load_clients = gui.DPOApp.load_clients
+    load_more_clients = gui.DPOApp.load_more_clients
+    load_previous_clients = gui.DPOApp.load_previous_clients
+    trim_clients = gui.DPOApp.trim_clients
+    update_clients_status = gui.DPOApp.update_clients_status
+    on_clients_scroll = gui.DPOApp.on_clients_scroll
+
+    def __init__(self):
+        self.client_tree = FakeTree()
+        self.clients_status_var = FakeVar()
+        self.clients_scrollbar = FakeVar()
+        self.clients_scrollbar.set = lambda first, last: None
+        self.root = FakeRoot()
+
+    def scroll(self, first, last):
+        self.on_clients_scroll(first, last)
+        while self.root.idle:
+            self.root.idle.pop(0)()
+
+    def shown_ids(self):
+        return [int(iid) for iid in self.client_tree.get_children()]
+
+
+@pytest.fixture
+def tab(workdir, monkeypatch):
+    monkeypatch.setattr(gui, "CLIENT_PAGE_SIZE", 5)
+    monkeypatch.setattr(gui, "CLIENT_WINDOW_PAGES", 3)
+    for n in range(1, 31):
+        client_data.save_client_info(f"Client {n}", f"c{n}@example.com", ["f.txt"])
+    tab = ClientsTab()
+    tab.load_clients()
+    return tab
+
+
+def test_first_page(tab):
+    assert tab.shown_ids() == [1, 2, 3, 4, 5]
+    assert tab.clients_status_var.value == "Showing 5 of 30 orders"
+
+
+def test_window_slides_down_and_back_up(tab):
+    for _ in range(5):
+        tab.scroll(0.5, 0.95)
+    # At most three pages are kept; the oldest ones were evicted
+    assert tab.shown_ids() == list(range(16, 31))
+    assert tab.clients_status_var.value == "Showing 15 of 30 orders"
+    assert not tab.clients_at_start
+
+    tab.scroll(0.05, 0.3)
+    assert tab.shown_ids() == list(range(11, 26))
+    assert not tab.clients_exhausted
+    for _ in range(3):
+        tab.scroll(0.0, 0.2)
+    assert tab.shown_ids() == list(range(1, 16))
+    assert tab.clients_at_start
+
+
+def test_no_page_loads_away_from_the_edges(tab):
+    tab.scroll(0.3, 0.6)
+    assert tab.shown_ids() == [1, 2, 3, 4, 5]
+    tab.scroll(0.0, 0.95)
+    assert tab.shown_ids() == list(range(1, 11))
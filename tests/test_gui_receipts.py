@@ -0,0 +1,43 @@
+# The Receipts tab filter, with Tk's after() queue stood in for.
+import pytest
+
+gui = pytest.importorskip("gui")
+
+
+class FakeRoot:
+    def __init__(self):
+        self.jobs = {}
+
+    def after(self, delay, callback):
+        job = f"after#{len(self.jobs)}"
+        self.jobs[job] = callback
+        return job
+
+    def after_cancel(self, job):
+        del self.jobs[job]
+
+
+class ReceiptsTab:
+    schedule_receipt_filter = gui.DPOApp.schedule_receipt_filter
+
+    def __init__(self):
+        self.root = FakeRoot()
+        self.receipt_filter_job = None
+        self.refreshes = 0
+
+    def refresh_receipts_tab(self):
+        self.receipt_filter_job = None
+        self.refreshes += 1
+
+
+def test_filter_waits_for_typing_to_pause():
+    tab = ReceiptsTab()
+    for _ in "jane":
+        tab.schedule_receipt_filter()
+    assert tab.refreshes == 0
+    assert len(tab.root.jobs) == 1
+
+    for callback in list(tab.root.jobs.values()):
+        callback()
+    assert tab.refreshes == 1
+    assert tab.receipt_filter_job is None
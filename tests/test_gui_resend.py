@@ -0,0 +1,84 @@
+# Bulk Resend in the Clients tab, with the outbox and Tk widgets stood in
+# for so it runs without a display.
+import pytest
+
+gui = pytest.importorskip("gui")
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.jobs = {}
+
+    def enqueue(self, job):
+        job_id = f"job{len(self.jobs)}"
+        self.jobs[job_id] = job
+        return job_id
+
+
+class FakeTree:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def selection(self):
+        return tuple(self.rows)
+
+    def item(self, iid):
+        return {"values": self.rows[iid]}
+
+
+class ClientsTab:
+    bulk_resend_selected = gui.DPOApp.bulk_resend_selected
+    note_bulk_result = gui.DPOApp.note_bulk_result
+
+    def __init__(self, rows):
+        self.client_tree = FakeTree(rows)
+        self.outbox = FakeOutbox()
+        self.bulk_resends = []
+        self.refreshed = []
+
+    def refresh_receipts_tab(self):
+        self.refreshed.append("receipts")
+
+    def load_clients(self):
+        self.refreshed.append("clients")
+
+
+@pytest.fixture
+def dialogs(monkeypatch):
+    shown = []
+    monkeypatch.setattr(gui.messagebox, "showinfo", lambda title, message: shown.append(("info", message)))
+    monkeypatch.setattr(gui.messagebox, "showerror", lambda title, message: shown.append(("error", message)))
+    monkeypatch.setattr(gui.messagebox, "showwarning", lambda title, message: shown.append(("warning", message)))
+    return shown
+
+
+def test_bulk_resend_goes_through_the_outbox(dialogs):
+    tab = ClientsTab({"1": ("Jane", "jane@example.com", "2025-01-01", "a.txt|b.txt"),
+                      "2": ("Bob", "bob@example.com", "2025-01-02", "c.txt")})
+    tab.bulk_resend_selected()
+
+    jobs = list(tab.outbox.jobs.values())
+    assert [(job["name"], job["files"]) for job in jobs] == [("Jane", ["a.txt", "b.txt"]), ("Bob", ["c.txt"])]
+    assert not any(job["record"] for job in jobs)
+
+    assert tab.note_bulk_result("job0")
+    assert dialogs == [] and tab.refreshed == []
+    assert tab.note_bulk_result("job1", "Bob (bob@example.com): refused")
+    assert dialogs == [("error", "Sent 1 of 2.\n\nFailed:\nBob (bob@example.com): refused")]
+    assert tab.refreshed == ["receipts", "clients"]
+    assert tab.bulk_resends == []
+
+
+def test_other_outbox_jobs_are_not_counted(dialogs):
+    tab = ClientsTab({"1": ("Jane", "jane@example.com", "", "a.txt")})
+    tab.bulk_resend_selected()
+    assert not tab.note_bulk_result("someone-else")
+    assert tab.note_bulk_result("job0")
+    assert dialogs == [("info", "Sent 1 of 1.")]
+
+
+def test_nothing_selected(dialogs):
+    tab = ClientsTab({})
+    tab.bulk_resend_selected()
+    assert tab.outbox.jobs == {}
+    assert dialogs[0][0] == "warning"
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from importer import ImportBatch
+from library import FileLibrary
+
+
+@pytest.fixture
+def folders(tmp_path):
+    folder, incoming = tmp_path / "files", tmp_path / "incoming"
+    folder.mkdir()
+    incoming.mkdir()
+    return str(folder), str(incoming)
+
+
+def _source(folder, name, data):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_progress_counts_each_byte_once(folders):
+    folder, incoming = folders
+    library = FileLibrary(folder)
+    library.import_file(_source(incoming, "stored.pdf", b"s" * 1000))
+    paths = [_source(incoming, "new.pdf", b"n" * 3000), _source(incoming, "again.pdf", b"s" * 1000)]
+
+    phases = []
+    batch = ImportBatch(library, paths)
+    import_file = library.import_file
+
+    def watched(source, progress, cancelled, copying):
+        def copy_started():
+            copying()
+            phases.append((os.path.basename(source), batch.phase[source], batch.progress[source][0]))
+        return import_file(source, progress, cancelled, copy_started)
+
+    library.import_file = watched
+    assert batch.total_bytes == 4000 and batch.done_bytes == 0
+    batch.start()
+    batch.join(10)
+
+    # Only new content is copied; the copy pass is reported as a phase
+    assert phases == [("new.pdf", "copying", 0)]
+    assert batch.phase == {paths[0]: "done", paths[1]: "done"}
+    assert batch.done_bytes == batch.total_bytes == 4000
+    assert batch.copying == 0
+
+
+def _events(batch):
+    events = []
+    while not batch.events.empty():
+        events.append(batch.events.get())
+    return events
+
+
+def test_batch_reports_every_file_then_a_summary(folders):
+    folder, incoming = folders
+    paths = [_source(incoming, "a.pdf", b"a"), _source(incoming, "b.pdf", b"a"),
+             _source(incoming, "c.pdf", b"c"), os.path.join(incoming, "missing.pdf")]
+    library = FileLibrary(folder)
+    batch = ImportBatch(library, paths, workers=2)
+    batch.start()
+    batch.join(10)
+
+    events = _events(batch)
+    assert [kind for kind, _ in events] == ["file"] * 4 + ["finished"]
+    results = {os.path.basename(r["source"]): r for kind, r in events if kind == "file"}
+    assert (results["a.pdf"]["added"], results["b.pdf"]["added"]) in {(True, False), (False, True)}
+    assert results["missing.pdf"]["error"]
+    assert events[-1][1] == {"added": 2, "duplicates": 1, "failed": 1, "cancelled": 0}
+    # The index was saved when the batch finished
+    assert sorted(FileLibrary(folder)._names) == ["a.pdf", "c.pdf"]
+
+
+def test_cancelled_batch_imports_nothing_more(folders):
+    folder, incoming = folders
+    paths = [_source(incoming, f"{n}.pdf", bytes([n]) * 100) for n in range(4)]
+    library = FileLibrary(folder)
+    batch = ImportBatch(library, paths, workers=1)
+    batch.cancel()
+    batch.start()
+    batch.join(10)
+
+    assert _events(batch)[-1][1]["cancelled"] == 4
+    assert [name for name in os.listdir(folder) if not name.startswith(".")] == []
+    assert batch.done_bytes == batch.total_bytes
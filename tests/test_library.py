@@ -0,0 +1,190 @@
+import os
+import stat
+import threading
+
+import pytest
+
+import library as library_module
+from library import STORE_DIR, FileLibrary, ImportCancelled, hash_file
+
+
+def _source(folder, name, data):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _writable(path):
+    return bool(os.stat(path).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+@pytest.fixture
+def folders(tmp_path):
+    library_folder = tmp_path / "files"
+    library_folder.mkdir()
+    incoming = tmp_path / "incoming"
+    incoming.mkdir()
+    return str(library_folder), str(incoming)
+
+
+def _store_objects(folder):
+    store = os.path.join(folder, STORE_DIR)
+    return sorted(os.listdir(store)) if os.path.isdir(store) else []
+
+
+def test_same_content_is_stored_once(folders):
+    folder, incoming = folders
+    a = _source(incoming, "a.pdf", b"same bytes")
+    b = _source(incoming, "b.pdf", b"same bytes")
+    c = _source(incoming, "c.pdf", b"other bytes")
+    library = FileLibrary(folder)
+
+    results = library.import_files([a, b, c])
+    assert [(r["name"], r["added"]) for r in results] == [("a.pdf", True), ("a.pdf", False), ("c.pdf", True)]
+    assert _store_objects(folder) == sorted({hash_file(a), hash_file(c)})
+    assert os.path.samefile(os.path.join(folder, "a.pdf"), library.object_path(hash_file(a)))
+
+    # The index survives a restart
+    reopened = FileLibrary(folder)
+    assert reopened.digest_of("a.pdf") == hash_file(a)
+    assert reopened.import_file(b) == ("a.pdf", False)
+
+
+def test_clashing_names_get_a_suffix(folders):
+    folder, incoming = folders
+    first = _source(incoming, "report.pdf", b"v1")
+    os.mkdir(os.path.join(incoming, "later"))
+    second = _source(os.path.join(incoming, "later"), "report.pdf", b"v2")
+    library = FileLibrary(folder)
+    assert library.import_file(first) == ("report.pdf", True)
+    assert library.import_file(second) == ("report_1.pdf", True)
+
+
+def test_stored_files_are_read_only(folders):
+    folder, incoming = folders
+    library = FileLibrary(folder)
+    name, _ = library.import_file(_source(incoming, "a.pdf", b"content"))
+    assert not _writable(os.path.join(folder, name))
+    assert not _writable(library.object_path(library.digest_of(name)))
+
+
+def test_changed_name_stops_counting_as_a_copy(folders):
+    folder, incoming = folders
+    source = _source(incoming, "a.pdf", b"original")
+    library = FileLibrary(folder)
+    name, _ = library.import_file(source)
+
+    # Edited in place after someone made it writable again
+    path = os.path.join(folder, name)
+    os.remove(path)
+    _source(folder, name, b"edited by hand")
+    assert library.import_file(source) == ("a_1.pdf", True)
+    with open(os.path.join(folder, "a_1.pdf"), "rb") as f:
+        assert f.read() == b"original"
+
+
+def test_damaged_object_is_replaced(folders):
+    folder, incoming = folders
+    source = _source(incoming, "a.pdf", b"original")
+    library = FileLibrary(folder)
+    name, _ = library.import_file(source)
+    digest = library.digest_of(name)
+    library.remove(name)
+    assert _store_objects(folder) == []
+
+    # An object left with the wrong content must not be linked to
+    obj = library.object_path(digest)
+    _source(os.path.dirname(obj), digest, b"corrupt!")
+    name, added = library.import_file(source)
+    assert added
+    assert hash_file(os.path.join(folder, name)) == digest
+
+
+def test_remove_and_rename(folders):
+    folder, incoming = folders
+    library = FileLibrary(folder)
+    library.import_file(_source(incoming, "a.pdf", b"shared"))
+    digest = library.digest_of("a.pdf")
+    _source(folder, "copy.pdf", b"shared")
+    library.adopt_existing()
+    assert library.names_for(digest) == ["a.pdf", "copy.pdf"]
+
+    library.rename("copy.pdf", "renamed.pdf")
+    assert library.names_for(digest) == ["a.pdf", "renamed.pdf"]
+    library.remove("a.pdf")
+    assert _store_objects(folder) == [digest]
+    library.remove("renamed.pdf")
+    assert _store_objects(folder) == []
+    assert sorted(os.listdir(folder)) == sorted([STORE_DIR, ".library.json", ".library.json.lock"])
+
+
+def test_adopt_existing_links_duplicates(folders):
+    folder, _ = folders
+    for name in ("one.bin", "two.bin", "three.bin"):
+        _source(folder, name, b"y" * 1000)
+    _source(folder, "other.bin", b"z" * 10)
+    library = FileLibrary(folder)
+
+    assert library.adopt_existing() == 2000
+    assert os.path.samefile(os.path.join(folder, "one.bin"), os.path.join(folder, "three.bin"))
+    assert len(_store_objects(folder)) == 2
+    assert not _writable(os.path.join(folder, "two.bin"))
+    # Unique content is indexed but keeps its permissions
+    assert _writable(os.path.join(folder, "other.bin"))
+    assert library.digest_of("other.bin") == hash_file(os.path.join(folder, "other.bin"))
+    assert library.adopt_existing() == 0
+
+
+def test_adopt_existing_skips_files_it_could_not_store(folders, monkeypatch):
+    folder, _ = folders
+    path = _source(folder, "one.bin", b"y" * 100)
+
+    def no_links(src, dst):
+        raise OSError("hard links not supported")
+
+    monkeypatch.setattr(library_module.os, "link", no_links)
+    library = FileLibrary(folder)
+    assert library.adopt_existing() == 0
+    assert library.digest_of("one.bin") is None
+    assert _store_objects(folder) == []
+    assert _writable(path)
+
+
+def test_saves_from_two_processes_are_merged(folders):
+    folder, incoming = folders
+    gui, cli = FileLibrary(folder), FileLibrary(folder)
+    gui.import_file(_source(incoming, "gui.pdf", b"from the gui"))
+    gui.import_file(_source(incoming, "gone.pdf", b"removed later"))
+    gui.save()
+    cli.import_file(_source(incoming, "cli.pdf", b"from the command line"))
+    cli.save()
+    gui.remove("gone.pdf")
+
+    # Neither save dropped the other's names, and the removal stuck
+    assert sorted(FileLibrary(folder)._names) == ["cli.pdf", "gui.pdf"]
+    assert gui.digest_of("cli.pdf") == cli.digest_of("cli.pdf")
+    assert [name for name in os.listdir(folder) if name.endswith(".tmp")] == []
+
+
+def test_cancelled_import_leaves_nothing_behind(folders):
+    folder, incoming = folders
+    data = b"x" * 4096
+    source = _source(incoming, "a.pdf", data)
+    library = FileLibrary(folder)
+    cancelled = threading.Event()
+    moved = [0]
+
+    def progress(n):
+        # Hashing reports the file once; cancel while it is being copied
+        moved[0] += n
+        if moved[0] > len(data):
+            cancelled.set()
+
+    with pytest.raises(ImportCancelled):
+        library.import_file(source, progress=progress, cancelled=cancelled)
+    assert _store_objects(folder) == []
+    assert library.digest_of("a.pdf") is None
+    assert not os.path.exists(os.path.join(folder, "a.pdf"))
+    # and the file can still be imported afterwards
+    assert library.import_file(source) == ("a.pdf", True)
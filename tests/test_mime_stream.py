@@ -0,0 +1,90 @@
+import os
+from email import message_from_bytes, policy
+
+import pytest
+
+import emailer
+import mime_stream
+from emailer import SMTPSessionPool
+from mime_stream import READ_CHUNK, iter_message
+
+
+def _parse(chunks):
+    return message_from_bytes(b"".join(chunks), policy=policy.default)
+
+
+def _attachment(folder, name, size):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def test_message_round_trips(tmp_path):
+    big = _attachment(tmp_path, "big.bin", READ_CHUNK * 3 + 17)
+    small = _attachment(tmp_path, "notes é.txt", 10)
+    msg = _parse(iter_message("shop@example.com", "client@example.com", "Your files", "Hi Jane,\n", [big, small]))
+
+    assert msg["Subject"] == "Your files"
+    assert msg["From"] == "shop@example.com"
+    assert msg["To"] == "client@example.com"
+    assert msg["Message-ID"]
+    assert msg.get_content_type() == "multipart/mixed"
+    assert msg.get_body(("plain",)).get_content() == "Hi Jane,\n"
+    attachments = list(msg.iter_attachments())
+    assert [part.get_filename() for part in attachments] == ["big.bin", "notes é.txt"]
+    for part, path in zip(attachments, (big, small)):
+        with open(path, "rb") as f:
+            assert part.get_content() == f.read()
+
+
+def test_html_goes_in_an_alternative(tmp_path):
+    path = _attachment(tmp_path, "a.bin", 100)
+    msg = _parse(iter_message("s@example.com", "c@example.com", "Hi", "plain body\n", [path],
+                              html="<p>html body</p>"))
+    alternative = next(part for part in msg.iter_parts() if part.get_content_type() == "multipart/alternative")
+    assert [part.get_content_type() for part in alternative.iter_parts()] == ["text/plain", "text/html"]
+    assert msg.get_body(("html",)).get_content() == "<p>html body</p>"
+    assert msg.get_body(("plain",)).get_content() == "plain body\n"
+    assert len(list(msg.iter_attachments())) == 1
+
+
+def test_output_is_smtp_safe(tmp_path):
+    path = _attachment(tmp_path, "data.bin", READ_CHUNK * 2 + 5)
+    chunks = list(iter_message("s@example.com", "c@example.com", "Subject", ".leading dot\n", [path]))
+    data = b"".join(chunks)
+    assert all(chunk.endswith(b"\r\n") for chunk in chunks)
+    lines = data.split(b"\r\n")
+    assert b"\n" not in data.replace(b"\r\n", b"")
+    assert all(len(line) <= 998 for line in lines)
+    # Everything is base64, so DATA needs no dot-stuffing
+    assert not any(line.startswith(b".") for line in lines)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_send_files_with_receipt(smtp_server, workdir, stream):
+    attachment = _attachment(workdir, "photo.jpg", READ_CHUNK + 100)
+    receipt = _attachment(workdir, "receipt.pdf", 500)
+    pool = SMTPSessionPool(starttls=False, user="")
+    try:
+        emailer.send_files_with_receipt("client@example.com", "Jane Doe", [attachment], receipt, pool=pool,
+                                        stream=stream, html="<p>Hi</p>")
+    finally:
+        pool.close()
+    assert smtp_server.stats["messages"] == 1
+    assert smtp_server.stats["bytes"] > os.path.getsize(attachment) + os.path.getsize(receipt)
+
+
+def test_large_orders_stream_by_default(smtp_server, workdir, monkeypatch):
+    streamed = []
+    real = mime_stream.send_streamed
+    monkeypatch.setattr(mime_stream, "send_streamed", lambda *args: streamed.append(1) or real(*args))
+    monkeypatch.setattr(emailer, "STREAM_THRESHOLD", 1000)
+    pool = SMTPSessionPool(starttls=False, user="")
+    try:
+        emailer.send_files_with_receipt("c@example.com", "Jane", [_attachment(workdir, "small.bin", 10)], pool=pool)
+        emailer.send_files_with_receipt("c@example.com", "Jane", [_attachment(workdir, "big.bin", 2000)], pool=pool)
+    finally:
+        pool.close()
+    assert streamed == [1]
+    assert smtp_server.stats["messages"] == 2
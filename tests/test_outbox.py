@@ -0,0 +1,157 @@
+import json
+import queue
+
+import pytest
+
+import bulk_sender
+import outbox
+from bulk_sender import deliver, make_job
+from outbox import Outbox, replay_journal
+
+
+def _write_journal(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def _wait_for(box, kind, timeout=10):
+    while True:
+        event = box.events.get(timeout=timeout)
+        if event[0] == kind:
+            return event
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replace deliver's receipt, send and bookkeeping steps with counters.
+    ``calls["fail_sends"]`` makes that many sends raise first."""
+    calls = {"receipts": 0, "sends": 0, "recorded": 0, "fail_sends": 0}
+
+    def create_pdf_receipt(name, files, *args, **kwargs):
+        calls["receipts"] += 1
+        return f"receipts/{name}_{calls['receipts']}.pdf"
+
+    def send_files_with_receipt(email, name, attachments, receipt_path, **kwargs):
+        calls["sends"] += 1
+        calls["last_receipt"] = receipt_path
+        if calls["fail_sends"]:
+            calls["fail_sends"] -= 1
+            raise ConnectionError("server went away")
+
+    def save_client_info(name, email, files):
+        calls["recorded"] += 1
+
+    monkeypatch.setattr(bulk_sender, "create_pdf_receipt", create_pdf_receipt)
+    monkeypatch.setattr(bulk_sender, "send_files_with_receipt", send_files_with_receipt)
+    monkeypatch.setattr(bulk_sender, "save_client_info", save_client_info)
+    monkeypatch.setattr(bulk_sender, "save_sent_email", lambda name, email: True)
+    monkeypatch.setattr(outbox, "backoff_delay", lambda attempt: 0)
+    return calls
+
+
+def test_replay_keeps_unfinished_jobs(workdir):
+    _write_journal("outbox.jsonl", [
+        {"op": "queued", "id": "a", "job": {"email": "a@example.com"}},
+        {"op": "queued", "id": "b", "job": {"email": "b@example.com"}},
+        {"op": "queued", "id": "c", "job": {"email": "c@example.com"}},
+        {"op": "attempt", "id": "a", "attempt": 2},
+        {"op": "progress", "id": "a", "update": {"receipt": "receipts/a.pdf"}},
+        {"op": "progress", "id": "a", "update": {"sent": True}},
+        {"op": "done", "id": "b"},
+        {"op": "failed", "id": "c"},
+    ])
+    with open("outbox.jsonl", "a") as f:
+        f.write('{"op": "queued", "id": "d", "jo')  # torn by a crash mid-write
+
+    pending = replay_journal("outbox.jsonl")
+    assert list(pending) == ["a"]
+    assert pending["a"]["attempts"] == 2
+    assert pending["a"]["job"] == {"email": "a@example.com", "receipt": "receipts/a.pdf", "sent": True}
+
+
+def test_replay_of_missing_journal(workdir):
+    assert replay_journal("outbox.jsonl") == {}
+
+
+def test_deliver_skips_finished_steps(calls):
+    job = make_job("Jane", "jane@example.com", ["a.txt"])
+    job.update(receipt="receipts/Jane_old.pdf", sent=True)
+    updates = []
+    assert deliver(job, checkpoint=updates.append) == "receipts/Jane_old.pdf"
+    assert (calls["receipts"], calls["sends"], calls["recorded"]) == (0, 0, 1)
+    assert updates == [{"recorded": True}]
+
+
+def test_deliver_reports_progress(calls):
+    job = make_job("Jane", "jane@example.com", ["a.txt"])
+    updates = []
+    receipt = deliver(job, checkpoint=updates.append)
+    assert updates == [{"receipt": receipt}, {"sent": True}, {"recorded": True}]
+    assert job["receipt"] == receipt and job["sent"] and job["recorded"]
+
+
+def test_retry_reuses_the_receipt(workdir, calls):
+    calls["fail_sends"] = 2
+    box = Outbox(handler=deliver, workers=1)
+    box.start()
+    try:
+        box.enqueue(make_job("Jane", "jane@example.com", ["a.txt"]))
+        _, _, _, result = _wait_for(box, "done")
+    finally:
+        box.stop()
+    assert calls["receipts"] == 1
+    assert calls["sends"] == 3
+    assert calls["last_receipt"] == result
+
+
+def test_restart_after_send_does_not_send_again(workdir, calls):
+    job = make_job("Jane", "jane@example.com", ["a.txt"])
+    _write_journal("outbox.jsonl", [
+        {"op": "queued", "id": "a", "job": job},
+        {"op": "progress", "id": "a", "update": {"receipt": "receipts/Jane_1.pdf"}},
+        {"op": "progress", "id": "a", "update": {"sent": True}},
+    ])
+    box = Outbox(handler=deliver, workers=1)
+    box.start()
+    try:
+        _, _, _, result = _wait_for(box, "done")
+    finally:
+        box.stop()
+    assert result == "receipts/Jane_1.pdf"
+    assert (calls["receipts"], calls["sends"], calls["recorded"]) == (0, 0, 1)
+    assert replay_journal("outbox.jsonl") == {}
+
+
+def test_progress_is_journaled(workdir, calls):
+    calls["fail_sends"] = 1
+    box = Outbox(handler=deliver, workers=1, max_attempts=1)
+    box.start()
+    try:
+        box.enqueue(make_job("Jane", "jane@example.com", ["a.txt"]))
+        _wait_for(box, "failed")
+    finally:
+        box.stop()
+
+    assert replay_journal("outbox.jsonl") == {}
+    with open("outbox.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["op"] for r in records] == ["queued", "progress", "failed"]
+    assert records[1]["update"] == {"receipt": "receipts/Jane_1.pdf"}
+
+
+def test_gives_up_after_max_attempts(workdir, calls):
+    calls["fail_sends"] = 10
+    box = Outbox(handler=deliver, workers=1, max_attempts=3)
+    box.start()
+    try:
+        box.enqueue(make_job("Jane", "jane@example.com", ["a.txt"]))
+        _, _, _, error = _wait_for(box, "failed")
+    finally:
+        box.stop()
+    assert "server went away" in error
+    assert calls["sends"] == 3
+    assert calls["receipts"] == 1
+    assert box.pending_count() == 0
+    with pytest.raises(queue.Empty):
+        _wait_for(box, "done", timeout=0.1)
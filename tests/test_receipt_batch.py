@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("fpdf")
+
+import client_data
+from receipt_batch import generate_receipts, load_orders, main
+
+
+def test_load_orders_from_jsonl(workdir):
+    with open("orders.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"name": "Jane", "files": ["a.txt"], "price": 3}) + "\n\n{broken\n")
+    orders = load_orders("orders.jsonl")
+    assert orders[0] == {"name": "Jane", "files": ["a.txt"], "price": 3}
+    assert orders[1]["name"] is None and orders[1]["error"].startswith("line 3: invalid JSON")
+
+
+def test_load_orders_from_the_store(workdir):
+    client_data.save_client_info("Jane", "jane@example.com", ["a.txt", "b.txt"])
+    orders = load_orders("store")
+    assert [(order["name"], order["email"]) for order in orders] == [("Jane", "jane@example.com")]
+
+
+def test_every_order_gets_a_receipt_and_failures_stay_per_order(workdir):
+    orders = [{"name": f"Client {n}", "files": "a.txt|b.txt", "price": n} for n in range(5)]
+    orders.insert(2, {"name": "Broken", "price": "not a number"})
+    manifest = generate_receipts(orders, max_workers=2, chunk_size=2)
+
+    assert (manifest["orders"], manifest["generated"], manifest["failed"]) == (6, 5, 1)
+    assert [result["index"] for result in manifest["results"]] == list(range(6))
+    broken = manifest["results"][2]
+    assert not broken["ok"] and broken["error"].startswith("ValueError")
+    paths = [result["path"] for result in manifest["results"] if result["ok"]]
+    # Receipts made in the same second by different workers don't overwrite each other
+    assert len(set(paths)) == 5 and all(os.path.exists(path) for path in paths)
+
+
+def test_cli_writes_a_manifest(workdir, capsys):
+    with open("orders.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"name": "Jane", "files": ["a.txt"]}) + "\n")
+    assert main(["orders.jsonl", "--workers", "1"]) == 0
+    assert capsys.readouterr().out.startswith("1/1 receipts")
+    assert [name for name in os.listdir("receipts") if name.startswith("batch_")]
@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("fpdf")
+Image = pytest.importorskip("PIL.Image")
+ImageCms = pytest.importorskip("PIL.ImageCms")
+
+from fpdf import FPDF
+
+import receipt_generator
+from receipt_generator import ReceiptRenderer
+
+CREATED = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def fixed_creation_date(monkeypatch):
+    # The creation date goes into the file and its ID; pin it so two renders compare equal
+    output = FPDF.output
+
+    def pinned(pdf, *args, **kwargs):
+        pdf.set_creation_date(CREATED)
+        return output(pdf, *args, **kwargs)
+
+    monkeypatch.setattr(FPDF, "output", pinned)
+
+
+def _logo(path, icc):
+    image = Image.new("RGB", (64, 32), (200, 40, 40))
+    if icc:
+        profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+        image.save(path, icc_profile=profile)
+    else:
+        image.save(path)
+    return str(path)
+
+
+def _render(renderer, path):
+    renderer.render(str(path), "R-20250101-000001", "Jane Doe", "2025-01-01 10:00", ["a.txt", "b.txt"],
+                    price=10, tax=1, discount=2)
+    return path.read_bytes()
+
+
+@pytest.mark.parametrize("icc", [False, True], ids=["plain", "icc"])
+def test_seeded_logo_renders_the_same_pdf(tmp_path, monkeypatch, icc):
+    logo = _logo(tmp_path / "logo.png", icc)
+    seeded = ReceiptRenderer(logo)
+    # Twice, so the second receipt is drawn from the cached logo
+    _render(seeded, tmp_path / "first.pdf")
+    cached = _render(seeded, tmp_path / "seeded.pdf")
+
+    monkeypatch.setattr(receipt_generator, "SEEDED_FPDF_VERSIONS", ())
+    plain = _render(ReceiptRenderer(logo), tmp_path / "plain.pdf")
+    assert cached == plain
+    assert (seeded._logo_info is None) == icc
+    if icc:
+        assert b"/ICCBased" in cached
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from receipt_ids import ReceiptIdAllocator, reserve_block
+
+
+def test_blocks_follow_each_other(tmp_path):
+    path = str(tmp_path / "receipts" / ".receipt_counter")
+    assert reserve_block(path, 10) == 1
+    assert reserve_block(path, 10) == 11
+    assert reserve_block(path, 5) == 21
+    with open(path) as f:
+        assert int(f.read()) == 26
+
+
+def test_numbers_increase_within_a_process(tmp_path):
+    allocator = ReceiptIdAllocator(str(tmp_path / "counter"), block_size=4)
+    assert [allocator.next_id() for _ in range(10)] == list(range(1, 11))
+
+
+def test_unique_across_threads(tmp_path):
+    allocator = ReceiptIdAllocator(str(tmp_path / "counter"), block_size=8)
+    seen = [[] for _ in range(8)]
+
+    def take(out):
+        for _ in range(500):
+            out.append(allocator.next_id())
+
+    threads = [threading.Thread(target=take, args=(out,)) for out in seen]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ids = [n for out in seen for n in out]
+    assert len(set(ids)) == len(ids) == 4000
+
+
+def _take_ids(path, count, results):
+    allocator = ReceiptIdAllocator(path, block_size=16)
+    results.put([allocator.next_id() for _ in range(count)])
+
+
+def test_unique_across_processes(tmp_path):
+    path = str(tmp_path / "counter")
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_take_ids, args=(path, 200, results)) for _ in range(4)]
+    for p in workers:
+        p.start()
+    ids = [n for _ in workers for n in results.get(timeout=30)]
+    for p in workers:
+        p.join()
+    assert len(set(ids)) == len(ids) == 800
+
+
+def _next_from(allocator, results):
+    results.put(allocator.next_id())
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_gets_its_own_block(tmp_path):
+    allocator = ReceiptIdAllocator(str(tmp_path / "counter"), block_size=16)
+    assert allocator.next_id() == 1
+    results = multiprocessing.get_context("fork").Queue()
+    child = multiprocessing.get_context("fork").Process(target=_next_from, args=(allocator, results))
+    child.start()
+    from_child = results.get(timeout=30)
+    child.join()
+    assert from_child == 17
+    assert allocator.next_id() == 2
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import receipt_ledger as ledger
+
+
+@pytest.fixture
+def db(workdir):
+    os.makedirs("receipts")
+    return os.path.join("receipts", "ledger.db")
+
+
+def _receipt(name):
+    path = os.path.join("receipts", name)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4")
+    return path
+
+
+def test_record_and_list(db):
+    ledger.record_receipt("R-1", "receipts/Jane_Doe_20250101_120000_000001.pdf", "Jane Doe", ["a.txt", "b.txt"],
+                          price=10, tax=1, discount=2, email="jane@example.com", created="2025-01-01 12:00:00",
+                          path=db)
+    ledger.record_receipt("R-2", "receipts/Bob_20250102_120000_000002.pdf", "Bob", ["c.txt"], price=5,
+                          email="bob@example.com", created="2025-01-02 12:00:00", path=db)
+
+    rows = ledger.list_receipts(path=db)
+    assert [row["receipt_num"] for row in rows] == ["R-2", "R-1"]
+    assert rows[1]["total"] == 9
+    assert rows[1]["files"] == "a.txt|b.txt"
+    assert [row["client"] for row in ledger.list_receipts(sort="client", descending=False, path=db)] == \
+        ["Bob", "Jane Doe"]
+    assert [row["client"] for row in ledger.list_receipts(search="jane", path=db)] == ["Jane Doe"]
+    assert len(ledger.list_receipts(limit=1, path=db)) == 1
+    # Unknown sort columns fall back to the creation date rather than reaching the SQL
+    assert len(ledger.list_receipts(sort="created; DROP TABLE receipts", path=db)) == 2
+    assert ledger.emails_for_client("jane doe", path=db) == ["jane@example.com"]
+
+    ledger.delete_receipt("Bob_20250102_120000_000002.pdf", path=db)
+    assert ledger.get_receipt("Bob_20250102_120000_000002.pdf", path=db) is None
+
+
+def test_index_file_parses_legacy_names(db):
+    path = _receipt("Jane_Doe_20240301_101500_000007.pdf")
+    row = ledger.index_file(path, path=db)
+    assert row["client"] == "Jane Doe"
+    assert row["receipt_num"] == "legacy:Jane_Doe_20240301_101500_000007.pdf"
+    assert ledger.index_file(path, path=db)["receipt_num"] == row["receipt_num"]
+    assert ledger.index_file(os.path.join("receipts", "gone.pdf"), path=db) is None
+
+
+def test_backfill_adds_and_drops_rows(db):
+    _receipt("Old_Client_20230101_090000.pdf")
+    _receipt("notes.txt")
+    ledger.record_receipt("R-9", "receipts/Deleted_20240101_090000_000009.pdf", "Deleted", [], path=db)
+
+    assert ledger.backfill("receipts", path=db) == 1
+    assert [row["client"] for row in ledger.list_receipts(path=db)] == ["Old Client"]
+    # Runs once unless forced
+    _receipt("New_20240101_090000.pdf")
+    assert ledger.backfill("receipts", path=db) == 0
+    assert ledger.backfill("receipts", path=db, force=True) == 1
+
+
+
+def test_prune_missing(db):
+    kept = _receipt("Kept_20240101_090000_000001.pdf")
+    ledger.record_receipt("R-1", kept, "Kept", [], path=db)
+    ledger.record_receipt("R-2", "receipts/Gone_20240101_090000_000002.pdf", "Gone", [], path=db)
+
+    assert ledger.prune_missing("receipts", path=db) == 1
+    assert [row["receipt_num"] for row in ledger.list_receipts(path=db)] == ["R-1"]
+    assert ledger.prune_missing("receipts", path=db) == 0
+    assert ledger.prune_missing("no-such-folder", path=db) == 0
@@ -1,7 +1,9 @@
-import json
 import os
 
-EMAIL_CONFIG_PATH = "email_config.json"
+import config
+
+# Email settings are read and written by config; these wrappers keep the old names working.
+EMAIL_CONFIG_PATH = config.CONFIG_FILE
 
 def ensure_dir(path):
     if not os.path.exists(path):
@@ -11,28 +13,10 @@ def validate_client_inputs(name, files):
     return bool(name.strip()) and bool(files)
 
 def is_email_config_missing():
-    if not os.path.exists(EMAIL_CONFIG_PATH):
-        return True
-    try:
-        with open(EMAIL_CONFIG_PATH, "r") as f:
-            data = json.load(f)
-        return not data.get("sender") or not data.get("password")
-    except Exception:
-        return True
+    return config.is_email_config_missing(EMAIL_CONFIG_PATH)
 
 def load_email_config():
-    if not os.path.exists(EMAIL_CONFIG_PATH):
-        return {"sender": "", "password": ""}
-    try:
-        with open(EMAIL_CONFIG_PATH, "r") as f:
-            return json.load(f)
-    except Exception:
-        return {"sender": "", "password": ""}
+    return config.email_config(EMAIL_CONFIG_PATH)
 
-def save_email_config(sender, password):
-    data = {
-        "sender": sender,
-        "password": password
-    }
-    with open(EMAIL_CONFIG_PATH, "w") as f:
-        json.dump(data, f)
+def save_email_config(sender, password, smtp_server=config.DEFAULT_SMTP_SERVER, smtp_port=config.DEFAULT_SMTP_PORT):
+    return config.save_email_config(sender, password, smtp_server, smtp_port, path=EMAIL_CONFIG_PATH)